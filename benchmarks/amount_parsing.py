@@ -0,0 +1,83 @@
+"""
+Benchmark del parseo de montos: cadena de str.replace actual vs parse_amounts.
+
+Uso:
+    python -m benchmarks.amount_parsing [--sizes 10000 1000000 10000000] [--parsers legacy cents]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from services.amounts import parse_amounts
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+
+# Filas usadas para verificar que ambos parsers coinciden
+CHECK_ROWS = 100_000
+
+
+def synthetic_amounts(n, seed=42):
+    """Genera montos con el formato de movements.csv, p. ej. ' $1.000.000 '"""
+    rng = np.random.default_rng(seed)
+    pesos = np.rint(rng.lognormal(mean=11, sigma=1.5, size=n)).astype(np.int64) + 1
+    amounts = [f" ${value:,} ".replace(',', '.') for value in pesos.tolist()]
+    return pd.Series(amounts)
+
+
+def legacy_parse(series):
+    """Reproduce la limpieza de montos anterior (tres str.replace y astype(float))"""
+    series = series.str.strip()
+    series = series[series != '']
+    return (
+        series
+        .str.replace('$', '', regex=False)
+        .str.replace('.', '', regex=False)
+        .str.replace(',', '.', regex=False)
+        .astype(float)
+    )
+
+
+def vectorized_parse(series):
+    cents, valid = parse_amounts(series)
+    return cents[valid]
+
+
+def _measure(parser, series):
+    gc.collect()
+    start = time.perf_counter()
+    result = parser(series)
+    elapsed = time.perf_counter() - start
+    del result
+
+    gc.collect()
+    tracemalloc.start()
+    parser(series)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+PARSERS = {"legacy": legacy_parse, "cents": vectorized_parse}
+
+
+def run(sizes, parsers=tuple(PARSERS)):
+    print(f"{'rows':>10} {'parser':>10} {'seconds':>9} {'rows/s':>12} {'peak MiB':>9}")
+    for n in sizes:
+        series = synthetic_amounts(n)
+        sample = series.iloc[:CHECK_ROWS]
+        legacy = np.rint(legacy_parse(sample).to_numpy() * 100).astype(np.int64)
+        if not np.array_equal(legacy, vectorized_parse(sample)):
+            raise AssertionError(f"Parsers disagree at {n} rows")
+        for name in parsers:
+            elapsed, peak = _measure(PARSERS[name], series)
+            print(f"{n:>10} {name:>10} {elapsed:>9.3f} {n / elapsed:>12,.0f} {peak / 2**20:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--parsers", nargs="+", choices=list(PARSERS), default=list(PARSERS))
+    args = parser.parse_args()
+    run(args.sizes, args.parsers)
@@ -0,0 +1,82 @@
+"""
+Benchmark de arranque en frío de app.lambda_handler.
+
+Cada corrida es un intérprete nuevo que importa app y atiende un health
+check (GET). Falla si la mediana del tiempo de init supera el presupuesto o
+si el camino GET importa dependencias pesadas.
+
+Uso:
+    python -m benchmarks.cold_start [--runs 5] [--budget-ms 100]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_BUDGET_MS = 100
+
+HEAVY_MODULES = ('pandas', 'numpy', 'openai', 'requests', 'dotenv')
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.lambda_handler({"httpMethod": "GET"}, None)
+done = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "init_ms": (done - start) * 1000,
+    "heavy": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_cold_start(runs=5):
+    """
+    Runs the GET health check in fresh interpreters.
+
+    Returns:
+        list: One dict per run with import_ms, init_ms and the heavy modules loaded.
+    """
+    env = dict(os.environ)
+    env.pop('STARTUP_PROFILE', None)
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', _PROBE], cwd=ROOT, env=env,
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def check_budget(results, budget_ms=DEFAULT_BUDGET_MS):
+    """Returns a list of budget violations (empty when the runs are within budget)."""
+    problems = []
+    median_ms = statistics.median(r["init_ms"] for r in results)
+    if median_ms > budget_ms:
+        problems.append(f"median init {median_ms:.1f} ms exceeds budget {budget_ms} ms")
+    heavy = sorted({m for r in results for m in r["heavy"]})
+    if heavy:
+        problems.append(f"GET path imported heavy modules: {', '.join(heavy)}")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    results = measure_cold_start(args.runs)
+    for r in results:
+        print(f"import {r['import_ms']:7.1f} ms   init {r['init_ms']:7.1f} ms")
+    problems = check_budget(results, args.budget_ms)
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    sys.exit(1 if problems else 0)
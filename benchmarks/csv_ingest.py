@@ -0,0 +1,147 @@
+"""
+Benchmark de la carga del CSV: lista de dicts contra lectura en streaming.
+
+Para cada tamaño genera un ledger con benchmarks.ledger_generator (se
+reutiliza si ya existe en --data-dir) y lo carga con cada lector en un
+intérprete nuevo, así el pico de RSS es solo el de esa carga:
+
+- dicts: Ledger.from_transactions(csv_client.load_transactions(path)), el
+  lector anterior,
+- stream: ledger_reader.read_ledger(path), por bloques a columnas tipadas.
+
+Reporta el tiempo de carga, el pico de RSS (y cuánto sube sobre el proceso
+con los módulos ya importados), la memoria del Ledger resultante y una
+huella de sus filas para comprobar que ambos lectores dan el mismo Ledger.
+
+Uso:
+    python -m benchmarks.csv_ingest [--sizes 100000 1000000 3000000]
+        [--loaders dicts stream] [--memory-mb 256] [--data-dir /tmp/giobot-bench]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.operation_scaling import LAMBDA_MEMORY_MB, _peak_rss_mb as _maxrss_mb
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = [100_000, 1_000_000, 3_000_000]
+LOADERS = ["dicts", "stream"]
+
+
+def _peak_rss_mb():
+    # En Linux ru_maxrss se hereda a través de exec (incluye el pico del
+    # proceso que generó el ledger); VmHWM es solo de este proceso
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _maxrss_mb()
+
+
+def measure(path, loader):
+    """
+    Carga el ledger en path con un lector, en el proceso actual.
+
+    Debe ejecutarse en un intérprete nuevo: el pico de RSS es del proceso.
+
+    Returns:
+        dict: loader, rows, load_s, base_rss_mb, peak_rss_mb, ledger_mb y
+        fingerprint.
+    """
+    import pandas as pd
+    from services.csv_client import load_transactions
+    from services.ledger import Ledger
+    from services.ledger_reader import read_ledger
+
+    base_rss = _peak_rss_mb()
+    started = time.perf_counter()
+    if loader == "dicts":
+        ledger = Ledger.from_transactions(load_transactions(path))
+    else:
+        ledger = read_ledger(path)
+    load_s = time.perf_counter() - started
+    peak_rss = _peak_rss_mb()
+
+    frame = ledger.frame
+    return {
+        "loader": loader,
+        "rows": len(frame),
+        "load_s": round(load_s, 3),
+        "base_rss_mb": round(base_rss, 1),
+        "peak_rss_mb": round(peak_rss, 1),
+        "ledger_mb": round(ledger.memory_usage() / 2**20, 1),
+        "fingerprint": str(int(pd.util.hash_pandas_object(frame.astype(str), index=False).sum())),
+    }
+
+
+def run_size(rows, data_dir, loaders=LOADERS, seed=42):
+    """Genera (o reutiliza) el ledger de rows filas y lo carga con cada lector en un subproceso."""
+    from benchmarks.ledger_generator import generate_ledger
+
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"ledger-{rows}-{seed}.csv")
+    if not os.path.exists(path):
+        generate_ledger(path + ".tmp", rows, seed=seed)
+        os.replace(path + ".tmp", path)
+
+    results = []
+    for loader in loaders:
+        command = [sys.executable, "-m", "benchmarks.csv_ingest", "--worker", path, "--loaders", loader]
+        completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        if completed.returncode != 0:
+            # Un código negativo suele ser el OOM killer (-9)
+            results.append({"loader": loader, "rows": rows,
+                            "error": f"exit {completed.returncode}: {completed.stderr.strip()[-300:]}"})
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return {"rows": rows, "file_mb": round(os.path.getsize(path) / 2**20, 1), "loaders": results}
+
+
+def _print_size(result, memory_mb):
+    print(f"{result['rows']:>10} rows ({result['file_mb']} MB CSV)")
+    fingerprints = set()
+    for run in result["loaders"]:
+        if "error" in run:
+            print(f"{'':>10} {run['loader']:<8} failed: {run['error']}")
+            continue
+        fingerprints.add(run["fingerprint"])
+        over = " OVER LAMBDA MEMORY" if run["peak_rss_mb"] > memory_mb else ""
+        print(f"{'':>10} {run['loader']:<8} load {run['load_s']:>7.3f} s  peak RSS {run['peak_rss_mb']:>7.1f} MB "
+              f"(+{run['peak_rss_mb'] - run['base_rss_mb']:.1f} MB)  ledger {run['ledger_mb']} MB{over}")
+    if len(fingerprints) > 1:
+        print(f"{'':>10} WARNING: the loaders returned different ledgers")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--loaders", nargs="+", choices=LOADERS, default=LOADERS)
+    parser.add_argument("--memory-mb", type=float, default=LAMBDA_MEMORY_MB)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "giobot-bench"))
+    parser.add_argument("--output", help="guardar los resultados en JSON")
+    parser.add_argument("--worker", metavar="PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.loaders[0])))
+        return
+
+    results = []
+    for rows in args.sizes:
+        result = run_size(rows, args.data_dir, args.loaders)
+        _print_size(result, args.memory_mb)
+        results.append(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
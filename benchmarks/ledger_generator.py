@@ -0,0 +1,142 @@
+"""
+Generador de ledgers sintéticos con el formato exacto de movements.csv.
+
+Escribe el mismo esquema que el archivo real: BOM UTF-8, separador ';',
+encabezado con ' Amount ' con espacios, montos como ' $1.000.000 ' y
+fechas 'YYYY-MM-DD 00:00:00', con fin de línea CRLF. Las filas se generan y
+escriben por bloques, así 10M de filas no necesitan tenerse en memoria.
+
+Las categorías, su tipo (gasto o ingreso), su peso y su monto mediano son
+configurables con un JSON; por defecto siguen la distribución de
+movements.csv. Las fechas son uniformes entre --start y --end, o cargadas
+hacia el final del rango con --recent-bias.
+
+Uso:
+    python -m benchmarks.ledger_generator ledger.csv --rows 1000000 [--start 2020-01-01]
+        [--end 2025-12-31] [--categories categorias.json] [--recent-bias 0] [--seed 42]
+"""
+import argparse
+import json
+import numpy as np
+
+HEADER = "\ufeffDescription;Income/expensive; Amount ;Category;Date\r\n"
+
+# categoría: (tipo, peso, monto mediano en pesos), según movements.csv
+DEFAULT_CATEGORIES = {
+    "vehicle": ("expensive", 152, 120_000),
+    "education": ("expensive", 134, 350_000),
+    "restaurant": ("expensive", 111, 60_000),
+    "health": ("expensive", 93, 90_000),
+    "entertainment": ("expensive", 84, 45_000),
+    "food": ("expensive", 75, 150_000),
+    "home": ("expensive", 67, 250_000),
+    "Saving": ("expensive", 59, 1_000_000),
+    "Taxes": ("expensive", 54, 400_000),
+    "gift": ("expensive", 41, 80_000),
+    "solidarity": ("expensive", 39, 50_000),
+    "public services": ("expensive", 35, 180_000),
+    "parents": ("expensive", 34, 500_000),
+    "clothes": ("expensive", 25, 150_000),
+    "birthday": ("expensive", 25, 100_000),
+    "loan": ("expensive", 20, 800_000),
+    "personal presentation": ("expensive", 18, 40_000),
+    "pension": ("expensive", 18, 600_000),
+    "salary": ("income", 43, 8_000_000),
+    "internet help": ("income", 17, 300_000),
+    "pasive incomes": ("income", 16, 1_000_000),
+}
+
+# Palabras para las descripciones; la cardinalidad se controla con --descriptions
+_WORDS = ("pago", "compra", "cuota", "factura", "mercado", "almuerzo", "recarga",
+          "abono", "servicio", "transferencia", "regalo", "mensualidad")
+
+CHUNK_ROWS = 200_000
+
+
+def load_categories(path):
+    """Lee {categoría: [tipo, peso, monto mediano]} de un archivo JSON."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return {name: tuple(spec) for name, spec in json.load(f).items()}
+
+
+def _format_amounts(pesos):
+    return [f" ${value:,} ".replace(',', '.') for value in pesos.tolist()]
+
+
+def _format_dates(days):
+    return np.datetime_as_string(days, unit='D').astype(object) + " 00:00:00"
+
+
+def generate_ledger(path, rows, categories=None, start="2025-01-01", end="2025-12-31",
+                    recent_bias=0.0, descriptions=600, seed=42):
+    """
+    Escribe un ledger sintético de rows movimientos en path.
+
+    Args:
+        path (str): Archivo de salida.
+        rows (int): Número de movimientos.
+        categories (dict, optional): {categoría: (tipo, peso, monto mediano)};
+            DEFAULT_CATEGORIES si no se indica.
+        start, end (str): Rango de fechas (inclusive), 'YYYY-MM-DD'.
+        recent_bias (float): 0 reparte las fechas de forma uniforme; valores
+            mayores concentran los movimientos al final del rango.
+        descriptions (int): Descripciones distintas por categoría.
+        seed (int): Semilla; la misma semilla produce el mismo archivo.
+
+    Returns:
+        int: Bytes escritos.
+    """
+    categories = categories or DEFAULT_CATEGORIES
+    names = list(categories)
+    kinds = np.array([categories[n][0] for n in names], dtype=object)
+    weights = np.array([categories[n][1] for n in names], dtype=float)
+    medians = np.array([categories[n][2] for n in names], dtype=float)
+    first, last = np.datetime64(start, 'D'), np.datetime64(end, 'D')
+    span = int((last - first).astype(int)) + 1
+    rng = np.random.default_rng(seed)
+
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(HEADER)
+        written += len(HEADER.encode('utf-8'))
+        for offset in range(0, rows, CHUNK_ROWS):
+            n = min(CHUNK_ROWS, rows - offset)
+            cat = rng.choice(len(names), size=n, p=weights / weights.sum())
+            # Montos lognormales alrededor de la mediana, redondeados a $100
+            pesos = np.maximum(100, np.rint(medians[cat] * rng.lognormal(0, 0.6, n) / 100) * 100).astype(np.int64)
+            position = rng.random(n) ** (1 / (1 + recent_bias))
+            days = first + np.minimum((position * span).astype(np.int64), span - 1).astype('timedelta64[D]')
+            words = np.array(_WORDS, dtype=object)[rng.integers(0, len(_WORDS), n)]
+            numbers = rng.integers(0, max(1, descriptions // len(_WORDS)), n)
+            lines = [
+                f"{word} {name} {number};{kind};{amount};{name};{date}\r\n"
+                for word, name, number, kind, amount, date in zip(
+                    words.tolist(), np.array(names, dtype=object)[cat].tolist(), numbers.tolist(),
+                    kinds[cat].tolist(), _format_amounts(pesos), _format_dates(days).tolist())
+            ]
+            chunk = "".join(lines)
+            f.write(chunk)
+            written += len(chunk.encode('utf-8'))
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--start", default="2025-01-01")
+    parser.add_argument("--end", default="2025-12-31")
+    parser.add_argument("--categories", help="JSON {categoría: [tipo, peso, monto mediano]}")
+    parser.add_argument("--recent-bias", type=float, default=0.0)
+    parser.add_argument("--descriptions", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    categories = load_categories(args.categories) if args.categories else None
+    size = generate_ledger(args.path, args.rows, categories, args.start, args.end,
+                           args.recent_bias, args.descriptions, args.seed)
+    print(f"{args.rows} rows, {size / 2**20:.1f} MiB -> {args.path}")
+
+
+if __name__ == "__main__":
+    main()
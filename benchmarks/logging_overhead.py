@@ -0,0 +1,144 @@
+"""
+Benchmark del logging por invocación: json.dumps(indent=2) anterior vs
+payloads diferidos, muestreados y redactados de services.log_utils.
+
+Reproduce los registros que escribía una invocación (evento en
+lambda_handler, evento y tres veces el cuerpo en extract_message, texto y
+respuesta de la API en send_message_to_telegram) y los de ahora, con un
+handler que cuenta los bytes escritos. Mide CPU por invocación y volumen de
+logs para varios niveles y tasas de muestreo.
+
+Uso:
+    python -m benchmarks.logging_overhead [--invocations 20000] [--rates 0 0.01 1]
+"""
+import argparse
+import io
+import json
+import logging
+import time
+from services.log_utils import log_payload, payload
+
+ANSWER = (
+    "📊 *Resumen de gastos de agosto*\n\n"
+    + "\n".join(f"• Categoría {i}: $ {i * 123456:,}".replace(",", ".") for i in range(1, 16))
+    + "\n\nTotal: $ 14.814.720"
+)
+
+
+def sample_event(text="¿Cuánto gasté en comida en agosto de 2025?"):
+    """Evento de API Gateway con un update de Telegram, como los de producción."""
+    update = {
+        "update_id": 912345678,
+        "message": {
+            "message_id": 4321,
+            "from": {"id": 123456789, "is_bot": False, "first_name": "Ana", "last_name": "Pérez",
+                     "username": "anap", "language_code": "es"},
+            "chat": {"id": 123456789, "first_name": "Ana", "last_name": "Pérez", "username": "anap",
+                     "type": "private"},
+            "date": 1756684800,
+            "text": text,
+        },
+    }
+    headers = {name: f"value-{i}" for i, name in enumerate((
+        "Accept", "Accept-Encoding", "CloudFront-Forwarded-Proto", "CloudFront-Is-Desktop-Viewer",
+        "CloudFront-Viewer-Country", "Content-Type", "Host", "User-Agent", "Via", "X-Amz-Cf-Id",
+        "X-Amzn-Trace-Id", "X-Forwarded-For", "X-Forwarded-Port", "X-Forwarded-Proto",
+        "X-Telegram-Bot-Api-Secret-Token"))}
+    return {
+        "resource": "/webhook",
+        "path": "/webhook",
+        "httpMethod": "POST",
+        "headers": headers,
+        "multiValueHeaders": {k: [v] for k, v in headers.items()},
+        "requestContext": {"requestId": "c6af9ac6-7b61-11e6-9a41-93e8deadbeef", "stage": "Prod",
+                           "identity": {"sourceIp": "91.108.6.1"}},
+        "body": json.dumps(update, ensure_ascii=False),
+        "isBase64Encoded": False,
+    }
+
+
+def sample_response(text=ANSWER):
+    """Respuesta de sendMessage de la Bot API."""
+    return {"ok": True, "result": {
+        "message_id": 4322, "from": {"id": 7000000001, "is_bot": True, "first_name": "GioBot"},
+        "chat": {"id": 123456789, "first_name": "Ana", "type": "private"}, "date": 1756684801,
+        "text": text, "entities": [{"offset": 3, "length": 30, "type": "bold"}],
+    }}
+
+
+def legacy_logging(logger, event, response, text):
+    """Los registros que hacía una invocación antes de log_utils."""
+    logger.info(f"Received event: {json.dumps(event, indent=2)}")
+    logger.info(f"Processing event: {json.dumps(event, default=str, indent=2)}")
+    body_str = event["body"]
+    logger.info(f"Request body: {body_str}")
+    body_json = json.loads(body_str)
+    logger.info(f"Parsed JSON body: {json.dumps(body_json, default=str, indent=2)}")
+    logger.info(f"Text message received: {body_json['message']['text']}")
+    logger.info(f"Message text: {text[:100]}..." if len(text) > 100 else f"Message text: {text}")
+    logger.info(f"Telegram API response: {json.dumps(response, indent=2)}")
+
+
+def current_logging(logger, event, response, text, rate):
+    """Los mismos puntos de registro con log_utils."""
+    logger.info("Received %s request", event["httpMethod"])
+    log_payload(logger, "Received event", event, rate=rate)
+    body_json = json.loads(event["body"])
+    log_payload(logger, "Parsed JSON body", body_json, level=logging.DEBUG, rate=rate)
+    logger.info("Text message received (%d chars)", len(body_json["message"]["text"]))
+    logger.info("Sending message to chat_id: %s (%d chars)", body_json["message"]["chat"]["id"], len(text))
+    log_payload(logger, "Telegram API response", response, level=logging.DEBUG, rate=rate)
+
+
+class _CountingStream(io.TextIOBase):
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, s):
+        self.bytes += len(s.encode('utf-8'))
+        return len(s)
+
+
+def run(fn, level, invocations):
+    """Ejecuta fn con un logger aislado y devuelve CPU (µs) y bytes por invocación."""
+    logger = logging.getLogger(f"benchmarks.logging_overhead.{id(fn)}.{level}")
+    logger.propagate = False
+    logger.handlers = []
+    stream = _CountingStream()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("[%(levelname)s]\t%(asctime)s\t%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    started = time.process_time()
+    for _ in range(invocations):
+        fn(logger)
+    cpu = time.process_time() - started
+    return {"cpu_us": round(cpu / invocations * 1e6, 2), "log_bytes": round(stream.bytes / invocations, 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invocations", type=int, default=20000)
+    parser.add_argument("--rates", type=float, nargs="+", default=[0.0, 0.01, 1.0])
+    args = parser.parse_args(argv)
+
+    event, response = sample_event(), sample_response()
+    # Verificar que lo registrado ahora no contiene el texto del usuario ni headers
+    written = str(payload(event)) + str(payload(response))
+    assert "comida" not in written and "value-3" not in written and "Pérez" not in written
+
+    print(f"{'level':<8} {'variant':<14} {'cpu µs/inv':>11} {'log B/inv':>10} {'cpu saved':>10} {'bytes saved':>12}")
+    for level in (logging.INFO, logging.DEBUG):
+        name = logging.getLevelName(level)
+        legacy = run(lambda lg: legacy_logging(lg, event, response, ANSWER), level, args.invocations)
+        print(f"{name:<8} {'legacy':<14} {legacy['cpu_us']:>11} {legacy['log_bytes']:>10}")
+        for rate in args.rates:
+            result = run(lambda lg: current_logging(lg, event, response, ANSWER, rate), level, args.invocations)
+            cpu_saved = 1 - result["cpu_us"] / legacy["cpu_us"] if legacy["cpu_us"] else 0.0
+            bytes_saved = 1 - result["log_bytes"] / legacy["log_bytes"]
+            print(f"{name:<8} {f'rate={rate:g}':<14} {result['cpu_us']:>11} {result['log_bytes']:>10} "
+                  f"{cpu_saved:>10.1%} {bytes_saved:>12.1%}")
+
+
+if __name__ == "__main__":
+    main()
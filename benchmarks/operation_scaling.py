@@ -0,0 +1,186 @@
+"""
+Benchmark de escalamiento de las operaciones con ledgers sintéticos.
+
+Para cada tamaño genera un ledger con benchmarks.ledger_generator (se
+reutiliza si ya existe en --data-dir) y, en un intérprete nuevo por tamaño
+para que el pico de RSS sea el de ese tamaño, mide:
+
+- la carga en frío del Ledger (parseo del CSV) y del cubo de agregados,
+- cada función de operation_functions y csv_client.analyze_finances:
+  mediana de --runs corridas en caliente y pico de tracemalloc,
+- el pico de RSS del proceso, comparado con la memoria de la Lambda.
+
+Uso:
+    python -m benchmarks.operation_scaling [--sizes 10000 1000000 10000000] [--runs 3]
+        [--memory-mb 256] [--data-dir /tmp/giobot-bench] [--backend csv|sqlite]
+
+Con --backend sqlite la carga en frío incluye la importación del CSV a la
+base SQLite (services.sqlite_ledger).
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+LAMBDA_MEMORY_MB = 256
+
+# Valores de los parámetros de cada operación, según su nombre
+DEFAULT_PARAMS = {"month": 8, "category": "food"}
+
+# Sin límite de tiempo por tamaño; 10M filas puede tardar varios minutos
+WORKER_TIMEOUT_S = None
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _timed(fn, runs):
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def _traced_peak(fn):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(path, runs=3, trace_allocations=True):
+    """
+    Mide las operaciones sobre el ledger en path, en el proceso actual.
+
+    Debe ejecutarse en un intérprete nuevo: apunta el csv_client del
+    proceso a path.
+
+    Returns:
+        dict: load_s, rollup_s, rows, rss_after_load_mb, operations
+        ({nombre: {seconds, peak_mib}}) y peak_rss_mb.
+    """
+    from services import csv_client
+    from services.ledger_partitions import LedgerPartition
+    from services.operation_registry import get_registry
+
+    csv_client.CSV_FILE = path
+    csv_client._default_partition = LedgerPartition(path, csv_client.LEDGER_JOURNAL_PATH, csv_client.CACHE_DIR,
+                                                    csv_client.LEDGER_DB_PATH, csv_client.LEDGER_BACKEND)
+
+    started = time.perf_counter()
+    rows = len(csv_client.load_ledger())
+    load_s = time.perf_counter() - started
+    started = time.perf_counter()
+    csv_client.load_rollup()
+    rollup_s = time.perf_counter() - started
+    rss_after_load = _peak_rss_mb()
+
+    calls = {}
+    for method, operation in get_registry().operations.items():
+        if operation.writes:
+            # La latencia de escritura se mide en benchmarks.write_latency
+            continue
+        params = {name: DEFAULT_PARAMS[name] for name in operation.params}
+        calls[method] = lambda operation=operation, params=params: operation(**params)
+    calls["csv_client.analyze_finances"] = lambda: csv_client.analyze_finances("¿Cómo van mis finanzas?")
+
+    operations = {}
+    for name, call in calls.items():
+        call()
+        result = {"seconds": round(_timed(call, runs), 6)}
+        if trace_allocations:
+            result["peak_mib"] = round(_traced_peak(call) / 2**20, 2)
+        operations[name] = result
+    return {
+        "rows": rows,
+        "load_s": round(load_s, 3),
+        "rollup_s": round(rollup_s, 3),
+        "rss_after_load_mb": round(rss_after_load, 1),
+        "operations": operations,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def run_size(rows, data_dir, runs=3, trace_allocations=True, seed=42, backend="csv"):
+    """Genera (o reutiliza) el ledger de rows filas y lo mide en un subproceso."""
+    from benchmarks.ledger_generator import generate_ledger
+
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"ledger-{rows}-{seed}.csv")
+    if not os.path.exists(path):
+        generate_ledger(path + ".tmp", rows, seed=seed)
+        os.replace(path + ".tmp", path)
+
+    env = dict(os.environ)
+    # Cubo de agregados en un directorio vacío: la carga se mide en frío
+    env["LEDGER_CACHE_DIR"] = tempfile.mkdtemp(prefix="giobot-scaling-")
+    env["LEDGER_BACKEND"] = backend
+    env.pop("LEDGER_DB_PATH", None)
+    command = [sys.executable, "-m", "benchmarks.operation_scaling", "--worker", path, "--runs", str(runs)]
+    if not trace_allocations:
+        command.append("--no-tracemalloc")
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True,
+                               timeout=WORKER_TIMEOUT_S)
+    if completed.returncode != 0:
+        # Un código negativo suele ser el OOM killer (-9)
+        return {"rows": rows, "error": f"exit {completed.returncode}: {completed.stderr.strip()[-300:]}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _print_size(result, memory_mb):
+    if "error" in result:
+        print(f"{result['rows']:>10} failed: {result['error']}")
+        return
+    over = " OVER LAMBDA MEMORY" if result["peak_rss_mb"] > memory_mb else ""
+    print(f"{result['rows']:>10} rows  load {result['load_s']:.3f} s  rollup {result['rollup_s']:.3f} s  "
+          f"RSS after load {result['rss_after_load_mb']} MB  peak RSS {result['peak_rss_mb']} MB{over}")
+    for name, op in result["operations"].items():
+        peak = f"{op['peak_mib']:>9.2f}" if "peak_mib" in op else f"{'-':>9}"
+        print(f"{'':>10} {name:<36} {op['seconds'] * 1000:>10.2f} ms {peak} MiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--memory-mb", type=float, default=LAMBDA_MEMORY_MB)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "giobot-bench"))
+    parser.add_argument("--no-tracemalloc", action="store_true")
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--output", help="guardar los resultados en JSON")
+    parser.add_argument("--worker", metavar="PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.runs, not args.no_tracemalloc)))
+        return
+
+    results = []
+    for rows in args.sizes:
+        result = run_size(rows, args.data_dir, args.runs, not args.no_tracemalloc, backend=args.backend)
+        _print_size(result, args.memory_mb)
+        results.append(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
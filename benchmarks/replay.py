@@ -0,0 +1,350 @@
+"""
+Benchmark de reproducción offline de app.lambda_handler.
+
+Reproduce un corpus de eventos de webhook (grabados o sintéticos) a través
+de lambda_handler con OpenAI y Telegram reemplazados por stubs
+deterministas en el proceso, con latencia inyectada configurable. Las
+duraciones por etapa salen de las métricas EMF de cada invocación
+(services.metrics), así el benchmark mide exactamente lo que se reporta en
+producción.
+
+Reporta p50/p95/p99 por etapa, CPU total y por evento, asignaciones de
+memoria (tracemalloc, en una pasada aparte para no distorsionar los
+tiempos) y el pico de RSS. Con --compare falla si alguna etapa empeora más
+que --threshold respecto a un reporte guardado con --output.
+
+Uso:
+    python -m benchmarks.replay [--events corpus.jsonl] [--repeat 5] [--llm-latency-ms 0]
+        [--telegram-latency-ms 0] [--output report.json] [--compare baseline.json --threshold 0.1]
+"""
+import argparse
+import hashlib
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from unittest import mock
+
+# Preguntas sintéticas: unas las resuelve el router local y otras el LLM (stub)
+SYNTHETIC_MESSAGES = [
+    "¿Cuánto gasté en agosto?",
+    "ingresos de septiembre",
+    "gastos por categoría de julio",
+    "movimientos de comida en agosto",
+    "gastos de salud por año",
+    "resumen de ingresos y gastos por año",
+    "¿en qué se me fue la plata el mes pasado?",
+    "dame un consejo para ahorrar en restaurantes",
+]
+
+# Decisión del stub de enrutamiento para los mensajes que llegan al LLM
+SYNTHETIC_ROUTES = {
+    "¿en qué se me fue la plata el mes pasado?": {"operation": "expenses_by_category_by_month",
+                                                  "params": {"month": "agosto"}},
+}
+DEFAULT_ROUTE = {"operation": "incomes_expenses_by_year"}
+
+ROUTING_MARKER = "Interpreta cuál de la lista de operaciones"
+STAGE_SUFFIX = "_ms"
+PERCENTILES = (50, 95, 99)
+
+DEFAULT_THRESHOLD = 0.10
+# Diferencias menores a esto son ruido, aunque superen el umbral relativo
+MIN_DELTA_MS = 1.0
+
+
+def synthetic_events(messages=SYNTHETIC_MESSAGES, chat_id=123456789):
+    """Eventos de API Gateway con un update de Telegram por mensaje."""
+    return [
+        {
+            "httpMethod": "POST",
+            "path": "/webhook",
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps({"update_id": i, "message": {
+                "message_id": i, "date": 1756684800 + i, "text": text,
+                "chat": {"id": chat_id, "type": "private"},
+            }}, ensure_ascii=False),
+            "isBase64Encoded": False,
+        }
+        for i, text in enumerate(messages, start=1)
+    ]
+
+
+def load_events(path):
+    """
+    Lee un corpus JSONL: eventos de API Gateway o updates de Telegram, que
+    se envuelven en un evento POST.
+    """
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "httpMethod" not in record:
+                record = {"httpMethod": "POST", "body": json.dumps(record, ensure_ascii=False),
+                          "isBase64Encoded": False}
+            events.append(record)
+    return events
+
+
+def _with_update_id(event, update_id):
+    """Copia del evento con otro update_id, para que la deduplicación no lo descarte."""
+    if event.get("isBase64Encoded"):
+        return event
+    try:
+        body = json.loads(event.get("body") or "")
+    except ValueError:
+        return event
+    if not isinstance(body, dict):
+        return event
+    body["update_id"] = update_id
+    return {**event, "body": json.dumps(body, ensure_ascii=False)}
+
+
+class ReplayContext:
+    """Contexto tipo Lambda con un presupuesto fijo por invocación."""
+
+    def __init__(self, budget_ms=30000):
+        self._ends_at = time.monotonic() + budget_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._ends_at - time.monotonic()) * 1000))
+
+
+class Stubs:
+    """
+    Reemplazos deterministas de OpenAI y Telegram.
+
+    Args:
+        llm_latency_ms (float): Espera de cada llamada al LLM (en el stream,
+            repartida entre los fragmentos).
+        telegram_latency_ms (float): Espera de cada llamada a Telegram.
+        routes (dict): {mensaje: decisión} del stub de enrutamiento.
+    """
+
+    def __init__(self, llm_latency_ms=0.0, telegram_latency_ms=0.0, routes=None, chunks=8):
+        self.llm_latency_ms = llm_latency_ms
+        self.telegram_latency_ms = telegram_latency_ms
+        self.routes = SYNTHETIC_ROUTES if routes is None else routes
+        self.chunks = chunks
+        self.calls = {"llm": 0, "telegram": 0}
+
+    @staticmethod
+    def _wait(ms):
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def _answer(self, prompt):
+        digest = hashlib.sha1(prompt.encode('utf-8')).hexdigest()
+        return f"📊 *Resumen* ({digest[:8]})\n\n" + "\n".join(
+            f"• Línea {i}: $ {int(digest[i:i + 4], 16) * 100:,}".replace(",", ".") for i in range(12))
+
+    def get_ai_response(self, prompt, timeout=None):
+        self.calls["llm"] += 1
+        self._wait(self.llm_latency_ms)
+        if ROUTING_MARKER in prompt:
+            route = next((r for message, r in self.routes.items() if f"'{message}'" in prompt), DEFAULT_ROUTE)
+            return json.dumps(route, ensure_ascii=False)
+        return self._answer(prompt)
+
+    def stream_ai_response(self, prompt, timeout=None):
+        self.calls["llm"] += 1
+        text = self._answer(prompt)
+        size = -(-len(text) // self.chunks)
+        for start in range(0, len(text), size):
+            self._wait(self.llm_latency_ms / self.chunks)
+            yield text[start:start + size]
+
+    def telegram(self, *args, **kwargs):
+        self.calls["telegram"] += 1
+        self._wait(self.telegram_latency_ms)
+        return {"ok": True, "result": {"message_id": self.calls["telegram"]}}
+
+
+@contextmanager
+def stubbed_services(stubs, records):
+    """
+    Reemplaza OpenAI y Telegram por los stubs y guarda en records las
+    métricas de cada invocación en vez de escribirlas en stdout.
+    """
+    from handlers import message_handler
+    from services import metrics, telegram_stream
+
+    def collect(invocation):
+        records.append(invocation.to_emf())
+        metrics.finish_invocation(invocation)
+
+    with ExitStack() as stack:
+        patch = lambda target, name, value: stack.enter_context(mock.patch.object(target, name, value))
+        patch(message_handler, "get_ai_response", stubs.get_ai_response)
+        patch(message_handler, "stream_ai_response", stubs.stream_ai_response)
+        patch(message_handler, "send_message_to_telegram", stubs.telegram)
+        patch(message_handler, "send_chat_action_to_telegram", stubs.telegram)
+        patch(telegram_stream, "send_message_to_telegram", stubs.telegram)
+        patch(telegram_stream, "edit_message_in_telegram", stubs.telegram)
+        patch(message_handler, "finish_invocation", collect)
+        patch(metrics, "METRICS_ENABLED", False)
+        yield
+
+
+def percentile(values, p):
+    """Percentil p por rango más cercano de una lista de valores."""
+    ordered = sorted(values)
+    index = max(0, -(-len(ordered) * p // 100) - 1)
+    return ordered[index]
+
+
+def summarize(records):
+    """{etapa: {count, p50, p95, p99}} a partir de las métricas EMF."""
+    stages = {}
+    for record in records:
+        for name, value in record.items():
+            if name.endswith(STAGE_SUFFIX) and isinstance(value, (int, float)):
+                stages.setdefault(name[:-len(STAGE_SUFFIX)], []).append(value)
+    return {
+        stage: {"count": len(values), **{f"p{p}": round(percentile(values, p), 3) for p in PERCENTILES}}
+        for stage, values in sorted(stages.items())
+    }
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB y macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def replay(events, repeat=1, stubs=None, budget_ms=30000, trace_allocations=True):
+    """
+    Reproduce los eventos repeat veces a través de lambda_handler.
+
+    Returns:
+        dict: stages (percentiles por etapa), events, status codes, cpu_ms,
+        cpu_ms_per_event, wall_ms, llm y telegram calls, allocations y
+        peak_rss_mb.
+    """
+    import app
+
+    stubs = stubs or Stubs()
+    records = []
+    statuses = {}
+    update_id = int(time.time() * 1000)
+    with stubbed_services(stubs, records):
+        # Primera invocación fuera de la medición: imports y carga del ledger
+        app.lambda_handler(_with_update_id(events[0], update_id), ReplayContext(budget_ms))
+        records.clear()
+        stubs.calls = {"llm": 0, "telegram": 0}
+
+        cpu_started, wall_started = time.process_time(), time.perf_counter()
+        for _ in range(repeat):
+            for event in events:
+                update_id += 1
+                response = app.lambda_handler(_with_update_id(event, update_id), ReplayContext(budget_ms))
+                status = str(response.get("statusCode"))
+                statuses[status] = statuses.get(status, 0) + 1
+        cpu_ms = (time.process_time() - cpu_started) * 1000
+        wall_ms = (time.perf_counter() - wall_started) * 1000
+        calls = dict(stubs.calls)
+        stages = summarize(records)
+
+        allocations = None
+        if trace_allocations:
+            tracemalloc.start()
+            try:
+                for event in events:
+                    update_id += 1
+                    app.lambda_handler(_with_update_id(event, update_id), ReplayContext(budget_ms))
+                current, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            allocations = {"traced_kb_per_event": round(current / 1024 / len(events), 1),
+                           "peak_kb": round(peak / 1024, 1)}
+
+    total = repeat * len(events)
+    return {
+        "events": total,
+        "status": statuses,
+        "stages": stages,
+        "cpu_ms": round(cpu_ms, 1),
+        "cpu_ms_per_event": round(cpu_ms / total, 3),
+        "wall_ms": round(wall_ms, 1),
+        "calls": calls,
+        "allocations": allocations,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def compare(report, baseline, threshold=DEFAULT_THRESHOLD, min_delta_ms=MIN_DELTA_MS):
+    """
+    Compara un reporte con uno anterior.
+
+    Una etapa regresa si su p50 o p95 supera el de la línea base en más de
+    threshold (relativo) y en más de min_delta_ms (absoluto). También se
+    compara el CPU por evento.
+
+    Returns:
+        list: Descripción de cada regresión; vacía si no hay.
+    """
+    regressions = []
+    for stage, base in baseline.get("stages", {}).items():
+        current = report["stages"].get(stage)
+        if current is None:
+            continue
+        for key in ("p50", "p95"):
+            before, after = base[key], current[key]
+            if after > before * (1 + threshold) and after - before > min_delta_ms:
+                regressions.append(f"{stage} {key}: {before:.2f} -> {after:.2f} ms "
+                                   f"(+{(after / before - 1) if before else float('inf'):.0%})")
+    before, after = baseline.get("cpu_ms_per_event"), report["cpu_ms_per_event"]
+    if before and after > before * (1 + threshold) and after - before > min_delta_ms:
+        regressions.append(f"cpu per event: {before:.2f} -> {after:.2f} ms (+{after / before - 1:.0%})")
+    return regressions
+
+
+def _print_report(report):
+    print(f"{'stage':<22} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<22} {s['count']:>6} {s['p50']:>9.2f} {s['p95']:>9.2f} {s['p99']:>9.2f}")
+    print(f"events {report['events']}  status {report['status']}  calls {report['calls']}")
+    print(f"cpu {report['cpu_ms']} ms ({report['cpu_ms_per_event']} ms/event)  wall {report['wall_ms']} ms  "
+          f"peak RSS {report['peak_rss_mb']} MB  allocations {report['allocations']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", help="JSONL con eventos de API Gateway o updates de Telegram")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--telegram-latency-ms", type=float, default=0.0)
+    parser.add_argument("--budget-ms", type=float, default=30000)
+    parser.add_argument("--no-tracemalloc", action="store_true")
+    parser.add_argument("--output", help="guardar el reporte JSON (línea base para --compare)")
+    parser.add_argument("--compare", help="reporte anterior contra el cual comparar")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    # El webhook procesa en línea; sin cola ni métricas en stdout
+    os.environ.pop("MESSAGE_QUEUE", None)
+    events = load_events(args.events) if args.events else synthetic_events()
+    stubs = Stubs(args.llm_latency_ms, args.telegram_latency_ms)
+    report = replay(events, args.repeat, stubs, args.budget_ms, trace_allocations=not args.no_tracemalloc)
+    _print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No stage regressed more than {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark de la latencia de registrar un movimiento según el tamaño del ledger.
+
+Para cada tamaño genera un ledger con benchmarks.ledger_generator (se
+reutiliza si ya existe en --data-dir) y, en un intérprete nuevo con el diario
+y los agregados en un directorio vacío, mide:
+
+- cada llamada a csv_client.append_movement (diario con fsync más la
+  actualización incremental del Ledger, del cubo y de la base SQLite
+  cargados): mediana, p95 y máximo de --writes escrituras,
+- una consulta agregada y una de filas después de las escrituras,
+- la reconstrucción completa de los agregados, que es lo que costaba antes
+  cada movimiento nuevo (editar el CSV y redesplegar invalidaba todo).
+
+La latencia de escritura no debe crecer con el tamaño del ledger.
+
+Uso:
+    python -m benchmarks.write_latency [--sizes 10000 100000 1000000] [--writes 200]
+        [--data-dir /tmp/giobot-bench] [--backend csv|sqlite]
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.replay import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def _ms(started):
+    return (time.perf_counter() - started) * 1000
+
+
+def measure(path, writes=200):
+    """
+    Registra writes movimientos sobre el ledger en path, en el proceso actual.
+
+    Debe ejecutarse en un intérprete nuevo: apunta el csv_client del
+    proceso a path y a un diario vacío.
+
+    Returns:
+        dict: rows, load_ms, write_ms ({p50, p95, max}), query_ms, rows_query_ms
+        y rebuild_ms.
+    """
+    from services import csv_client, operations_client
+    from services.ledger_partitions import LedgerPartition
+
+    csv_client.CSV_FILE = path
+    partition = LedgerPartition(path, csv_client.LEDGER_JOURNAL_PATH, csv_client.CACHE_DIR,
+                                csv_client.LEDGER_DB_PATH, csv_client.LEDGER_BACKEND)
+    csv_client._default_partition = partition
+
+    started = time.perf_counter()
+    rows = len(csv_client.load_ledger())
+    csv_client.load_rollup()
+    load_ms = _ms(started)
+    # Índices del cubo que usan las operaciones, construidos antes de escribir
+    operations_client.expenses_by_month(8)
+    operations_client.movements_by_category_and_month("food", 8)
+
+    day = datetime.date(2025, 8, 1)
+    times = []
+    for i in range(writes):
+        started = time.perf_counter()
+        csv_client.append_movement("expensive", 1_000_000 + i * 100, "food", day, f"benchmark {i}")
+        times.append(_ms(started))
+
+    started = time.perf_counter()
+    operations_client.expenses_by_month(8)
+    query_ms = _ms(started)
+    started = time.perf_counter()
+    operations_client.movements_by_category_and_month("food", 8)
+    rows_query_ms = _ms(started)
+
+    # Antes: cada movimiento nuevo reconstruía los agregados desde el CSV
+    store = partition.store_cache.peek()
+    if store is not None:
+        store.close()
+    for cache in (partition.ledger_cache, partition.rollup_cache, partition.store_cache):
+        cache.invalidate()
+    for name in os.listdir(partition.cache_dir):
+        if name.startswith("rollup-") or name.startswith(os.path.basename(partition.db_path)):
+            os.remove(os.path.join(partition.cache_dir, name))
+    started = time.perf_counter()
+    csv_client.load_ledger()
+    csv_client.load_rollup()
+    rebuild_ms = _ms(started)
+
+    return {
+        "rows": rows,
+        "load_ms": round(load_ms, 1),
+        "write_ms": {
+            "p50": round(percentile(times, 50), 3),
+            "p95": round(percentile(times, 95), 3),
+            "max": round(max(times), 3),
+        },
+        "query_ms": round(query_ms, 3),
+        "rows_query_ms": round(rows_query_ms, 3),
+        "rebuild_ms": round(rebuild_ms, 1),
+    }
+
+
+def run_size(rows, data_dir, writes=200, seed=42, backend="csv"):
+    """Genera (o reutiliza) el ledger de rows filas y lo mide en un subproceso."""
+    from benchmarks.ledger_generator import generate_ledger
+
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"ledger-{rows}-{seed}.csv")
+    if not os.path.exists(path):
+        generate_ledger(path + ".tmp", rows, seed=seed)
+        os.replace(path + ".tmp", path)
+
+    env = dict(os.environ)
+    # Diario, cubo y base SQLite en un directorio vacío
+    env["LEDGER_CACHE_DIR"] = tempfile.mkdtemp(prefix="giobot-writes-")
+    env["LEDGER_JOURNAL_PATH"] = os.path.join(env["LEDGER_CACHE_DIR"], "journal.csv")
+    env["LEDGER_BACKEND"] = backend
+    env.pop("LEDGER_DB_PATH", None)
+    command = [sys.executable, "-m", "benchmarks.write_latency", "--worker", path, "--writes", str(writes)]
+    completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"rows": rows, "error": f"exit {completed.returncode}: {completed.stderr.strip()[-300:]}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _print_size(result):
+    if "error" in result:
+        print(f"{result['rows']:>10} failed: {result['error']}")
+        return
+    write = result["write_ms"]
+    print(f"{result['rows']:>10} rows  write p50 {write['p50']:.2f} ms  p95 {write['p95']:.2f} ms  "
+          f"max {write['max']:.2f} ms  query {result['query_ms']:.2f} ms  rows query {result['rows_query_ms']:.2f} ms  "
+          f"full rebuild {result['rebuild_ms']:.0f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "giobot-bench"))
+    parser.add_argument("--backend", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--output", help="guardar los resultados en JSON")
+    parser.add_argument("--worker", metavar="PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.writes)))
+        return
+
+    results = []
+    for rows in args.sizes:
+        result = run_size(rows, args.data_dir, args.writes, backend=args.backend)
+        _print_size(result)
+        results.append(result)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
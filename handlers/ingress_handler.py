@@ -0,0 +1,50 @@
+# Ingress del webhook: valida el update, lo encola y responde a Telegram de
+# inmediato. Solo usa módulos livianos; el pipeline corre en el worker.
+import json
+import logging
+import time
+from handlers.telegram_handler import extract_message
+
+logger = logging.getLogger()
+
+
+def handle_ingress(event, context, queue):
+    """
+    Validates a webhook POST and enqueues it for the worker.
+
+    Args:
+        event (dict): API Gateway event with the Telegram update.
+        context: Lambda context (unused).
+        queue: Queue with a send(body) method (see services.message_queue).
+
+    Returns:
+        dict: 200 once queued, 400 for an invalid update, 500 if the queue
+        rejects it so Telegram retries the delivery.
+    """
+    try:
+        chat_id, _ = extract_message(event)
+    except ValueError as ve:
+        logger.error(f"Message extraction failed: {str(ve)}")
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": f"Invalid message format: {str(ve)}"})
+        }
+
+    try:
+        message_id = queue.send({
+            "body": event.get("body", ""),
+            "isBase64Encoded": event.get("isBase64Encoded", False),
+            "enqueued_at": time.time(),
+        })
+    except Exception as e:
+        logger.error(f"Could not enqueue message from chat {chat_id}: {str(e)}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": "Internal server error"})
+        }
+
+    logger.info(f"Queued message {message_id} from chat {chat_id}")
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"status": "queued"})
+    }
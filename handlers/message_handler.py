@@ -0,0 +1,295 @@
+# Pipeline de procesamiento de mensajes de Telegram.
+# Este módulo importa las dependencias pesadas (pandas, OpenAI, requests), por
+# eso app.lambda_handler solo lo importa cuando llega un POST.
+import json
+import logging
+import os
+import time
+from dotenv import load_dotenv
+from handlers.telegram_handler import extract_message, extract_update_id
+from services.telegram_client import (
+    send_message_to_telegram,
+    send_chat_action_to_telegram,
+    get_telegram_client,
+    TelegramError,
+)
+from services.openai_client import get_ai_response, stream_ai_response, analyze_finances, AI_ERROR_RESPONSE
+from services.telegram_stream import stream_to_telegram
+from services.operations_client import get_categories, analize_operation_prompt
+from services.operation_registry import get_registry, InvalidParams
+from services.intent_router import route_message, router_stats
+from services.routing_cache import routing_cache
+from services.answer_cache import answer_cache
+from services.csv_client import ledger_version, partition_stats
+from services.ledger_partitions import chat_scope, set_current_chat
+from services.deadline import Deadline, SEND_RESERVE_MS, ROUTING_MIN_MS, NARRATION_MIN_MS
+from services.answer_formatter import format_result
+from services.idempotency import idempotency_guard
+from services.log_utils import payload
+from services.metrics import start_invocation, finish_invocation, current_metrics
+
+logger = logging.getLogger()
+
+# Cargar variables de entorno
+load_dotenv()
+
+# Mostrar la respuesta final en Telegram a medida que OpenAI la genera
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', '1').lower() in ('1', 'true', 'yes')
+
+TIMEOUT_RESPONSE = "⏳ No alcancé a procesar tu pregunta a tiempo. Por favor, inténtalo de nuevo."
+
+
+def _route_with_llm(registry, message_text, timeout=None):
+    """Asks the LLM which operation the message requests and parses its JSON answer."""
+    prompt = analize_operation_prompt(registry.prompt, message_text)
+    operation_response_str = get_ai_response(prompt, timeout=timeout)
+    logger.info("Operation response from AI: %s", operation_response_str)
+    try:
+        # Extraer el JSON del string, que puede contener markdown
+        json_start = operation_response_str.find('{')
+        json_end = operation_response_str.rfind('}') + 1
+        if json_start != -1 and json_end > json_start:
+            json_str = operation_response_str[json_start:json_end]
+            operation_result = json.loads(json_str)
+        else:
+            operation_result = {}
+            logger.warning("No JSON object found in operation_response_str.")
+    except json.JSONDecodeError as e:
+        logger.error(f"Error decoding JSON: {e} from string: {operation_response_str}")
+        operation_result = {}
+    return operation_result
+
+
+def handle_message_event(event, context):
+    """Procesa un POST del webhook de Telegram y responde al chat.
+
+    Un update_id ya procesado o en proceso se descarta antes de cualquier
+    llamada a OpenAI, así un reintento de Telegram no genera otra respuesta.
+    """
+    metrics = start_invocation()
+    update_id = extract_update_id(event)
+    if not idempotency_guard.begin(update_id):
+        logger.info(f"Idempotency stats: {idempotency_guard.stats()}")
+        metrics.put("duplicate_update", 1)
+        finish_invocation(metrics)
+        return {
+            "statusCode": 200,
+            "body": json.dumps({"status": "success", "message": "Duplicate update ignored"})
+        }
+
+    response = None
+    outcome = {"written": False}
+    try:
+        # El ledger que consultan las operaciones es el del chat del mensaje
+        with chat_scope():
+            response = _process_message_event(event, context, outcome)
+        return response
+    finally:
+        # Tras un error interno se libera el update para que un reintento lo
+        # procese, salvo que ya haya registrado un movimiento: repetirlo lo
+        # duplicaría en el diario
+        if (response is None or response["statusCode"] >= 500) and not outcome["written"]:
+            idempotency_guard.release(update_id)
+        else:
+            idempotency_guard.complete(update_id)
+        metrics.set_property("status_code", response["statusCode"] if response else 500)
+        ledgers = partition_stats()
+        if ledgers["resident"]:
+            metrics.put("ledgers_resident", ledgers["resident"])
+            metrics.put("ledgers_resident_bytes", ledgers["resident_bytes"], "Bytes")
+        finish_invocation(metrics)
+
+
+def _process_message_event(event, context, outcome):
+    # Cada etapa usa solo el tiempo que deja libre el envío final a Telegram
+    deadline = Deadline.from_context(context)
+    metrics = current_metrics()
+    try:
+        # Operations compiled once per process from operations.json
+        with metrics.span("get_operations"):
+            registry = get_registry()
+
+        # Extraemos chatid y mensaje del evento
+        try:
+            with metrics.span("extract_message"):
+                chat_id, message_text = extract_message(event)
+            set_current_chat(chat_id)
+            logger.info("Processing message from chat %s (%d chars)", chat_id, len(message_text))
+        except ValueError as ve:
+            logger.error(f"Message extraction failed: {str(ve)}")
+            return {
+                "statusCode": 400,
+                "body": json.dumps({"error": f"Invalid message format: {str(ve)}"})
+            }
+        
+        # Handle special message types
+        if message_text == "[VOICE_MESSAGE]":
+            send_message_to_telegram(chat_id, "⚠️ Los mensajes de voz no están soportados. Por favor, envía un mensaje de texto.")
+            return {
+                "statusCode": 200,
+                "body": json.dumps({"status": "success", "message": "Voice message handled"})
+            }
+        elif message_text.startswith("[UNSUPPORTED_MESSAGE]") or message_text.startswith("[ERROR]"):
+            send_message_to_telegram(chat_id, "⚠️ Este tipo de mensaje no es compatible. Por favor, envía un mensaje de texto.")
+            return {
+                "statusCode": 200,
+                "body": json.dumps({"status": "success", "message": "Unsupported message type handled"})
+            }
+        
+        # "escribiendo..." mientras se calcula la respuesta; no es crítico
+        try:
+            with metrics.span("chat_action"):
+                send_chat_action_to_telegram(chat_id, timeout=deadline.timeout(SEND_RESERVE_MS, cap=2))
+        except TelegramError as e:
+            logger.warning(f"Could not send chat action: {str(e)}")
+
+        # 1. Determine which operation to execute based on the user's message.
+        # The local router answers confident cases without calling OpenAI,
+        # and repeated questions reuse the LLM's earlier decision.
+        with metrics.span("route_local"):
+            operation_result = route_message(message_text, get_categories())
+            routing_source = "local"
+            if operation_result is None:
+                operation_result = routing_cache.get(message_text)
+                routing_source = "cache"
+        if operation_result is None:
+            routing_source = "llm"
+            if not deadline.has_time(ROUTING_MIN_MS, SEND_RESERVE_MS):
+                logger.warning(f"Only {deadline.remaining_ms():.0f} ms left, skipping LLM routing")
+                metrics.set_property("degraded", "routing_skipped")
+                send_message_to_telegram(chat_id, TIMEOUT_RESPONSE, timeout=deadline.timeout())
+                return {
+                    "statusCode": 200,
+                    "body": json.dumps({"status": "success", "message": "Timed out before routing"})
+                }
+            with metrics.span("route_llm"):
+                operation_result = _route_with_llm(registry, message_text, timeout=deadline.timeout(SEND_RESERVE_MS))
+            # A write is not cached: replaying it later would resolve "hoy" to a stale date
+            routed = registry.get(operation_result.get("operation"))
+            if routed is not None and not routed.writes:
+                routing_cache.put(message_text, operation_result)
+        logger.info(f"Router stats: {router_stats()}, routing cache: {routing_cache.stats()}")
+        metrics.set_property("routing", routing_source)
+        metrics.put("routing_cache_hit", int(routing_source == "cache"))
+
+        # 2. Execute the identified operation
+        operation_name = operation_result.get("operation")
+        operation_params = operation_result.get("params")
+        operation = registry.get(operation_name)
+        params_error = None
+        if operation is not None:
+            # Invalid params are answered as an error instead of failing inside the operation
+            try:
+                operation_params = operation.coerce(operation_params, get_categories())
+            except InvalidParams as e:
+                params_error = str(e)
+                logger.warning(f"Rejected params for '{operation_name}': {params_error}")
+                metrics.set_property("invalid_params", True)
+        logger.info("Operation: %s, params: %s", operation_name, operation_params)
+        metrics.set_property("operation", operation_name)
+
+        # The same operation over the same ledger version gets the same answer,
+        # so a cached text skips both the operation and the narration call.
+        # Writes are never answered from the cache.
+        writes = operation is not None and operation.writes
+        version = ledger_version() if operation is not None and params_error is None and not writes else None
+        final_response = answer_cache.get(operation_name, operation_params, version)
+        logger.info(json.dumps({
+            "answer_cache": "hit" if final_response is not None else "miss",
+            **answer_cache.stats(),
+        }))
+        metrics.put("answer_cache_hit", int(final_response is not None))
+
+        if final_response is None:
+            if params_error is not None:
+                data = {"error": params_error}
+            elif operation is not None:
+                with metrics.span("operation"):
+                    data = operation(**operation_params)
+                if writes and isinstance(data, dict) and data.get("status") == "recorded":
+                    outcome["written"] = True
+            else:
+                data = {"error": f"Operation '{operation_name}' not found."}
+                logger.error(f"Operation '{operation_name}' not found.")
+
+            logger.debug("Data from operation '%s': %s", operation_name, payload(data))
+            metrics.put("result_bytes", len(json.dumps(data, ensure_ascii=False, default=str)), "Bytes")
+            # 3. Generate the final response for the user based on the operation result
+            final_prompt = analyze_finances(message_text, data)
+            logger.debug("Final prompt: %s", final_prompt)
+
+            started = time.perf_counter()
+            sent = complete = False
+            if writes:
+                # La confirmación de un registro no necesita al LLM
+                final_response = format_result(data)
+            elif not deadline.has_time(NARRATION_MIN_MS, SEND_RESERVE_MS):
+                # Sin tiempo para el LLM: respuesta formateada localmente
+                logger.warning(f"Only {deadline.remaining_ms():.0f} ms left, sending a locally formatted answer")
+                final_response = format_result(data)
+                metrics.set_property("degraded", "local_answer")
+            elif STREAM_RESPONSES:
+                # The streamer sends and edits the Telegram message itself
+                with metrics.span("narration_stream"):
+                    streamed = stream_to_telegram(
+                        chat_id,
+                        stream_ai_response(final_prompt, timeout=deadline.timeout(SEND_RESERVE_MS)),
+                        deadline=deadline,
+                        reserve_ms=SEND_RESERVE_MS,
+                    )
+                final_response = streamed["text"]
+                metrics.put("first_visible_ms", streamed["first_visible_ms"], "Milliseconds")
+                sent = True
+                # Una respuesta que Telegram no aceptó no se guarda para repetirla
+                complete = not streamed["truncated"] and streamed["delivered"]
+            else:
+                with metrics.span("narration"):
+                    final_response = get_ai_response(final_prompt, timeout=deadline.timeout(SEND_RESERVE_MS))
+                complete = True
+                if final_response == AI_ERROR_RESPONSE:
+                    final_response = format_result(data)
+                    complete = False
+            latency_ms = (time.perf_counter() - started) * 1000
+            logger.debug("Final response: %s", final_response)
+            if complete and not final_response.endswith(AI_ERROR_RESPONSE):
+                answer_cache.put(operation_name, operation_params, version, final_response, latency_ms)
+        else:
+            sent = False
+
+        # Enviamos la respuesta a Telegram
+        if not sent:
+            with metrics.span("send"):
+                send_message_to_telegram(chat_id, final_response, timeout=deadline.timeout())
+        metrics.put("response_chars", len(final_response))
+        logger.info("Response sent successfully")
+        logger.info(f"Telegram API stats: {get_telegram_client().stats()}")
+
+        return {
+            "statusCode": 200,
+            "body": json.dumps({"status": "success", "message": "Mensaje procesado correctamente"})
+        }
+
+    except ValueError as e:
+        error_msg = str(e)
+        logger.error(f"Validation error: {error_msg}")
+        if chat_id and chat_id != 0:  # Only send error if we have a valid chat_id
+            send_message_to_telegram(chat_id, f"⚠️ Error: {error_msg}")
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": error_msg})
+        }
+    except Exception as e:
+        error_msg = f"Error processing request: {str(e)}"
+        logger.error(error_msg)
+        # Si falló Telegram (ya con reintentos), otro envío también fallaría.
+        # El worker pide avisar solo en la última entrega: las anteriores se reintentan
+        notify = event.get("notifyErrors", True)
+        if notify and not isinstance(e, TelegramError) and 'chat_id' in locals() and chat_id and chat_id != 0:  # Only send error if we have a valid chat_id
+            try:
+                send_message_to_telegram(chat_id, "❌ Lo siento, ha ocurrido un error al procesar tu mensaje. Por favor, inténtalo de nuevo.")
+            except TelegramError as send_error:
+                logger.error(f"Could not send error message: {str(send_error)}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": "Internal server error"})
+        }
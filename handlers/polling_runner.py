@@ -0,0 +1,212 @@
+# Runner alternativo a la Lambda: obtiene updates con long polling (getUpdates)
+# y los procesa en paralelo con el mismo pipeline que lambda_handler.
+#
+#   python -m handlers.polling_runner --concurrency 8
+#
+# Telegram no entrega updates por getUpdates mientras haya un webhook
+# configurado; --delete-webhook lo elimina antes de empezar.
+import argparse
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from handlers.message_handler import handle_message_event
+from services.telegram_client import get_telegram_client
+
+logger = logging.getLogger()
+
+# Tiempo que cada update tiene para completarse, como el timeout del worker
+UPDATE_BUDGET_MS = 60000
+
+
+class TelegramUpdateSource:
+    """Fetches updates from Telegram with getUpdates long polling."""
+
+    def __init__(self, client=None, poll_timeout=25, limit=100):
+        self.client = client or get_telegram_client()
+        self.poll_timeout = poll_timeout
+        self.limit = limit
+
+    def fetch(self, offset):
+        payload = {"timeout": self.poll_timeout, "limit": self.limit, "allowed_updates": ["message"]}
+        if offset is not None:
+            payload["offset"] = offset
+        return self.client.call("getUpdates", payload, budget=self.poll_timeout + 10).get("result", [])
+
+
+class FakeUpdateSource:
+    """Serves predefined batches of updates, for tests and local benchmarks."""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+
+    def fetch(self, offset):
+        batch = self.batches.pop(0) if self.batches else []
+        return [u for u in batch if offset is None or u["update_id"] >= offset]
+
+
+class _UpdateContext:
+    """Minimal Lambda-like context so the pipeline can compute its deadline."""
+
+    def __init__(self, budget_ms):
+        self._ends_at = time.monotonic() + budget_ms / 1000
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._ends_at - time.monotonic()) * 1000))
+
+
+def _chat_id(update):
+    message = update.get("message") or {}
+    return (message.get("chat") or {}).get("id")
+
+
+class PollingRunner:
+    """
+    Processes Telegram updates concurrently while keeping per-chat order.
+
+    Updates of the same chat run one after another in arrival order; updates
+    of different chats run in parallel, at most `concurrency` at a time. The
+    pipeline is synchronous, so each update runs in a worker thread.
+
+    The offset sent to getUpdates (which confirms the updates before it to
+    Telegram) only moves past updates that finished, so a restart gets the
+    unfinished ones again. No new batch is fetched while `concurrency`
+    updates are pending.
+
+    Args:
+        source: Object with fetch(offset) returning a list of updates.
+        handler (callable): Pipeline taking (event, context), by default
+            the same handle_message_event used by lambda_handler.
+        concurrency (int): Maximum updates processed at the same time.
+    """
+
+    def __init__(self, source, handler=handle_message_event, concurrency=8, update_budget_ms=UPDATE_BUDGET_MS):
+        self.source = source
+        self.handler = handler
+        self.concurrency = concurrency
+        self.update_budget_ms = update_budget_ms
+        self.offset = None
+        # update_id de los updates en proceso y siguiente update_id no visto
+        self._in_flight = set()
+        self._seen_until = None
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="update")
+        self._semaphore = None
+        self._last_by_chat = {}
+        self._stats = {"processed": 0, "failed": 0, "batches": 0}
+
+    def _run_handler(self, update):
+        event = {"httpMethod": "POST", "body": json.dumps(update), "isBase64Encoded": False}
+        return self.handler(event, _UpdateContext(self.update_budget_ms))
+
+    async def _process(self, update, previous):
+        if previous is not None:
+            # Mismo chat: esperar al update anterior sin ocupar un cupo
+            await asyncio.gather(previous, return_exceptions=True)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            try:
+                response = await loop.run_in_executor(self._executor, self._run_handler, update)
+                failed = response is None or response.get("statusCode", 500) >= 500
+            except Exception as e:
+                logger.error(f"Update {update.get('update_id')} failed: {str(e)}")
+                failed = True
+        self._stats["failed" if failed else "processed"] += 1
+
+    def _schedule(self, update):
+        chat_id = _chat_id(update)
+        previous = self._last_by_chat.get(chat_id)
+        if previous is not None and previous.done():
+            previous = None
+        task = asyncio.create_task(self._process(update, previous))
+        self._last_by_chat[chat_id] = task
+        task.add_done_callback(lambda done: self._forget(chat_id, done))
+        return task
+
+    def _forget(self, chat_id, task):
+        # Solo si no llegó otro update del chat mientras tanto
+        if self._last_by_chat.get(chat_id) is task:
+            del self._last_by_chat[chat_id]
+
+    def _finished(self, update_id):
+        self._in_flight.discard(update_id)
+        self._advance_offset()
+
+    def _advance_offset(self):
+        # Telegram descarta todo lo anterior al offset: nunca pasar un update sin terminar
+        self.offset = min(self._in_flight) if self._in_flight else self._seen_until
+
+    async def run(self, max_batches=None):
+        """
+        Polls and processes updates until max_batches getUpdates calls were
+        made (forever when None), then waits for the pending updates.
+
+        Returns:
+            dict: processed, failed and batches counters, elapsed seconds and
+            updates per second.
+        """
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        pending = set()
+        while max_batches is None or self._stats["batches"] < max_batches:
+            while len(pending) >= self.concurrency:
+                # Sin cupo: no pedir más updates hasta que alguno termine
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            self._stats["batches"] += 1
+            try:
+                updates = await loop.run_in_executor(None, self.source.fetch, self.offset)
+            except Exception as e:
+                logger.error(f"getUpdates failed: {str(e)}")
+                await asyncio.sleep(1)
+                continue
+            # Con el offset detenido en un update lento, Telegram repite los ya programados
+            fresh = [u for u in sorted(updates, key=lambda u: u["update_id"])
+                     if self._seen_until is None or u["update_id"] >= self._seen_until]
+            if updates and not fresh and pending:
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for update in fresh:
+                update_id = update["update_id"]
+                self._in_flight.add(update_id)
+                self._seen_until = update_id + 1
+                task = self._schedule(update)
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                task.add_done_callback(lambda _, update_id=update_id: self._finished(update_id))
+            self._advance_offset()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+        done = self._stats["processed"] + self._stats["failed"]
+        return {**self._stats, "elapsed_s": round(elapsed, 3),
+                "updates_per_s": round(done / elapsed, 2) if elapsed else 0.0}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the bot with getUpdates long polling")
+    parser.add_argument("--concurrency", type=int, default=8, help="updates processed at the same time")
+    parser.add_argument("--poll-timeout", type=int, default=25, help="long polling timeout in seconds")
+    parser.add_argument("--max-batches", type=int, default=None, help="stop after this many getUpdates calls")
+    parser.add_argument("--delete-webhook", action="store_true", help="remove the webhook before polling")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    client = get_telegram_client()
+    if args.delete_webhook:
+        client.call("deleteWebhook", {"drop_pending_updates": False})
+
+    runner = PollingRunner(TelegramUpdateSource(client, poll_timeout=args.poll_timeout), concurrency=args.concurrency)
+    try:
+        stats = asyncio.run(runner.run(max_batches=args.max_batches))
+        print(json.dumps(stats))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.close()
+
+
+if __name__ == "__main__":
+    main()
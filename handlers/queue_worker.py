@@ -0,0 +1,110 @@
+# Worker: consume la cola del webhook y ejecuta el pipeline completo con su
+# propio timeout, independiente del que Telegram espera para el webhook.
+import json
+import logging
+import os
+import time
+from handlers.message_handler import handle_message_event
+from services.message_queue import get_queue, MAX_RECEIVES
+
+logger = logging.getLogger()
+
+# Tiempo que se deja libre al drenar la cola antes de que la Lambda expire
+WORKER_RESERVE_MS = int(os.getenv('WORKER_RESERVE_MS', '15000'))
+
+
+class PipelineError(Exception):
+    """The message pipeline answered with a server error; the message must be retried."""
+
+
+def process_message(body, context=None, receive_count=1):
+    """
+    Runs the message pipeline for one queued update.
+
+    handle_message_event never raises: it turns internal errors into a 5xx
+    response. Those are raised as PipelineError so the message stays in the
+    queue (or is reported to SQS) and is retried. A 4xx is a bad update and
+    retrying it would fail the same way.
+
+    The user is told about an internal error only on the last delivery
+    (receive_count >= MAX_RECEIVES); earlier failures are retried silently,
+    so one message never gets several error replies.
+    """
+    delay_ms = (time.time() - body.get("enqueued_at", time.time())) * 1000
+    logger.info(f"Processing queued message, queue delay {delay_ms:.0f} ms")
+    event = {
+        "httpMethod": "POST",
+        "body": body.get("body", ""),
+        "isBase64Encoded": body.get("isBase64Encoded", False),
+        "notifyErrors": receive_count >= MAX_RECEIVES,
+    }
+    response = handle_message_event(event, context)
+    if response is None or response.get("statusCode", 500) >= 500:
+        raise PipelineError(f"pipeline returned {response.get('statusCode') if response else None}")
+    return response
+
+
+def _remaining_ms(context):
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        return context.get_remaining_time_in_millis()
+    return None
+
+
+def drain_queue(queue, context=None, max_messages=10):
+    """
+    Processes queued messages until the queue is empty or time runs out.
+
+    A message is deleted only after its pipeline ran; one that raised stays
+    in the queue and becomes visible again after the visibility timeout,
+    until its MAX_RECEIVES-th delivery fails and it is dropped (SQS moves it
+    to the dead-letter queue at that point).
+
+    Returns:
+        dict: Counts of processed and failed messages.
+    """
+    processed = failed = 0
+    while True:
+        remaining = _remaining_ms(context)
+        if remaining is not None and remaining < WORKER_RESERVE_MS:
+            logger.info(f"Stopping drain with {remaining} ms left")
+            break
+        messages = queue.receive(max_messages)
+        if not messages:
+            break
+        for message in messages:
+            try:
+                process_message(message.body, context, message.receive_count)
+                queue.delete(message.receipt)
+                processed += 1
+            except Exception as e:
+                logger.error(f"Queued message {message.receipt} failed "
+                             f"(delivery {message.receive_count}): {str(e)}")
+                failed += 1
+                if message.receive_count >= MAX_RECEIVES:
+                    queue.delete(message.receipt)
+    return {"processed": processed, "failed": failed}
+
+
+def handle_queue_event(event, context):
+    """
+    Worker entry point.
+
+    With an SQS event source mapping the event carries the records; the
+    failed ones are reported back so SQS retries only those. Any other event
+    (e.g. a schedule or a local run) drains the configured queue.
+    """
+    if "Records" in event:
+        failures = []
+        for record in event["Records"]:
+            try:
+                receive_count = int(record.get("attributes", {}).get("ApproximateReceiveCount", 1))
+                process_message(json.loads(record["body"]), context, receive_count)
+            except Exception as e:
+                logger.error(f"Record {record.get('messageId')} failed: {str(e)}")
+                failures.append({"itemIdentifier": record.get("messageId")})
+        return {"batchItemFailures": failures}
+
+    queue = get_queue()
+    if queue is None:
+        raise ValueError("MESSAGE_QUEUE is not configured")
+    return drain_queue(queue, context)
@@ -2,16 +2,14 @@
 import json 
 import base64
 import logging
+from services.log_utils import LOG_LEVEL, log_payload, payload
 
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger.setLevel(LOG_LEVEL)
 
 # Funcion para extraer el chat ID y el mensaje del evento
 def extract_message(event):
     try:
-        # Log the incoming event for debugging
-        logger.info(f"Processing event: {json.dumps(event, default=str, indent=2)}")
-        
         # Extraemos el cuerpo POST
         body_str = event.get("body", "")
         is_base64 = event.get("isBase64Encoded", False)
@@ -29,14 +27,13 @@ def extract_message(event):
                 logger.error(f"Error decoding base64: {str(e)}")
                 raise ValueError("Invalid message encoding")
         
-        logger.info(f"Request body: {body_str}")
-            
         # Parseamos el cuerpo POST como JSON
         try:
             body_json = json.loads(body_str)
-            logger.info(f"Parsed JSON body: {json.dumps(body_json, default=str, indent=2)}")
+            # Muestra redactada del update para depurar
+            log_payload(logger, "Parsed JSON body", body_json, level=logging.DEBUG)
         except json.JSONDecodeError as e:
-            logger.error(f"Error parsing JSON: {str(e)}, Body: {body_str}")
+            logger.error(f"Error parsing JSON: {str(e)}, Body: {len(body_str)} chars")
             raise ValueError("Invalid message format")
         
         # Verificamos que el JSON tenga la estructura esperada
@@ -61,7 +58,7 @@ def extract_message(event):
             
         chat_info = message_data["chat"]
         if not isinstance(chat_info, dict) or "id" not in chat_info:
-            logger.error(f"Invalid chat structure: {chat_info}")
+            logger.error("Invalid chat structure: %s", payload(chat_info))
             raise ValueError("Invalid chat structure - missing id")
             
         chat_id = chat_info["id"]
@@ -74,7 +71,7 @@ def extract_message(event):
         
         # Manejar mensajes de texto
         if "text" in message_data and message_data["text"]:
-            logger.info(f"Text message received: {message_data['text']}")
+            logger.info("Text message received (%d chars)", len(message_data["text"]))
             return chat_id, message_data["text"]
         # Manejar mensajes de voz
         elif "voice" in message_data:
@@ -91,4 +88,19 @@ def extract_message(event):
     except Exception as e:
         logger.error(f"Unexpected error in extract_message: {str(e)}")
         # Don't return chat_id=0, let the calling function handle it
-        raise ValueError(f"Message extraction failed: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Message extraction failed: {str(e)}")
+
+# Funcion para obtener el update_id del evento, usado para descartar reenvíos
+def extract_update_id(event):
+    """Devuelve el update_id del update de Telegram, o None si no se puede leer.
+
+    No registra ni lanza errores: extract_message ya valida el cuerpo.
+    """
+    try:
+        body_str = event.get("body", "")
+        if event.get("isBase64Encoded", False):
+            body_str = base64.b64decode(body_str).decode('utf-8')
+        update_id = json.loads(body_str).get("update_id")
+        return int(update_id) if update_id is not None else None
+    except Exception:
+        return None
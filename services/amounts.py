@@ -0,0 +1,118 @@
+import numpy as np
+
+# Rows parsed per block; bounds the size of the character matrix
+CHUNK_SIZE = 1 << 18
+
+# Longest integer part accepted, keeps cents inside int64
+MAX_INTEGER_DIGITS = 16
+
+# Character classes, looked up by code point (anything above 127 is invalid)
+_INVALID, _DIGIT, _DOT, _COMMA, _DOLLAR, _MINUS, _BLANK = range(7)
+_CLASSES = np.full(129, _INVALID, dtype=np.uint8)
+_CLASSES[ord('0'):ord('9') + 1] = _DIGIT
+_CLASSES[ord('.')] = _DOT
+_CLASSES[ord(',')] = _COMMA
+_CLASSES[ord('$')] = _DOLLAR
+_CLASSES[ord('-')] = _MINUS
+for _blank in (0, ord(' '), ord('\t'), ord('\r'), ord('\n')):
+    _CLASSES[_blank] = _BLANK
+
+# Parser states. I1-I3 count the digits of a leading group that may still be
+# followed by '.', IN is an ungrouped integer, G1-G3 the digits after a '.'
+(_START, _MINUS_SEEN, _DOLLAR_SEEN, _PREFIX, _I1, _I2, _I3, _IN,
+ _GROUP, _G1, _G2, _G3, _DECIMAL, _F1, _F2, _END, _ERROR) = range(17)
+
+_TRANSITIONS = np.full((17, 7), _ERROR, dtype=np.uint8)
+for _state, _class, _next in (
+    (_START, _BLANK, _START), (_START, _MINUS, _MINUS_SEEN), (_START, _DOLLAR, _DOLLAR_SEEN), (_START, _DIGIT, _I1),
+    (_MINUS_SEEN, _BLANK, _MINUS_SEEN), (_MINUS_SEEN, _DOLLAR, _PREFIX), (_MINUS_SEEN, _DIGIT, _I1),
+    (_DOLLAR_SEEN, _BLANK, _DOLLAR_SEEN), (_DOLLAR_SEEN, _MINUS, _PREFIX), (_DOLLAR_SEEN, _DIGIT, _I1),
+    (_PREFIX, _BLANK, _PREFIX), (_PREFIX, _DIGIT, _I1),
+    (_I1, _DIGIT, _I2), (_I2, _DIGIT, _I3), (_I3, _DIGIT, _IN), (_IN, _DIGIT, _IN),
+    (_I1, _DOT, _GROUP), (_I2, _DOT, _GROUP), (_I3, _DOT, _GROUP), (_G3, _DOT, _GROUP),
+    (_GROUP, _DIGIT, _G1), (_G1, _DIGIT, _G2), (_G2, _DIGIT, _G3),
+    (_I1, _COMMA, _DECIMAL), (_I2, _COMMA, _DECIMAL), (_I3, _COMMA, _DECIMAL), (_IN, _COMMA, _DECIMAL),
+    (_G3, _COMMA, _DECIMAL), (_DECIMAL, _DIGIT, _F1), (_F1, _DIGIT, _F2),
+    (_I1, _BLANK, _END), (_I2, _BLANK, _END), (_I3, _BLANK, _END), (_IN, _BLANK, _END),
+    (_G3, _BLANK, _END), (_F1, _BLANK, _END), (_F2, _BLANK, _END), (_END, _BLANK, _END),
+):
+    _TRANSITIONS[_state, _class] = _next
+_TRANSITIONS = _TRANSITIONS.ravel()
+
+_INTEGER_STATES = np.zeros(17, dtype=bool)
+_INTEGER_STATES[[_I1, _I2, _I3, _IN, _G1, _G2, _G3]] = True
+_FRACTION_STATES = np.zeros(17, dtype=bool)
+_FRACTION_STATES[[_F1, _F2]] = True
+_ACCEPTING = np.zeros(17, dtype=bool)
+_ACCEPTING[[_I1, _I2, _I3, _IN, _G3, _F1, _F2, _END]] = True
+
+
+def parse_amounts(values, chunk_size=CHUNK_SIZE):
+    """
+    Parses currency strings such as ' $1.000.000 ' or '$1.234,50' into int64 cents.
+
+    '.' is the thousands separator and ',' the decimal separator (up to two
+    decimals). An optional '-' and '$' may precede the digits and blanks may
+    pad the value. Each block of strings is read as a character matrix and
+    scanned once, column by column, by a vectorized state machine that
+    validates and accumulates the digits at the same time.
+
+    Args:
+        values (sequence): Amount strings (list, array or pandas Series).
+        chunk_size (int): Rows parsed per block.
+
+    Returns:
+        tuple: (cents, valid) numpy arrays. cents is int64 with 0 for the
+        malformed rows; valid is a boolean mask of the rows that parsed.
+    """
+    values = np.asarray(values, dtype=object)
+    n = len(values)
+    cents = np.zeros(n, dtype=np.int64)
+    valid = np.zeros(n, dtype=bool)
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        cents[start:stop], valid[start:stop] = _parse_block(values[start:stop])
+    return cents, valid
+
+
+def _parse_block(block):
+    try:
+        text = block.astype('U')
+    except (TypeError, ValueError):
+        text = np.array(['' if v is None else str(v) for v in block], dtype='U')
+    n = len(text)
+    width = text.dtype.itemsize // 4
+    if n == 0 or width == 0:
+        return np.zeros(n, dtype=np.int64), np.zeros(n, dtype=bool)
+
+    # One row per character position, so every step reads contiguous memory
+    codes = np.ascontiguousarray(text.view(np.uint32).reshape(n, width).T)
+    state = np.full(n, _START, dtype=np.uint8)
+    integer = np.zeros(n, dtype=np.int64)
+    fraction = np.zeros(n, dtype=np.int64)
+    digits = np.zeros(n, dtype=np.int16)
+    fraction_digits = np.zeros(n, dtype=np.int8)
+    negative = np.zeros(n, dtype=bool)
+    has_fraction = False
+
+    for column in codes:
+        classes = np.take(_CLASSES, column, mode='clip')
+        state = np.take(_TRANSITIONS, state.astype(np.intp) * 7 + classes)
+        value = column.astype(np.int64) - ord('0')
+        in_integer = np.take(_INTEGER_STATES, state)
+        integer = np.where(in_integer, integer * 10 + value, integer)
+        digits += in_integer
+        negative |= classes == _MINUS
+        in_fraction = np.take(_FRACTION_STATES, state)
+        if has_fraction or in_fraction.any():
+            has_fraction = True
+            fraction = np.where(in_fraction, fraction * 10 + value, fraction)
+            fraction_digits += in_fraction
+
+    valid = np.take(_ACCEPTING, state) & (digits <= MAX_INTEGER_DIGITS)
+    if has_fraction:
+        # A single decimal digit means tenths
+        fraction = np.where(fraction_digits == 1, fraction * 10, fraction)
+    cents = integer * 100 + fraction
+    cents = np.where(negative, -cents, cents)
+    return np.where(valid, cents, 0), valid
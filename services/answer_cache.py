@@ -0,0 +1,74 @@
+import json
+import logging
+import os
+from services.operations_client import MONTH_MAP
+from services.ttl_cache import TTLCache
+
+logger = logging.getLogger()
+
+ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', '128'))
+ANSWER_CACHE_TTL = float(os.getenv('ANSWER_CACHE_TTL', '86400'))
+
+
+def _month_number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return MONTH_MAP.get(str(value).lower(), value)
+
+
+def canonical_params(params):
+    """
+    Serializes operation params so equivalent requests produce the same key.
+
+    Strings are lowercased with collapsed whitespace (categories are matched
+    case-insensitively) and months are reduced to their number.
+    """
+    canonical = {}
+    for key, value in (params or {}).items():
+        if isinstance(value, str):
+            value = ' '.join(value.lower().split())
+        if key == 'month':
+            value = _month_number(value)
+        canonical[key] = value
+    return json.dumps(canonical, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class AnswerCache:
+    """
+    Caches the final Telegram text of an operation over a given ledger version.
+
+    The key is (operation, canonical params, ledger version), so an answer is
+    never reused once the movements change. Entries of several versions live
+    side by side (each chat partition has its own); stale ones are evicted by
+    the LRU and the TTL.
+    """
+
+    def __init__(self, max_size=ANSWER_CACHE_SIZE, ttl_seconds=ANSWER_CACHE_TTL):
+        self.cache = TTLCache(max_size, ttl_seconds)
+        self.saved_ms = 0.0
+
+    def _key(self, operation, params, version):
+        return f"{operation}|{canonical_params(params)}|{version}"
+
+    def get(self, operation, params, version):
+        """Returns the cached answer text, or None."""
+        if version is None:
+            return None
+        entry = self.cache.get(self._key(operation, params, version))
+        if entry is None:
+            return None
+        self.saved_ms += entry["latency_ms"]
+        return entry["text"]
+
+    def put(self, operation, params, version, text, latency_ms=0.0):
+        """Stores an answer and the LLM latency that a later hit will save."""
+        if version is None or not text:
+            return
+        self.cache.set(self._key(operation, params, version), {"text": text, "latency_ms": latency_ms})
+
+    def stats(self):
+        return {**self.cache.stats(), "saved_ms": round(self.saved_ms, 1)}
+
+
+answer_cache = AnswerCache()
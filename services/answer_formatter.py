@@ -0,0 +1,74 @@
+# Respuestas formateadas localmente, usadas cuando no queda tiempo para que el
+# LLM redacte la respuesta o cuando su llamada falla.
+
+KIND_LABELS = {"income": "Ingresos", "expensive": "Gastos"}
+MAX_ROWS = 15
+
+
+def format_amount(value):
+    """Formatea un monto como $1.234.567,89"""
+    text = f"{float(value):,.2f}"
+    return "$" + text.replace(",", "_").replace(".", ",").replace("_", ".")
+
+
+def _format_records(records, total=None):
+    lines = []
+    for record in records[:MAX_ROWS]:
+        date = str(record.get("Date", ""))[:10]
+        lines.append(f"• {date} {record.get('Description', '')}: {format_amount(record.get('Amount', 0))}")
+    if len(records) > MAX_ROWS:
+        lines.append(f"… y {len(records) - MAX_ROWS} movimientos más")
+    if total is None:
+        total = sum(float(r.get("Amount", 0) or 0) for r in records)
+    lines.append(f"*Total:* {format_amount(total)}")
+    return lines
+
+
+def format_result(data):
+    """
+    Redacta el resultado de una operación sin usar el LLM.
+
+    Args:
+        data: Resultado devuelto por una función de operations_client.
+
+    Returns:
+        str: Texto en Markdown listo para enviar a Telegram.
+    """
+    if isinstance(data, dict) and "error" in data:
+        return f"⚠️ No pude procesar la consulta: {data['error']}"
+    if isinstance(data, dict) and data.get("status") == "recorded":
+        movement = data["movement"]
+        label = "ingreso" if movement["Income/expensive"] == "income" else "gasto"
+        return (f"✅ Registré un {label} de {format_amount(movement['Amount'])} "
+                f"en *{movement['Category']}* con fecha {movement['Date']}.")
+    if isinstance(data, dict) and data.get("status") == "no_data":
+        return data.get("message", "No se encontraron datos para la consulta.")
+    if not data:
+        return "No se encontraron datos para la consulta."
+
+    lines = ["📊 *Resultado*"]
+    if isinstance(data, list):
+        lines += _format_records(data)
+    elif "transactions" in data:
+        lines.append(f"Categoría *{data.get('category')}*, mes {data.get('month')}")
+        lines += _format_records(data.get("transactions") or [], data.get("total"))
+    elif "categories" in data:
+        categories = sorted(data["categories"].items(), key=lambda item: item[1], reverse=True)
+        for category, amount in categories[:MAX_ROWS]:
+            lines.append(f"• {category}: {format_amount(amount)}")
+        if len(categories) > MAX_ROWS:
+            others = sum(amount for _, amount in categories[MAX_ROWS:])
+            lines.append(f"• Otras ({len(categories) - MAX_ROWS}): {format_amount(others)}")
+        if "total" in data:
+            lines.append(f"*Total:* {format_amount(data['total'])}")
+    else:
+        for year, value in data.items():
+            if isinstance(value, dict):
+                lines.append(f"*{year}*")
+                for kind, amount in value.items():
+                    lines.append(f"• {KIND_LABELS.get(kind, kind)}: {format_amount(amount)}")
+                if set(value) == set(KIND_LABELS):
+                    lines.append(f"• Balance: {format_amount(value['income'] - value['expensive'])}")
+            else:
+                lines.append(f"*{year}:* {format_amount(value)}")
+    return "\n".join(lines)
@@ -1,16 +1,43 @@
 import os
 import csv
-from datetime import datetime
-import pandas as pd
+import tempfile
+from services.ledger import Ledger, EXPENSE, INCOME
+from services.ledger_journal import JournalNotConfigured
+from services.ledger_reader import read_ledger
+from services.ledger_partitions import LedgerPartition, PartitionCache, current_chat, ensure_ledger_file
+from services.rollup import RollupCube
 
 # Get the absolute path to the CSV file
 CSV_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'movements.csv')
 
-def load_transactions():
+# Directorio escribible (en Lambda solo /tmp) donde se persisten los agregados
+CACHE_DIR = os.getenv('LEDGER_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'giobot'))
+
+# Backend del ledger: 'csv' (pandas en memoria) o 'sqlite' (consultas SQL indexadas)
+LEDGER_BACKEND = os.getenv('LEDGER_BACKEND', 'csv').lower()
+LEDGER_DB_PATH = os.getenv('LEDGER_DB_PATH', os.path.join(CACHE_DIR, 'ledger.sqlite3'))
+
+# Diario de los movimientos registrados desde el chat. En Lambda /tmp es
+# propio de cada contenedor: para conservarlos debe apuntar a un volumen (EFS)
+LEDGER_JOURNAL_PATH = os.getenv('LEDGER_JOURNAL_PATH', os.path.join(CACHE_DIR, 'journal.csv'))
+
+# Sin una ruta configurada el diario quedaría en el /tmp del contenedor y el
+# movimiento se perdería al reciclarlo: en ese caso no se registran movimientos
+LEDGER_JOURNAL_CONFIGURED = bool(os.getenv('LEDGER_JOURNAL_PATH'))
+
+# Un ledger por chat: {dir}/{chat_id}/movements.csv y journal.csv. Vacío usa
+# el ledger único de arriba para todos los chats
+LEDGER_PARTITIONS_DIR = os.getenv('LEDGER_PARTITIONS_DIR', '')
+
+# Memoria para los ledgers de chats cargados (la Lambda tiene 256 MB en
+# total); los menos usados se descartan al superarla
+LEDGER_MEMORY_BUDGET_MB = float(os.getenv('LEDGER_MEMORY_BUDGET_MB', '64'))
+
+def load_transactions(path=None):
     """Cargar transacciones desde el archivo CSV"""
     transactions = []
     try:
-        with open(CSV_FILE, mode='r', encoding='utf-8') as file:
+        with open(path or CSV_FILE, mode='r', encoding='utf-8') as file:
             reader = csv.DictReader(file, delimiter=';')
             for row in reader:
                 # Limpiar los valores de espacios en blanco
@@ -21,6 +48,119 @@ def load_transactions():
         print(f"Error al cargar transacciones: {str(e)}")
         return []
 
+def load_ledger_file(path=None, version=None):
+    """
+    Lee el CSV por bloques directamente a un Ledger tipado, sin pasar por
+    la lista de dicts de load_transactions. Si no se puede leer devuelve un
+    Ledger vacío, igual que load_transactions devuelve una lista vacía.
+    """
+    try:
+        return read_ledger(path or CSV_FILE, version)
+    except (OSError, ValueError) as e:
+        print(f"Error al cargar transacciones: {str(e)}")
+        return Ledger.empty(version)
+
+# Ledger único (o de los mensajes sin chat). Sus caches son a nivel de
+# proceso: sobreviven entre invocaciones de un contenedor caliente
+_default_partition = LedgerPartition(CSV_FILE, LEDGER_JOURNAL_PATH, CACHE_DIR, LEDGER_DB_PATH, LEDGER_BACKEND)
+
+def _chat_partition(chat_id, on_load):
+    """Crea la partición de un chat; su CSV se crea vacío si no existe"""
+    # El chat_id de Telegram es un entero: nunca se usa como ruta sin validar
+    name = str(int(chat_id))
+    directory = os.path.join(LEDGER_PARTITIONS_DIR, name)
+    csv_path = os.path.join(directory, 'movements.csv')
+    ensure_ledger_file(csv_path)
+    return LedgerPartition(csv_path, os.path.join(directory, 'journal.csv'),
+                           os.path.join(CACHE_DIR, 'chats', name), backend=LEDGER_BACKEND, on_load=on_load)
+
+_partitions = PartitionCache(_chat_partition, int(LEDGER_MEMORY_BUDGET_MB * 1024 * 1024))
+
+def _partition():
+    """Partición del chat activo (ver ledger_partitions.chat_scope)"""
+    chat_id = current_chat()
+    if not LEDGER_PARTITIONS_DIR or chat_id is None:
+        return _default_partition
+    return _partitions.get(chat_id)
+
+def load_ledger():
+    """
+    Devuelve el Ledger de movimientos, reutilizando el parseo mientras el
+    archivo CSV no cambie. El Ledger es compartido: no se debe modificar.
+    Con LEDGER_BACKEND=sqlite devuelve el SQLiteLedger, que expone la misma
+    interfaz de consulta.
+    """
+    try:
+        return _partition().load_ledger()
+    except OSError as e:
+        print(f"Error al cargar transacciones: {str(e)}")
+        return Ledger.empty()
+
+def ledger_cache_stats():
+    """Devuelve los contadores de hits, misses y recargas del cache del ledger"""
+    return _partition().stats()
+
+def partition_stats():
+    """Devuelve los ledgers de chats cargados, su memoria, cargas y desalojos"""
+    return _partitions.stats()
+
+def load_rollup():
+    """
+    Devuelve el cubo de totales por (tipo, año, mes, categoría) para responder
+    consultas agregadas sin recorrer las filas del Ledger.
+    """
+    try:
+        return _partition().load_rollup()
+    except OSError as e:
+        print(f"Error al cargar transacciones: {str(e)}")
+        return RollupCube({})
+
+def ledger_version():
+    """
+    Devuelve la versión de los movimientos (None si no se pueden leer): el
+    hash del CSV combinado con el de los movimientos registrados. Cambia cada
+    vez que cambian los movimientos.
+    """
+    try:
+        return _partition().version()
+    except OSError:
+        return None
+
+def append_movement(kind, cents, category, date, description=None):
+    """
+    Registra un movimiento nuevo en el ledger del chat activo: agrega una
+    línea al diario (con fsync) y actualiza en memoria el Ledger, el cubo y
+    la base SQLite ya cargados.
+
+    Args:
+        kind (str): 'expensive' o 'income'.
+        cents (int): Monto positivo en centavos.
+        category (str): Categoría.
+        date (datetime.date): Fecha del movimiento.
+        description (str, optional): Descripción; por defecto la categoría.
+
+    Returns:
+        dict: El movimiento registrado con Description, Income/expensive,
+        Amount, Category y Date ('YYYY-MM-DD').
+
+    Raises:
+        ValueError: Si el movimiento no es válido.
+        OSError: Si no se pudo escribir el diario.
+        JournalNotConfigured: Si no hay LEDGER_JOURNAL_PATH ni
+            LEDGER_PARTITIONS_DIR configurados.
+    """
+    partition = _partition()
+    if partition is _default_partition and not LEDGER_JOURNAL_CONFIGURED:
+        raise JournalNotConfigured("LEDGER_JOURNAL_PATH is not configured")
+    transaction = partition.append_movement(kind, cents, category, date, description)
+    return {
+        'Description': transaction['Description'],
+        'Income/expensive': kind,
+        'Amount': cents / 100,
+        'Category': transaction['Category'],
+        'Date': f"{date:%Y-%m-%d}",
+    }
+
 def get_expenses_by_category_per_month():
     """
     Obtiene los gastos agrupados por categoría y mes
@@ -35,50 +175,24 @@ def get_expenses_by_category_per_month():
             }
         }
     """
-    transactions = load_transactions()
-    if not transactions:
-        return {'months': [], 'categories': {}}
-    
-    df = pd.DataFrame(transactions)
-    
-    # Limpieza y conversión de datos
-    df['Amount'] = df['Amount'].str.strip()
-    df = df[df['Amount'] != '']
-    df['Amount'] = (
-        df['Amount']
-        .str.replace('$', '', regex=False)
-        .str.replace('.', '', regex=False)
-        .str.replace(',', '.', regex=False)
-        .astype(float)
-    )
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-    df = df.dropna(subset=['Date'])
-    
-    # Filtrar solo gastos
-    expenses_df = df[df['Income/expensive'] == 'expensive'].copy()
+    ledger = load_ledger()
+    expenses_df = ledger.select(kind=EXPENSE)
     if len(expenses_df) == 0:
         return {'months': [], 'categories': {}}
     
-    # Crear columna de mes
-    expenses_df['Month'] = expenses_df['Date'].dt.to_period('M').dt.strftime('%Y-%m')
-    
-    # Obtener todos los meses únicos ordenados
-    all_months = sorted(expenses_df['Month'].unique())
-    
-    # Agrupar por categoría y mes
-    grouped = expenses_df.groupby(['Category', 'Month'])['Amount'].sum().unstack(fill_value=0)
-    
-    # Asegurarse de que todos los meses estén presentes para cada categoría
-    for month in all_months:
-        if month not in grouped.columns:
-            grouped[month] = 0
-    
-    # Ordenar columnas (meses)
-    grouped = grouped[all_months]
+    # Agrupar por categoría y periodo (YYYYMM) sin formatear fechas fila por fila
+    period = expenses_df['Year'].astype('int32') * 100 + expenses_df['Month']
+    grouped = (
+        expenses_df['Cents']
+        .groupby([expenses_df['Category'], period.rename('Period')], observed=True)
+        .sum()
+        .unstack(fill_value=0)
+        / 100
+    )
     
     # Convertir a diccionario
     result = {
-        'months': all_months,
+        'months': [_period_label(p) for p in grouped.columns],
         'categories': {}
     }
     
@@ -87,6 +201,10 @@ def get_expenses_by_category_per_month():
     
     return result
 
+def _period_label(period):
+    """Convierte un periodo YYYYMM entero al formato 'YYYY-MM'"""
+    return f"{period // 100:04d}-{period % 100:02d}"
+
 def _convert_datetime_to_str(obj):
     """Recursively convert datetime objects to strings in a dictionary."""
     from datetime import datetime, date
@@ -99,6 +217,14 @@ def _convert_datetime_to_str(obj):
         return [_convert_datetime_to_str(item) for item in obj]
     return obj
 
+def _expense_records(frame):
+    """Convierte filas del Ledger a registros serializables con Year y Month como texto"""
+    records = _convert_datetime_to_str(Ledger.to_records(frame))
+    for record in records:
+        record['Month'] = str(record['Month']).zfill(2)
+        record['Year'] = str(record['Year'])
+    return records
+
 def get_expenses_by_category_and_month(category=None, month=None):
     """
     Obtiene los gastos por categoría y mes. Si no se proporciona una categoría,
@@ -111,49 +237,19 @@ def get_expenses_by_category_and_month(category=None, month=None):
     Returns:
         dict: Diccionario con los gastos por categoría para el mes especificado.
     """
-    transactions = load_transactions()
-    if not transactions:
-        return {"month": str(month) if month else "all", "categories": {}}
-    
-    df = pd.DataFrame(transactions)
+    ledger = load_ledger()
     
     try:
-        # Limpieza y conversión de datos
-        df['Amount'] = df['Amount'].str.strip()
-        df = df[df['Amount'] != '']
-        df['Amount'] = (
-            df['Amount']
-            .str.replace('$', '', regex=False)
-            .str.replace('.', '', regex=False)
-            .str.replace(',', '.', regex=False)
-            .astype(float)
-        )
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-        df = df.dropna(subset=['Date'])
-        
-        # Filtrar solo gastos
-        expenses_df = df[df['Income/expensive'].str.lower() == 'expensive'].copy()
+        # Filtrar solo gastos, y por mes si se proporciona
+        expenses_df = ledger.select(kind=EXPENSE, month=month)
         
         # Si no hay gastos, retornar estructura vacía
         if len(expenses_df) == 0:
             return {"month": str(month) if month else "all", "categories": {}}
         
-        # Crear columna de mes y año para filtrar
-        expenses_df['Month'] = expenses_df['Date'].dt.month.astype(str).str.zfill(2)
-        expenses_df['Year'] = expenses_df['Date'].dt.year.astype(str)
-        
-        # Filtrar por mes si se proporciona
-        if month is not None:
-            month_str = str(month).zfill(2)
-            expenses_df = expenses_df[expenses_df['Month'] == month_str]
-        
-        # Si no hay gastos después de filtrar por mes, retornar estructura vacía
-        if len(expenses_df) == 0:
-            return {"month": str(month) if month else "all", "categories": {}}
-        
         # Si se proporciona una categoría, filtrar por ella
         if category is not None and str(category).lower() != 'category':
-            expenses_df = expenses_df[expenses_df['Category'].str.lower() == category.lower()]
+            expenses_df = expenses_df[expenses_df['Category'].isin(ledger.categories_matching(category))]
             
             if len(expenses_df) == 0:
                 return {
@@ -164,24 +260,23 @@ def get_expenses_by_category_and_month(category=None, month=None):
                 }
             
             # Convertir las transacciones a un formato serializable
-            transactions = expenses_df.to_dict('records')
-            transactions = _convert_datetime_to_str(transactions)
+            transactions = _expense_records(expenses_df)
             
             return {
                 "month": str(month) if month else "all",
                 "category": category,
-                "total": float(expenses_df['Amount'].sum()),
+                "total": Ledger.total(expenses_df),
                 "transactions": transactions
             }
         else:
             # Si no se especificó categoría, devolver todas las categorías
-            grouped = expenses_df.groupby('Category')['Amount'].sum().to_dict()
+            grouped = Ledger.sum_by(expenses_df, 'Category').to_dict()
             
             # Obtener todas las transacciones agrupadas por categoría
             transactions_by_category = {}
             for cat in grouped.keys():
-                cat_transactions = expenses_df[expenses_df['Category'].str.lower() == cat.lower()].to_dict('records')
-                transactions_by_category[cat] = _convert_datetime_to_str(cat_transactions)
+                cat_df = expenses_df[expenses_df['Category'].isin(ledger.categories_matching(cat))]
+                transactions_by_category[cat] = _expense_records(cat_df)
             
             return {
                 "month": str(month) if month else "all",
@@ -200,63 +295,28 @@ def get_expenses_by_category_and_month(category=None, month=None):
 
 def analyze_finances(question):
     """Analizar datos financieros y responder preguntas"""
-    transactions = load_transactions()
+    ledger = load_ledger()
     
-    # Convertir a DataFrame para análisis más fácil
-    df = pd.DataFrame(transactions)
-    
-    # Limpiar y convertir montos a numérico
-    df['Amount'] = df['Amount'].str.strip()
-    df = df[df['Amount'] != '']
-    
-    if len(df) == 0:
+    if len(ledger) == 0:
         return "No se encontraron transacciones válidas para analizar."
     
-    df['Amount'] = (
-        df['Amount']
-        .str.replace('$', '', regex=False)
-        .str.replace('.', '', regex=False)
-        .str.replace(',', '.', regex=False)
-        .astype(float)
-    )
-    
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-    df = df.dropna(subset=['Date'])
-    
-    if len(df) == 0:
-        return "No se encontraron transacciones con fechas válidas para analizar."
-    
-    # Obtener gastos por categoría por mes con detalles de transacciones
+    # Obtener gastos por categoría por mes (comparte el mismo Ledger, sin volver a parsear)
     expenses_data = get_expenses_by_category_per_month()
     
+    incomes_df = ledger.select(kind=INCOME)
+    expenses_df = ledger.select(kind=EXPENSE)
+    
     # Análisis básico
-    total_income = df[df['Income/expensive'] == 'income']['Amount'].sum()
-    total_expenses = df[df['Income/expensive'] == 'expensive']['Amount'].sum()
+    total_income = Ledger.total(incomes_df)
+    total_expenses = Ledger.total(expenses_df)
     balance = total_income - total_expenses
     
     # Gastos por categoría
-    expense_by_category = df[df['Income/expensive'] == 'expensive'].groupby('Category')['Amount'].sum().sort_values(ascending=False)
+    expense_by_category = Ledger.sum_by(expenses_df, 'Category').sort_values(ascending=False)
     
-    # Cálculos mensuales
-    df['Month'] = df['Date'].dt.to_period('M')
-    
-    # Ingresos por mes
-    monthly_income = (
-        df[df['Income/expensive'] == 'income']
-        .groupby('Month')['Amount']
-        .sum()
-        .reset_index()
-    )
-    monthly_income['Month'] = monthly_income['Month'].dt.strftime('%Y-%m')
-    
-    # Gastos por mes
-    monthly_expenses = (
-        df[df['Income/expensive'] == 'expensive']
-        .groupby('Month')['Amount']
-        .sum()
-        .reset_index()
-    )
-    monthly_expenses['Month'] = monthly_expenses['Month'].dt.strftime('%Y-%m')
+    # Ingresos y gastos por mes
+    monthly_income = Ledger.sum_by(incomes_df, ['Year', 'Month'])
+    monthly_expenses = Ledger.sum_by(expenses_df, ['Year', 'Month'])
     
     # Preparar contexto para la respuesta
     context = f"""
@@ -268,12 +328,12 @@ def analyze_finances(question):
     Ingresos por mes:
     """
     
-    for _, row in monthly_income.iterrows():
-        context += f"  - {row['Month']}: ${row['Amount']:,.0f}\n"
+    for (year, month), amount in monthly_income.items():
+        context += f"  - {year:04d}-{month:02d}: ${amount:,.0f}\n"
     
     context += "\nGastos por mes:\n"
-    for _, row in monthly_expenses.iterrows():
-        context += f"  - {row['Month']}: ${row['Amount']:,.0f}\n"
+    for (year, month), amount in monthly_expenses.items():
+        context += f"  - {year:04d}-{month:02d}: ${amount:,.0f}\n"
     
     context += "\nGastos por categoría:\n"
     for category, amount in expense_by_category.items():
@@ -0,0 +1,59 @@
+import os
+import time
+
+# Presupuesto cuando no hay contexto de Lambda (pruebas, ejecución local)
+DEFAULT_BUDGET_MS = int(os.getenv('DEFAULT_BUDGET_MS', '10000'))
+
+# Tiempo que siempre se reserva para enviar la respuesta a Telegram
+SEND_RESERVE_MS = int(os.getenv('SEND_RESERVE_MS', '2000'))
+# Presupuesto mínimo para intentar una llamada al LLM
+ROUTING_MIN_MS = int(os.getenv('ROUTING_MIN_MS', '2500'))
+NARRATION_MIN_MS = int(os.getenv('NARRATION_MIN_MS', '3000'))
+
+
+class Deadline:
+    """
+    Time budget of one invocation, shared by the stages of the pipeline.
+
+    Each stage asks for a timeout that leaves enough time for the stages
+    after it, so a slow LLM call cannot consume the time reserved for
+    sending the reply.
+
+    Args:
+        budget_ms (float): Milliseconds available from now.
+        clock (callable, optional): Monotonic time source in seconds.
+    """
+
+    def __init__(self, budget_ms, clock=time.monotonic):
+        self._clock = clock
+        self.expires_at = clock() + budget_ms / 1000
+
+    @classmethod
+    def from_context(cls, context, default_ms=DEFAULT_BUDGET_MS):
+        """Creates the deadline from a Lambda context; tests may pass {} or None."""
+        get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+        if callable(get_remaining):
+            return cls(get_remaining())
+        return cls(default_ms)
+
+    def remaining_ms(self):
+        """Milliseconds left, never negative."""
+        return max(0.0, (self.expires_at - self._clock()) * 1000)
+
+    def has_time(self, needed_ms, reserve_ms=0):
+        """True if needed_ms fit before the deadline after keeping reserve_ms."""
+        return self.remaining_ms() - reserve_ms >= needed_ms
+
+    def timeout(self, reserve_ms=0, cap=None):
+        """
+        Seconds a stage may use while keeping reserve_ms for later stages.
+
+        Args:
+            reserve_ms (float): Time to leave for the stages that follow.
+            cap (float, optional): Upper bound in seconds.
+
+        Returns:
+            float: The timeout in seconds (0 when there is no time left).
+        """
+        seconds = max(0.0, self.remaining_ms() - reserve_ms) / 1000
+        return min(seconds, cap) if cap is not None else seconds
@@ -0,0 +1,203 @@
+"""
+Idempotencia por update_id de Telegram.
+
+Telegram reenvía un update si el webhook no respondió a tiempo, y SQS puede
+entregar un mensaje más de una vez. Antes de cualquier trabajo costoso el
+update se marca "en proceso"; al terminar queda "procesado". Un duplicado
+en cualquiera de los dos estados se descarta.
+
+Backends (IDEMPOTENCY_STORE):
+    - memory: por contenedor, acotado en tamaño (por defecto).
+    - sqlite: archivo compartido entre procesos locales; en AWS sirve como
+      referencia de un backend persistente compartido.
+    - none: desactiva la deduplicación.
+"""
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger()
+
+IDEMPOTENCY_STORE = os.getenv('IDEMPOTENCY_STORE', 'memory').lower()
+IDEMPOTENCY_DB_PATH = os.getenv(
+    'IDEMPOTENCY_DB_PATH', os.path.join(tempfile.gettempdir(), 'giobot', 'idempotency.sqlite3')
+)
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '10000'))
+# Telegram deja de reintentar un update después de unas horas
+IDEMPOTENCY_RETENTION = float(os.getenv('IDEMPOTENCY_RETENTION', '86400'))
+# Un marcador "en proceso" más viejo que esto se considera de un proceso caído
+IN_FLIGHT_TIMEOUT = float(os.getenv('IDEMPOTENCY_IN_FLIGHT_TIMEOUT', '120'))
+
+NEW = 'new'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+
+# Llamadas a OpenAI por mensaje (enrutamiento y respuesta final)
+LLM_CALLS_PER_UPDATE = 2
+
+
+class MemoryIdempotencyStore:
+    """Bounded in-process store; the oldest updates are forgotten first."""
+
+    def __init__(self, max_entries=IDEMPOTENCY_MAX_ENTRIES, retention=IDEMPOTENCY_RETENTION,
+                 in_flight_timeout=IN_FLIGHT_TIMEOUT, clock=time.time):
+        self.max_entries = max_entries
+        self.retention = retention
+        self.in_flight_timeout = in_flight_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def begin(self, update_id):
+        """Claims an update. Returns NEW if claimed, else IN_FLIGHT or DONE."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(update_id)
+            if entry is not None:
+                state, updated_at = entry
+                expired = now - updated_at > (self.in_flight_timeout if state == IN_FLIGHT else self.retention)
+                if not expired:
+                    return state
+            self._entries[update_id] = (IN_FLIGHT, now)
+            self._entries.move_to_end(update_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return NEW
+
+    def complete(self, update_id):
+        with self._lock:
+            self._entries[update_id] = (DONE, self._clock())
+
+    def release(self, update_id):
+        """Removes the in-flight marker so a redelivery is processed again."""
+        with self._lock:
+            self._entries.pop(update_id, None)
+
+
+class SQLiteIdempotencyStore:
+    """Store in a SQLite file, shared by every process that opens it."""
+
+    def __init__(self, path=IDEMPOTENCY_DB_PATH, retention=IDEMPOTENCY_RETENTION,
+                 in_flight_timeout=IN_FLIGHT_TIMEOUT, clock=time.time):
+        self.retention = retention
+        self.in_flight_timeout = in_flight_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS updates ("
+            " update_id INTEGER PRIMARY KEY,"
+            " state TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS updates_updated_at ON updates (updated_at)")
+
+    def begin(self, update_id):
+        now = self._clock()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Mantiene la tabla acotada a la ventana de reintentos
+                self._conn.execute("DELETE FROM updates WHERE updated_at < ?", (now - self.retention,))
+                row = self._conn.execute(
+                    "SELECT state, updated_at FROM updates WHERE update_id = ?", (update_id,)
+                ).fetchone()
+                if row is not None and not (row[0] == IN_FLIGHT and now - row[1] > self.in_flight_timeout):
+                    self._conn.execute("COMMIT")
+                    return row[0]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO updates (update_id, state, updated_at) VALUES (?, ?, ?)",
+                    (update_id, IN_FLIGHT, now),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return NEW
+
+    def complete(self, update_id):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE updates SET state = ?, updated_at = ? WHERE update_id = ?",
+                (DONE, self._clock(), update_id),
+            )
+
+    def release(self, update_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM updates WHERE update_id = ? AND state = ?", (update_id, IN_FLIGHT))
+
+
+class IdempotencyGuard:
+    """
+    Deduplicates updates against a store and counts the duplicates.
+
+    Args:
+        store: A store with begin/complete/release, or None to disable.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._stats = {"processed": 0, "duplicate_in_flight": 0, "duplicate_done": 0}
+
+    def begin(self, update_id):
+        """Returns True if the update should be processed now."""
+        if self.store is None or update_id is None:
+            return True
+        try:
+            state = self.store.begin(update_id)
+        except Exception as e:
+            # Sin store disponible es preferible responder dos veces que no responder
+            logger.warning(f"Idempotency store unavailable: {str(e)}")
+            return True
+        with self._lock:
+            if state == NEW:
+                self._stats["processed"] += 1
+                return True
+            self._stats[f"duplicate_{state}"] += 1
+        logger.info(f"Skipping duplicate update {update_id} ({state})")
+        return False
+
+    def complete(self, update_id):
+        """Marks the update as answered; store errors are logged, never raised."""
+        self._finish(update_id, "complete")
+
+    def release(self, update_id):
+        """Lets a retry process the update; store errors are logged, never raised."""
+        self._finish(update_id, "release")
+
+    def _finish(self, update_id, action):
+        if self.store is None or update_id is None:
+            return
+        try:
+            getattr(self.store, action)(update_id)
+        except Exception as e:
+            # La respuesta ya está decidida: un error del store no la reemplaza
+            logger.warning(f"Idempotency store could not {action} update {update_id}: {str(e)}")
+
+    def stats(self):
+        """Counters plus the OpenAI calls the skipped duplicates would have made."""
+        with self._lock:
+            duplicates = self._stats["duplicate_in_flight"] + self._stats["duplicate_done"]
+            return {**self._stats, "llm_calls_avoided": duplicates * LLM_CALLS_PER_UPDATE}
+
+
+def _create_store():
+    if IDEMPOTENCY_STORE == 'none':
+        return None
+    if IDEMPOTENCY_STORE == 'sqlite':
+        return SQLiteIdempotencyStore()
+    if IDEMPOTENCY_STORE == 'memory':
+        return MemoryIdempotencyStore()
+    raise ValueError(f"Unknown IDEMPOTENCY_STORE backend: {IDEMPOTENCY_STORE}")
+
+
+idempotency_guard = IdempotencyGuard(_create_store())
@@ -0,0 +1,272 @@
+import logging
+import os
+import re
+import unicodedata
+from services.operations_client import MONTH_MAP
+
+logger = logging.getLogger()
+
+# Decisions below this confidence are delegated to the LLM
+CONFIDENCE_THRESHOLD = float(os.getenv('ROUTER_CONFIDENCE_THRESHOLD', '0.8'))
+
+# Keyword patterns over normalized text (lowercase, no accents or punctuation)
+EXPENSE_PATTERN = re.compile(r'\b(gast\w*|pagu\w*|pago|pagos|egreso\w*|expens\w*|spen[dt]\w*|cost\w*)\b')
+INCOME_PATTERN = re.compile(r'\b(ingres\w*|gane|ganado|recib\w*|entrad\w*|incomes?|earn\w*|received)\b')
+MOVEMENTS_PATTERN = re.compile(r'\b(movimiento\w*|transaccion\w*|detalle\w*|lista\w*|listado|cuales|movements?|transactions?|details?|list)\b')
+BY_CATEGORY_PATTERN = re.compile(r'\b(por|by|per|each|cada) (categoria|categorias|category|categories)\b')
+BY_YEAR_PATTERN = re.compile(r'\b(ano|anos|anual\w*|year\w*|annual\w*|resumen|balance|total\w*)\b')
+
+# Intents the operations cannot answer literally; the LLM decides those
+OUT_OF_SCOPE_PATTERN = re.compile(r'\b(promedio|average|compar\w*|tendencia|trend|porcentaje|percent\w*|proyecc\w*|predic\w*|agreg\w*|registr\w*|anot\w*|borr\w*|add|delete)\b')
+
+# Statements that record a movement ("gasté 50.000 en comida hoy"); questions never do
+RECORD_PATTERN = re.compile(r'\b(gaste|pague|compre|recibi|gane|cobre|pagaron|registr\w*|anot\w*|agreg\w*|add|spent|paid|bought|received|earned)\b')
+RECORD_INCOME_PATTERN = re.compile(r'\b(recibi|gane|cobre|pagaron|ingreso|ingresos|received|earned|income)\b')
+QUESTION_PATTERN = re.compile(r'\b(cuanto|cuanta|cuantos|cuantas|cual|cuales|como|que|how|what|which)\b')
+DELETE_PATTERN = re.compile(r'\b(borr\w*|elimin\w*|delete|remove)\b')
+EXPLICIT_DATE_PATTERN = re.compile(r'\b(\d{1,2}[/-]\d{1,2}|(19|20)\d{2})\b')
+
+# Periods shorter than a year or relative to today ("este mes", "la semana pasada");
+# the operations only answer by month number or by year
+RELATIVE_PERIOD_PATTERN = re.compile(r'\b(hoy|ayer|anteayer|today|yesterday|este mes|esta semana|semana\w*|'
+                                     r'pasad[oa]s?|ultim[oa]s?|this (week|month)|last|week\w*)\b')
+
+# Dates the "date" parameter cannot express; recording with them would default to today
+UNRESOLVED_DATE_PATTERN = re.compile(r'\b(pasad[oa]s?|semana\w*|lunes|martes|miercoles|jueves|viernes|sabado|'
+                                     r'domingo|monday|tuesday|wednesday|thursday|friday|saturday|sunday|last|week\w*)\b')
+# "el 5" (day of the month) over the raw text, so "el 50.000" stays an amount
+DAY_OF_MONTH_PATTERN = re.compile(r'\bel (\d{1,2})\b(?![.,]\d)(?!\s*(?:mil|k)\b)', re.IGNORECASE)
+
+# Amounts over the raw text: '$50.000', '1.234,50', '50000', '50 mil', '50k'
+AMOUNT_PATTERN = re.compile(r'(\$\s*)?(?<![\d.,])(\d{1,3}(?:\.\d{3})+|\d+)(?:,(\d{1,2}))?(?![\d.,]\d)(\s*(?:mil|k)\b)?',
+                            re.IGNORECASE)
+
+# Relative dates understood by the "date" parameter
+RELATIVE_DATES = {'hoy': 'hoy', 'today': 'hoy', 'ayer': 'ayer', 'yesterday': 'ayer', 'anteayer': 'anteayer'}
+
+# Categories that are incomes by themselves
+INCOME_CATEGORIES = ('salary', 'pension', 'pasive incomes')
+
+# Short month forms that are also common words; accepted only after a preposition
+AMBIGUOUS_MONTHS = {'mar', 'may'}
+MONTH_PREPOSITIONS = {'de', 'en', 'del', 'in', 'of', 'mes'}
+
+# Spanish names of the ledger categories; used only when the target exists
+CATEGORY_ALIASES = {
+    'comida': 'food', 'alimentos': 'food', 'mercado': 'food',
+    'salud': 'health', 'medicina': 'health',
+    'restaurante': 'restaurant', 'restaurantes': 'restaurant',
+    'educacion': 'education', 'colegio': 'education', 'estudio': 'education',
+    'vehiculo': 'vehicle', 'carro': 'vehicle', 'moto': 'vehicle',
+    'entretenimiento': 'entertainment', 'diversion': 'entertainment',
+    'hogar': 'home', 'casa': 'home',
+    'impuestos': 'taxes', 'impuesto': 'taxes',
+    'ahorro': 'saving', 'ahorros': 'saving',
+    'regalo': 'gift', 'regalos': 'gift',
+    'ropa': 'clothes',
+    'servicios publicos': 'public services',
+    'padres': 'parents', 'papas': 'parents',
+    'prestamo': 'loan', 'prestamos': 'loan', 'deuda': 'debt',
+    'salario': 'salary', 'sueldo': 'salary', 'nomina': 'salary',
+    'pension': 'pension',
+    'mascota': 'pet', 'mascotas': 'pet',
+    'cumpleanos': 'birthday',
+    'solidaridad': 'solidarity', 'donaciones': 'solidarity',
+    'gasolina': 'gasoline', 'parqueadero': 'parking',
+    'presentacion personal': 'personal presentation',
+    'casa nueva': 'new home', 'inversiones': 'investments',
+}
+
+_stats = {"routed": 0, "fallback": 0}
+
+
+def normalize_text(text):
+    """Lowercases, strips accents and punctuation and collapses whitespace."""
+    text = unicodedata.normalize('NFKD', str(text).lower())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+
+def _find_months(tokens):
+    months = []
+    for i, token in enumerate(tokens):
+        number = MONTH_MAP.get(token)
+        if number is None:
+            continue
+        if token in AMBIGUOUS_MONTHS and (i == 0 or tokens[i - 1] not in MONTH_PREPOSITIONS):
+            continue
+        if number not in months:
+            months.append(number)
+    return months
+
+
+def _find_categories(text, categories):
+    """Returns [(category label, matched through alias)] found in the text."""
+    labels = {}
+    for label in categories:
+        labels.setdefault(normalize_text(label), label)
+
+    candidates = [(key, labels[key], False) for key in labels]
+    candidates += [(alias, labels[target], True) for alias, target in CATEGORY_ALIASES.items() if target in labels]
+    # Longest phrases first, so "public services" wins over "services"
+    candidates.sort(key=lambda c: len(c[0]), reverse=True)
+
+    found = []
+    remaining = f" {text} "
+    for phrase, label, via_alias in candidates:
+        needle = f" {phrase} "
+        if needle in remaining:
+            remaining = remaining.replace(needle, ' ')
+            if label not in [f[0] for f in found]:
+                found.append((label, via_alias))
+    return found
+
+
+def _find_amounts(message_text):
+    """
+    Returns the amounts of a message in the ledger format ('50.000', '1.234,50').
+
+    Bare numbers below 1000 and years are left out: they are usually days
+    or dates, not amounts.
+    """
+    amounts = []
+    for match in AMOUNT_PATTERN.finditer(message_text):
+        currency, integer, fraction, thousands = match.groups()
+        value = int(integer.replace('.', ''))
+        if thousands:
+            amounts.append(str(value * 1000))
+        elif currency or '.' in integer or fraction or (value >= 1000 and not 1900 <= value <= 2100):
+            amounts.append(integer + (f",{fraction}" if fraction else ""))
+    return amounts
+
+
+def _classify_record(message_text, text, tokens, amounts, months, found):
+    category = found[0][0] if found else None
+    income = bool(RECORD_INCOME_PATTERN.search(text)) or (category or '').lower() in INCOME_CATEGORIES
+    params = {"kind": "income" if income else "expensive", "amount": amounts[0], "category": category}
+    dates = [RELATIVE_DATES[token] for token in tokens if token in RELATIVE_DATES]
+    if dates:
+        params["date"] = dates[0]
+
+    confidence = 1.0
+    if not category:
+        # Sin categoría conocida el LLM decide cuál usar
+        confidence = 0.0
+    if len(amounts) > 1 or len(found) > 1 or len(set(dates)) > 1:
+        confidence -= 0.5
+    if any(via_alias for _, via_alias in found):
+        confidence -= 0.1
+    # Explicit dates ("el 3 de agosto", "15/08") are resolved by the LLM
+    if months or EXPLICIT_DATE_PATTERN.search(text):
+        confidence -= 0.5
+    if DELETE_PATTERN.search(text):
+        confidence -= 0.5
+    if UNRESOLVED_DATE_PATTERN.search(text) or (not months and DAY_OF_MONTH_PATTERN.search(message_text)):
+        # "el mes pasado", "el lunes", "el 5": sin fecha se registraría con la de hoy
+        confidence = 0.0
+    return {"operation": "record_movement", "confidence": round(max(confidence, 0.0), 2),
+            "params": {key: value for key, value in params.items() if value is not None}}
+
+
+def classify(message_text, categories=()):
+    """
+    Maps a user message to an operation without calling the LLM.
+
+    Args:
+        message_text (str): The user's message.
+        categories (iterable): Category labels known by the ledger.
+
+    Returns:
+        dict: {"operation", "params", "confidence"}; operation is None when
+        no rule applies.
+    """
+    text = normalize_text(message_text)
+    tokens = text.split()
+    months = _find_months(tokens)
+    found = _find_categories(text, categories)
+    amounts = _find_amounts(message_text)
+    if amounts and RECORD_PATTERN.search(text) and not QUESTION_PATTERN.search(text) and '?' not in message_text:
+        return _classify_record(message_text, text, tokens, amounts, months, found)
+
+    expense = bool(EXPENSE_PATTERN.search(text))
+    income = bool(INCOME_PATTERN.search(text))
+    movements = bool(MOVEMENTS_PATTERN.search(text))
+    by_category = bool(BY_CATEGORY_PATTERN.search(text))
+    by_year = bool(BY_YEAR_PATTERN.search(text))
+
+    confidence = 1.0
+    if len(months) > 1:
+        confidence -= 0.5
+    if len(found) > 1:
+        confidence -= 0.5
+    if any(via_alias for _, via_alias in found):
+        confidence -= 0.1
+    if OUT_OF_SCOPE_PATTERN.search(text):
+        confidence -= 0.5
+    if RELATIVE_PERIOD_PATTERN.search(text):
+        # "este mes", "hoy": las operaciones responderían por todo el año
+        confidence -= 0.5
+    month = months[0] if months else None
+    category = found[0][0] if found else None
+    # A category that is itself an income (e.g. salary) implies the kind
+    if category and not (expense or income) and category.lower() in INCOME_CATEGORIES:
+        income = True
+        confidence -= 0.1
+
+    operation, params = None, {}
+    if movements and category and month:
+        operation, params = "movements_by_category_and_month", {"category": category, "month": month}
+        if income and not expense:
+            confidence -= 0.2
+    elif expense and income:
+        operation = "incomes_expenses_by_year"
+        if month or category:
+            confidence -= 0.4
+    elif expense and month and (category or by_category):
+        operation, params = "expenses_by_category_by_month", {"category": category or "category", "month": month}
+    elif expense and month:
+        operation, params = "expenses_by_month", {"month": month}
+    elif income and month:
+        operation, params = "incomes_by_month", {"month": month}
+        if category:
+            confidence -= 0.3
+    elif expense and category:
+        operation, params = "expenses_by_category_by_year", {"category": category}
+    elif income and category:
+        operation, params = "incomes_by_category_by_year", {"category": category}
+    elif by_year and not (month or category):
+        operation = "incomes_expenses_by_year"
+        confidence -= 0.1
+    else:
+        confidence = 0.0
+
+    decision = {"operation": operation, "confidence": round(max(confidence, 0.0), 2)}
+    if params:
+        decision["params"] = params
+    return decision
+
+
+def route_message(message_text, categories=(), threshold=None):
+    """
+    Routes a message locally when the rules are confident enough.
+
+    Returns:
+        dict: {"operation", "params"} ready to execute, or None when the
+        caller should ask the LLM.
+    """
+    threshold = CONFIDENCE_THRESHOLD if threshold is None else threshold
+    decision = classify(message_text, categories)
+    if decision["operation"] and decision["confidence"] >= threshold:
+        _stats["routed"] += 1
+        logger.info(f"Local router decision: {decision}")
+        return {key: value for key, value in decision.items() if key != "confidence"}
+    _stats["fallback"] += 1
+    logger.info(f"Local router not confident ({decision}), falling back to LLM")
+    return None
+
+
+def router_stats():
+    """Returns the routed/fallback counters and the local hit rate."""
+    total = _stats["routed"] + _stats["fallback"]
+    return {**_stats, "hit_rate": round(_stats["routed"] / total, 3) if total else 0.0}
@@ -0,0 +1,299 @@
+import logging
+import threading
+import pandas as pd
+from pandas.api.types import union_categoricals
+from services.amounts import parse_amounts
+
+logger = logging.getLogger()
+
+INCOME = 'income'
+EXPENSE = 'expensive'
+MOVEMENT_TYPES = [EXPENSE, INCOME]
+
+# Columns of a movement record passed to Ledger.append
+RECORD_COLUMNS = ['Description', 'Income/expensive', 'Cents', 'Category', 'Date']
+
+# Appended rows kept outside the main frame before they are merged into it
+TAIL_LIMIT = 1024
+
+
+def _clean_header(name):
+    """Strips padding and the UTF-8 BOM from a CSV header."""
+    return name.replace('\ufeff', '').strip()
+
+
+def _rejected_rows(values, mask, field):
+    """Describes the rows selected by mask; line numbers count the CSV header."""
+    positions = mask.nonzero()[0]
+    return [
+        {"line": int(i) + 2, "field": field, "value": values.iloc[i]}
+        for i in positions
+    ]
+
+
+class Ledger:
+    """
+    Typed, read-only view of the financial movements.
+
+    The ledger is built once per data version and shared by every caller,
+    so its frame must never be modified in place; new movements go through
+    append. Columns:
+
+        Description       category
+        Income/expensive  category ('expensive', 'income')
+        Cents             int64, amount in integer cents
+        Category          category
+        Date              datetime64
+        Year              int16
+        Month             int8
+
+    Args:
+        frame (pd.DataFrame): Frame with the typed columns above.
+        version (str, optional): Identifier of the source data version.
+        rejected (list, optional): Source rows left out of the frame, as dicts
+            with 'line', 'field' and 'value'.
+    """
+
+    def __init__(self, frame, version=None, rejected=None):
+        self._frame = frame
+        self.version = version
+        self.rejected = rejected or []
+        self._category_keys = None
+        self._lock = threading.Lock()
+        self._tail_records = []
+        self._tail = None
+        # (frame, bytes): el frame principal solo cambia al compactar
+        self._frame_usage = None
+
+    @property
+    def frame(self):
+        """The full typed frame, with the appended movements merged in."""
+        with self._lock:
+            if self._tail_records:
+                self._compact()
+            return self._frame
+
+    @classmethod
+    def from_transactions(cls, transactions, version=None):
+        """
+        Builds a ledger from the raw rows returned by csv_client.load_transactions.
+
+        Args:
+            transactions (list): List of dicts with the CSV columns as strings.
+            version (str, optional): Identifier of the source data version.
+
+        Returns:
+            Ledger: The typed ledger. Rows with a malformed amount or date are
+            left out and reported in `rejected`.
+        """
+        if not transactions:
+            return cls.empty(version)
+
+        df = pd.DataFrame(transactions)
+        df.columns = [_clean_header(c) for c in df.columns]
+
+        cents, valid_amount = parse_amounts(df['Amount'])
+        dates = pd.to_datetime(df['Date'], errors='coerce')
+        valid_date = dates.notna().to_numpy()
+
+        rejected = _rejected_rows(df['Amount'], ~valid_amount, 'Amount')
+        rejected += _rejected_rows(df['Date'], valid_amount & ~valid_date, 'Date')
+        if rejected:
+            rejected.sort(key=lambda r: r['line'])
+            logger.warning(f"Ledger rows rejected: {len(rejected)} (first: {rejected[:5]})")
+
+        frame = pd.DataFrame({
+            'Description': df['Description'],
+            'Income/expensive': df['Income/expensive'].str.strip().str.lower(),
+            'Cents': cents,
+            'Category': df['Category'].str.strip(),
+            'Date': dates,
+        })
+        frame = frame[valid_amount & valid_date]
+        return cls._typed(frame, version, rejected)
+
+    @classmethod
+    def empty(cls, version=None):
+        """Returns a ledger without movements."""
+        # Texto con el mismo dtype que las columnas leídas del CSV, así sus
+        # categorías se pueden unir con las de los movimientos agregados
+        frame = pd.DataFrame({
+            'Description': pd.Series(dtype=str),
+            'Income/expensive': pd.Series(dtype=str),
+            'Cents': pd.Series(dtype='int64'),
+            'Category': pd.Series(dtype=str),
+            'Date': pd.Series(dtype='datetime64[ns]'),
+        })
+        return cls._typed(frame, version)
+
+    @classmethod
+    def from_frame(cls, frame, version=None, rejected=None):
+        """
+        Builds a ledger from already validated columns (e.g. rows read from
+        another backend): Description, Income/expensive, Cents, Category and
+        a datetime64 Date.
+        """
+        return cls._typed(frame, version, rejected)
+
+    @classmethod
+    def _typed(cls, frame, version, rejected=None):
+        frame = frame.reset_index(drop=True)
+        frame['Description'] = frame['Description'].astype('category')
+        frame['Income/expensive'] = pd.Categorical(frame['Income/expensive'], categories=MOVEMENT_TYPES)
+        frame['Category'] = frame['Category'].astype('category')
+        frame['Year'] = frame['Date'].dt.year.astype('int16')
+        frame['Month'] = frame['Date'].dt.month.astype('int8')
+        return cls(frame, version, rejected)
+
+    def append(self, records):
+        """
+        Adds movements at the end of the ledger without copying its rows.
+
+        The records stay in a small tail frame that select merges with the
+        main frame; once the tail reaches TAIL_LIMIT rows it is merged into
+        the main frame, so the copy is amortized over many appends.
+
+        Args:
+            records (list): Dicts with RECORD_COLUMNS; Date as a datetime.
+        """
+        with self._lock:
+            self._tail_records.extend(records)
+            self._tail = None
+            self._category_keys = None
+            if len(self._tail_records) >= TAIL_LIMIT:
+                self._compact()
+
+    def _tail_frame(self):
+        """Typed frame of the appended records, indexed after the main frame."""
+        if self._tail is None and self._tail_records:
+            tail = pd.DataFrame(self._tail_records, columns=RECORD_COLUMNS)
+            tail['Date'] = pd.to_datetime(tail['Date'])
+            tail = Ledger._typed(tail, None).frame
+            tail.index = pd.RangeIndex(len(self._frame), len(self._frame) + len(tail))
+            self._tail = tail
+        return self._tail
+
+    def _compact(self):
+        self._frame = _concat([self._frame, self._tail_frame()], ignore_index=True)
+        self._tail_records = []
+        self._tail = None
+
+    def _parts(self):
+        with self._lock:
+            return self._frame, self._tail_frame()
+
+    def __len__(self):
+        return len(self._frame) + len(self._tail_records)
+
+    def memory_usage(self):
+        """Bytes held by the frame (deep, categories included) and the pending tail."""
+        frame, tail = self._frame, self._tail
+        measured = self._frame_usage
+        if measured is None or measured[0] is not frame:
+            # La medición profunda recorre los textos: se hace una vez por frame
+            measured = self._frame_usage = (frame, int(frame.memory_usage(deep=True).sum()))
+        usage = measured[1]
+        if tail is not None:
+            usage += int(tail.memory_usage(deep=True).sum())
+        # Registros del diario aún sin compactar: un dict pequeño por fila
+        return usage + len(self._tail_records) * 400
+
+    def categories_matching(self, category):
+        """
+        Returns the stored categories that match a name case-insensitively.
+
+        Args:
+            category (str): Category name as written by the user.
+
+        Returns:
+            list: Matching category labels, possibly empty.
+        """
+        if self._category_keys is None:
+            frame, tail = self._parts()
+            labels = list(frame['Category'].cat.categories)
+            if tail is not None:
+                labels += [label for label in tail['Category'].cat.categories if label not in labels]
+            keys = {}
+            for label in labels:
+                keys.setdefault(label.lower(), []).append(label)
+            self._category_keys = keys
+        return self._category_keys.get(str(category).strip().lower(), [])
+
+    def select(self, kind=None, year=None, month=None, category=None):
+        """
+        Filters the movements.
+
+        Args:
+            kind (str, optional): 'income' or 'expensive'.
+            year (int, optional): Year number.
+            month (int, optional): Month number (1-12).
+            category (str, optional): Category name, matched case-insensitively.
+
+        Returns:
+            pd.DataFrame: The matching rows (a view that must not be modified).
+        """
+        frame, tail = self._parts()
+        selected = self._filter(frame, kind, year, month, category)
+        if tail is None:
+            return selected
+        appended = self._filter(tail, kind, year, month, category)
+        if len(appended) == 0:
+            return selected
+        return _concat([selected, appended])
+
+    def _filter(self, df, kind, year, month, category):
+        mask = pd.Series(True, index=df.index)
+        if kind is not None:
+            mask &= df['Income/expensive'] == kind
+        if year is not None:
+            mask &= df['Year'] == int(year)
+        if month is not None:
+            mask &= df['Month'] == int(month)
+        if category is not None:
+            mask &= df['Category'].isin(self.categories_matching(category))
+        return df[mask]
+
+    @staticmethod
+    def total(frame):
+        """Returns the sum of the amounts of a frame as a float."""
+        return int(frame['Cents'].sum()) / 100
+
+    @staticmethod
+    def sum_by(frame, by):
+        """
+        Sums the amounts of a frame grouped by one or more columns.
+
+        Returns:
+            pd.Series: Float totals indexed by the observed group keys.
+        """
+        return frame.groupby(by, observed=True)['Cents'].sum() / 100
+
+    @staticmethod
+    def to_records(frame):
+        """
+        Converts rows to the record format used in operation results.
+
+        Returns:
+            list: Dicts with Description, Income/expensive, Amount, Category,
+            Date, Year and Month.
+        """
+        records = pd.DataFrame({
+            'Description': frame['Description'],
+            'Income/expensive': frame['Income/expensive'].astype(object),
+            'Amount': frame['Cents'] / 100,
+            'Category': frame['Category'].astype(object),
+            'Date': frame['Date'],
+            'Year': frame['Year'].astype('int64'),
+            'Month': frame['Month'].astype('int64'),
+        })
+        return records.to_dict('records')
+
+
+def _concat(frames, ignore_index=False):
+    """Concatenates ledger frames keeping Description and Category as categoricals."""
+    frame = pd.concat(frames, ignore_index=ignore_index)
+    for column in ('Description', 'Category'):
+        values = union_categoricals([f[column] for f in frames], ignore_order=True)
+        frame[column] = pd.Categorical(values, categories=values.categories)
+    frame['Income/expensive'] = pd.Categorical(frame['Income/expensive'], categories=MOVEMENT_TYPES)
+    return frame
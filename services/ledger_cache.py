@@ -0,0 +1,94 @@
+import hashlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger()
+
+
+def file_identity(path):
+    """Returns the cheap identity (size, mtime) of a file."""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def file_hash(path):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LedgerCache:
+    """
+    Process-level cache for a value built from a source file.
+
+    The value survives across warm Lambda invocations and is rebuilt only
+    when the source file changes. A change in size or mtime triggers a
+    content-hash check, so a file that was touched but not modified is not
+    parsed again.
+
+    Args:
+        path (str): Path of the source file.
+        builder (callable): Function that receives the path and the content
+            hash and returns the value to cache.
+    """
+
+    def __init__(self, path, builder):
+        self.path = path
+        self._builder = builder
+        self._lock = threading.Lock()
+        self._value = None
+        self._identity = None
+        self._hash = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def get(self):
+        """Returns the cached value, rebuilding it if the source changed."""
+        with self._lock:
+            identity = file_identity(self.path)
+            if self._value is not None and identity == self._identity:
+                self.hits += 1
+                return self._value
+
+            content_hash = file_hash(self.path)
+            if self._value is not None and content_hash == self._hash:
+                # Same content with a new mtime: keep the parsed value
+                self._identity = identity
+                self.hits += 1
+                return self._value
+
+            if self._value is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+                logger.info(f"Source {self.path} changed, reloading ledger")
+
+            self._value = self._builder(self.path, content_hash)
+            self._identity = identity
+            self._hash = content_hash
+            return self._value
+
+    def peek(self):
+        """Returns the cached value, or None, without checking the source or waiting for a build."""
+        return self._value
+
+    @property
+    def version(self):
+        """Content hash of the currently cached source, or None."""
+        return self._hash
+
+    def invalidate(self):
+        """Drops the cached value so the next call rebuilds it."""
+        with self._lock:
+            self._value = None
+            self._identity = None
+            self._hash = None
+
+    def stats(self):
+        """Returns the hit, miss and reload counters."""
+        return {"hits": self.hits, "misses": self.misses, "reloads": self.reloads}
@@ -0,0 +1,274 @@
+"""
+Diario de movimientos registrados desde el chat.
+
+movements.csv se despliega con el paquete y es de solo lectura, así que los
+movimientos nuevos se agregan a un diario aparte con el mismo formato (mismo
+encabezado, separador ';' y montos como ' $50.000 '). Cada movimiento es una
+sola línea escrita con O_APPEND en una única llamada a write y sincronizada
+con fsync antes de confirmarla: agregar no depende del tamaño del ledger.
+
+Si el proceso muere a mitad de una escritura queda una última línea sin fin
+de línea; al volver a abrir el diario esa línea incompleta se descarta
+(nunca se confirmó al usuario). Las escrituras toman un flock exclusivo, así
+varios procesos pueden compartir el diario (p. ej. sobre EFS).
+
+La versión del ledger combina el hash del CSV base con el hash acumulado de
+las filas del diario: cambia con cada movimiento registrado y es igual al
+hash del CSV mientras el diario está vacío.
+"""
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+from datetime import date as Date
+from services.ledger import MOVEMENT_TYPES
+
+logger = logging.getLogger()
+
+HEADER = "\ufeffDescription;Income/expensive; Amount ;Category;Date\r\n"
+COLUMNS = ('Description', 'Income/expensive', 'Amount', 'Category', 'Date')
+
+# Texto que rompería el formato de la línea
+_FORBIDDEN = (';', '"', '\r', '\n')
+
+class JournalNotConfigured(Exception):
+    """No durable journal location was configured, so a movement would be lost."""
+
+
+# Mayor monto aceptado, en centavos (mismo límite de dígitos que amounts.parse_amounts)
+MAX_CENTS = 10 ** 18
+
+
+def format_amount(cents):
+    """Formatea centavos como en movements.csv: ' $50.000 ' o ' $1.234,50 '."""
+    pesos, fraction = divmod(cents, 100)
+    text = f"{pesos:,}".replace(',', '.')
+    if fraction:
+        text += f",{fraction:02d}"
+    return f" ${text} "
+
+
+def _clean_text(name, value):
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{name} must be a non-empty text")
+    value = value.strip()
+    if any(c in value for c in _FORBIDDEN):
+        raise ValueError(f"{name} cannot contain ';', quotes or line breaks")
+    return value
+
+
+def new_transaction(kind, cents, category, date, description=None):
+    """
+    Valida un movimiento y lo convierte a una fila del CSV.
+
+    Args:
+        kind (str): 'expensive' o 'income'.
+        cents (int): Monto positivo en centavos.
+        category (str): Categoría.
+        date (datetime.date): Fecha del movimiento.
+        description (str, optional): Descripción; por defecto la categoría.
+
+    Returns:
+        dict: Columnas del CSV como texto, igual que csv_client.load_transactions.
+
+    Raises:
+        ValueError: Si algún campo no es válido.
+    """
+    if kind not in MOVEMENT_TYPES:
+        raise ValueError(f"Invalid movement type: {kind!r}")
+    if isinstance(cents, bool) or not isinstance(cents, int) or not 0 < cents < MAX_CENTS:
+        raise ValueError(f"Invalid amount: {cents!r}")
+    if not isinstance(date, Date):
+        raise ValueError(f"Invalid date: {date!r}")
+    category = _clean_text("category", category)
+    description = _clean_text("description", description) if description else category
+    return {
+        'Description': description,
+        'Income/expensive': kind,
+        'Amount': format_amount(cents).strip(),
+        'Category': category,
+        'Date': f"{date:%Y-%m-%d} 00:00:00",
+    }
+
+
+def _line(transaction):
+    amount = f" {transaction['Amount']} "
+    return ";".join((transaction['Description'], transaction['Income/expensive'], amount,
+                     transaction['Category'], transaction['Date'])) + "\r\n"
+
+
+def combined_version(base_version, digest):
+    """Versión del ledger para el CSV base más las filas del diario (digest None si está vacío)."""
+    if digest is None or base_version is None:
+        return base_version
+    return hashlib.sha256(f"{base_version}:{digest}".encode('ascii')).hexdigest()
+
+
+class LedgerJournal:
+    """
+    Append-only CSV journal of the movements recorded after deployment.
+
+    Args:
+        path (str): Journal file; created on the first append.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset()
+        self._loaded = False
+
+    def _reset(self):
+        self._transactions = []
+        self._offset = 0
+        self._hasher = hashlib.sha256()
+        self._digest = None
+        # digest -> número de movimientos hasta esa línea
+        self._positions = {None: 0}
+
+    @property
+    def digest(self):
+        """Hash of the journal lines read so far, or None while it is empty."""
+        return self._digest
+
+    def _consume(self, fd, truncate=False):
+        """
+        Reads the complete lines written after the last consumed offset.
+
+        With truncate (only while holding the flock) an incomplete last
+        line is a torn write and is cut off the file.
+        """
+        size = os.fstat(fd).st_size
+        if size < self._offset:
+            # El diario fue truncado o reemplazado: se relee completo
+            logger.warning(f"Journal {self.path} shrank, reloading it")
+            self._reset()
+        if size == self._offset:
+            return
+        data = os.pread(fd, size - self._offset, self._offset)
+        end = data.rfind(b"\n") + 1
+        if end < len(data) and truncate:
+            logger.warning(f"Discarding torn write at the end of {self.path} ({len(data) - end} bytes)")
+            os.ftruncate(fd, self._offset + end)
+            os.fsync(fd)
+        data = data[:end]
+        start = 0
+        if self._offset == 0 and data.startswith(HEADER.encode('utf-8')):
+            start = len(HEADER.encode('utf-8'))
+        self._offset += end
+
+        for raw in data[start:].splitlines():
+            self._hasher.update(raw + b"\n")
+            values = raw.decode('utf-8').split(';')
+            if len(values) == len(COLUMNS):
+                self._transactions.append({column: value.strip() for column, value in zip(COLUMNS, values)})
+            else:
+                logger.warning(f"Ignoring malformed journal line in {self.path}: {raw[:80]!r}")
+            self._digest = self._hasher.hexdigest()
+            self._positions[self._digest] = len(self._transactions)
+
+    def _read(self):
+        """Reads the lines appended since the last read, without blocking writers."""
+        self._loaded = True
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            if self._offset:
+                self._reset()
+            return
+        try:
+            self._consume(fd)
+        finally:
+            os.close(fd)
+
+    def changed(self):
+        """Tells, with a single stat, whether the file differs from what was read."""
+        try:
+            size = os.stat(self.path).st_size
+        except FileNotFoundError:
+            size = 0
+        return not self._loaded or size != self._offset
+
+    def sync(self):
+        """Reads the lines other processes appended since the last read."""
+        with self._lock:
+            self._read()
+
+    def snapshot(self):
+        """
+        Returns every journal transaction and the journal digest.
+
+        Returns:
+            tuple: (list of transactions, digest or None when empty).
+        """
+        with self._lock:
+            self._read()
+            return list(self._transactions), self._digest
+
+    def position(self, base_version, version):
+        """
+        Number of journal movements included in a ledger version.
+
+        Args:
+            base_version (str): Content hash of the base CSV.
+            version (str): Version built with combined_version.
+
+        Returns:
+            int: Movements of the journal the version already contains, or
+            None if it does not correspond to any prefix of the journal.
+        """
+        with self._lock:
+            for digest in reversed(self._positions):
+                if combined_version(base_version, digest) == version:
+                    return self._positions[digest]
+        return None
+
+    def append(self, transaction):
+        """
+        Appends one movement as a single durable line.
+
+        Lines other processes appended since the last read are read first,
+        so the journal state stays in file order.
+
+        Args:
+            transaction (dict): Row built by new_transaction.
+        """
+        line = _line(transaction).encode('utf-8')
+        with self._lock:
+            self._loaded = True
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            created = not os.path.exists(self.path)
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                self._consume(fd, truncate=True)
+                data = line
+                if self._offset == 0:
+                    data = HEADER.encode('utf-8') + line
+                # Una sola escritura: la línea queda completa o se descarta al recuperar
+                written = os.write(fd, data)
+                if written != len(data):
+                    raise OSError(f"Short write to {self.path}: {written} of {len(data)} bytes")
+                os.fsync(fd)
+                self._consume(fd)
+            finally:
+                os.close(fd)
+            if created and directory:
+                _fsync_directory(directory)
+
+
+def _fsync_directory(path):
+    # La entrada del archivo nuevo también debe sobrevivir a un corte
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,418 @@
+"""
+Ledgers particionados por chat.
+
+Cada LedgerPartition agrupa lo que antes eran singletons de csv_client: el
+CSV base, el diario de movimientos registrados, los caches del Ledger, del
+cubo y de la base SQLite, y el lock de escritura. csv_client usa una
+partición global y, con LEDGER_PARTITIONS_DIR, una por chat:
+
+    {LEDGER_PARTITIONS_DIR}/{chat_id}/movements.csv
+    {LEDGER_PARTITIONS_DIR}/{chat_id}/journal.csv
+
+Las particiones de los chats se cargan en la primera consulta del chat y se
+guardan en un LRU que se limita por memoria medida (memory_usage profundo
+del Ledger, tamaño del cubo y caché de páginas de SQLite), no por cantidad.
+El chat activo viaja en un contextvar, igual que las métricas de la
+invocación, así operations_client no recibe el chat_id como argumento.
+"""
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from services.amounts import parse_amounts
+from services.ledger import Ledger
+from services.ledger_cache import LedgerCache
+from services.ledger_journal import LedgerJournal, new_transaction, combined_version, HEADER
+from services.metrics import current_metrics
+from services.rollup import RollupCube
+from services import snapshot
+
+logger = logging.getLogger()
+
+_current_chat = contextvars.ContextVar('ledger_chat', default=None)
+
+
+@contextmanager
+def chat_scope(chat_id=None):
+    """Runs a block with chat_id as the active chat and restores the previous one."""
+    token = _current_chat.set(chat_id)
+    try:
+        yield
+    finally:
+        _current_chat.reset(token)
+
+
+def set_current_chat(chat_id):
+    """Changes the active chat inside the current chat_scope."""
+    _current_chat.set(chat_id)
+
+
+def current_chat():
+    """Returns the active chat id, or None."""
+    return _current_chat.get()
+
+
+def _movement_records(transactions):
+    """
+    Convierte filas del diario a los registros tipados de Ledger.append, con
+    las mismas reglas que el parseo del CSV; las filas inválidas se descartan.
+    """
+    cents, valid = parse_amounts([t.get('Amount', '') for t in transactions])
+    records = []
+    for transaction, amount, valid_amount in zip(transactions, cents.tolist(), valid.tolist()):
+        try:
+            date = datetime.fromisoformat(transaction['Date'])
+        except (KeyError, TypeError, ValueError):
+            valid_amount = False
+        if not valid_amount:
+            logger.warning(f"Ignoring invalid journal movement: {transaction}")
+            continue
+        records.append({
+            'Description': transaction['Description'],
+            'Income/expensive': transaction['Income/expensive'].strip().lower(),
+            'Cents': amount,
+            'Category': transaction['Category'].strip(),
+            'Date': date,
+        })
+    return records
+
+
+def _add_to_cube(cube, record):
+    date = record['Date']
+    cube.add(record['Income/expensive'], date.year, date.month, record['Category'], int(record['Cents']))
+
+
+def _memory_usage(value):
+    """Bytes held by a cached Ledger, RollupCube or SQLiteLedger."""
+    usage = getattr(value, 'memory_usage', None)
+    return int(usage()) if usage is not None else sys.getsizeof(value)
+
+
+class LedgerPartition:
+    """
+    One ledger: base CSV, journal and the caches built from them.
+
+    Args:
+        csv_path (str): Base movements CSV.
+        journal_path (str): Journal of the movements recorded from chat.
+        cache_dir (str): Writable directory for the persisted cube.
+        db_path (str, optional): SQLite file for the sqlite backend.
+        backend (str): 'csv' (pandas in memory) or 'sqlite'.
+        on_load (callable, optional): Called with (partition, load_ms) after
+            a cache of the partition was built, and with load_ms None after
+            movements were appended to the loaded caches.
+    """
+
+    def __init__(self, csv_path, journal_path, cache_dir, db_path=None, backend='csv', on_load=None):
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir
+        self.db_path = db_path or os.path.join(cache_dir, 'ledger.sqlite3')
+        self.backend = backend
+        self.journal = LedgerJournal(journal_path)
+        self._on_load = on_load
+        # Serializa la aplicación de movimientos nuevos a los agregados cargados
+        self._write_lock = threading.Lock()
+        self.ledger_cache = LedgerCache(csv_path, self._build_ledger)
+        self.rollup_cache = LedgerCache(csv_path, self._build_rollup)
+        self.store_cache = LedgerCache(csv_path, self._build_store)
+
+    def _caches(self):
+        return (self.ledger_cache, self.rollup_cache, self.store_cache)
+
+    # Builders
+
+    def _build_ledger(self, path, content_hash):
+        """
+        Construye el Ledger tipado para esta versión del archivo. Si existe un
+        snapshot binario compilado a partir del mismo contenido se mapea en
+        memoria; si falta o está desactualizado se parsea el CSV. Los
+        movimientos del diario se agregan al final.
+        """
+        from services.csv_client import load_ledger_file
+        transactions, digest = self.journal.snapshot()
+        ledger = snapshot.load_snapshot(snapshot.snapshot_path(path), source_hash=content_hash)
+        if ledger is None:
+            ledger = load_ledger_file(path, content_hash)
+        if transactions:
+            ledger.append(_movement_records(transactions))
+        ledger.version = combined_version(content_hash, digest)
+        return ledger
+
+    def _build_store(self, path, content_hash):
+        """
+        Abre la base SQLite del ledger y la reimporta desde el CSV solo si fue
+        construida a partir de otro contenido. Si solo le faltan movimientos
+        del diario, se insertan sin reimportar.
+        """
+        from services.csv_client import load_ledger_file
+        from services.sqlite_ledger import SQLiteLedger
+        transactions, digest = self.journal.snapshot()
+        version = combined_version(content_hash, digest)
+        store = SQLiteLedger(self.db_path)
+        position = self.journal.position(content_hash, store.version) if store.version else None
+        if position is None:
+            ledger = load_ledger_file(path)
+            ledger.append(_movement_records(transactions))
+            store.import_ledger(ledger, version)
+        elif position < len(transactions):
+            store.append(_movement_records(transactions[position:]), version)
+        return store
+
+    def rollup_file(self, version):
+        return os.path.join(self.cache_dir, f"rollup-{version}.json")
+
+    def _save_rollup(self, cube):
+        try:
+            cube.save(self.rollup_file(cube.version))
+        except OSError as e:
+            logger.warning(f"Could not save the rollup cube: {str(e)}")
+
+    def _build_rollup(self, path, content_hash):
+        """
+        Carga el cubo de agregados persistido para esta versión del CSV y del
+        diario (en /tmp o en el snapshot); si no existe lo construye a partir
+        del Ledger y lo guarda para los arranques en frío
+        """
+        transactions, digest = self.journal.snapshot()
+        version = combined_version(content_hash, digest)
+        cube = RollupCube.load(self.rollup_file(version), version=version)
+        if cube is not None:
+            return cube
+        cube = RollupCube.load(self.rollup_file(content_hash), version=content_hash)
+        if cube is None:
+            cube = snapshot.load_rollup(snapshot.snapshot_path(path), source_hash=content_hash)
+        if cube is not None:
+            # Cubo del CSV base: basta sumarle los movimientos del diario
+            for record in _movement_records(transactions):
+                _add_to_cube(cube, record)
+            cube.version = version
+            if transactions:
+                self._save_rollup(cube)
+            return cube
+
+        ledger = self._load(self.ledger_cache)
+        cube = RollupCube.from_ledger(ledger)
+        if ledger.version == version:
+            self._save_rollup(cube)
+        return cube
+
+    # Lectura
+
+    def active_cache(self):
+        """Cache that answers the aggregate queries for the backend."""
+        return self.store_cache if self.backend == 'sqlite' else self.rollup_cache
+
+    def _catch_up(self, cache, value):
+        """
+        Aplica a un Ledger, cubo o base SQLite ya cargado los movimientos del
+        diario que todavía no incluye, sin recalcularlo. Devuelve False si el
+        valor no corresponde a ningún estado del diario y hay que reconstruirlo.
+        """
+        transactions, digest = self.journal.snapshot()
+        base = cache.version
+        target = combined_version(base, digest)
+        if value.version == target:
+            return True
+        position = self.journal.position(base, value.version)
+        if position is None:
+            return False
+        previous = value.version
+        records = _movement_records(transactions[position:])
+        if isinstance(value, RollupCube):
+            for record in records:
+                _add_to_cube(value, record)
+            value.version = target
+            self._save_rollup(value)
+            if previous != base:
+                # El cubo de la versión anterior ya no se vuelve a leer
+                try:
+                    os.remove(self.rollup_file(previous))
+                except OSError:
+                    pass
+        elif isinstance(value, Ledger):
+            value.append(records)
+            value.version = target
+        else:
+            value.append(records, target)
+        return True
+
+    def _load(self, cache):
+        """
+        Devuelve el valor del cache al día con el diario: los movimientos que
+        se registraron después de construirlo (en este u otro proceso) se le
+        aplican de forma incremental.
+        """
+        if self.journal.changed():
+            self.journal.sync()
+        builds = cache.misses + cache.reloads
+        started = time.perf_counter()
+        value = cache.get()
+        if value.version != combined_version(cache.version, self.journal.digest):
+            with self._write_lock:
+                current = self._catch_up(cache, value)
+            if not current:
+                cache.invalidate()
+                value = cache.get()
+        if cache.misses + cache.reloads != builds and self._on_load is not None:
+            self._on_load(self, (time.perf_counter() - started) * 1000)
+        return value
+
+    def load_ledger(self):
+        """Ledger (or SQLiteLedger with the sqlite backend) with the journal applied."""
+        return self._load(self.store_cache if self.backend == 'sqlite' else self.ledger_cache)
+
+    def load_rollup(self):
+        """Aggregates cube (or SQLiteLedger) with the journal applied."""
+        return self._load(self.active_cache())
+
+    def version(self):
+        """Version of the movements: CSV hash combined with the journal."""
+        return self._load(self.active_cache()).version
+
+    def append_movement(self, kind, cents, category, date, description=None):
+        """
+        Records a movement in the journal and applies it to the loaded caches.
+
+        Returns:
+            dict: The recorded transaction, as CSV text columns.
+
+        Raises:
+            ValueError: If the movement is not valid.
+            OSError: If the journal could not be written.
+        """
+        transaction = new_transaction(kind, cents, category, date, description)
+        self.journal.append(transaction)
+        # Los valores ya cargados se actualizan ahora; los demás incluirán el
+        # movimiento cuando se construyan
+        for cache in self._caches():
+            value = cache.peek()
+            if value is None:
+                continue
+            with self._write_lock:
+                current = self._catch_up(cache, value)
+            if not current:
+                cache.invalidate()
+        if self._on_load is not None:
+            # La cola del Ledger y las celdas del cubo crecieron
+            self._on_load(self, None)
+        return transaction
+
+    def memory_usage(self):
+        """Bytes held by the loaded Ledger, cube and SQLite page cache."""
+        return sum(_memory_usage(value) for value in (cache.peek() for cache in self._caches())
+                   if value is not None)
+
+    def stats(self):
+        """Hit, miss and reload counters of the ledger cache."""
+        return self.ledger_cache.stats()
+
+
+class PartitionCache:
+    """
+    LRU of per-chat partitions bounded by their measured memory.
+
+    A partition is created on the first query of its chat. Its footprint
+    is measured again after each load, after each append and every time
+    it is used, so growth after the load (cube indexes built by queries,
+    appended movements) counts too. Whenever the total exceeds the budget
+    the least recently used partitions are dropped; the partition being
+    used is never dropped, even if it alone exceeds the budget. Eviction
+    only drops the references, so a partition still in use by another
+    thread keeps working until that thread is done.
+
+    Args:
+        factory (callable): Builds the LedgerPartition of a chat id; receives
+            the chat id and the on_load callback.
+        budget_bytes (int): Memory budget for all resident partitions.
+    """
+
+    def __init__(self, factory, budget_bytes):
+        self._factory = factory
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._partitions = OrderedDict()
+        self._footprints = {}
+        self.loads = 0
+        self.evictions = 0
+        self.load_ms = 0.0
+
+    def get(self, chat_id):
+        """Returns the partition of a chat, creating it on first use."""
+        with self._lock:
+            partition = self._partitions.get(chat_id)
+            if partition is None:
+                partition = self._factory(chat_id, self._loaded)
+                partition.chat_id = chat_id
+                self._partitions[chat_id] = partition
+                self._footprints[chat_id] = 0
+                return partition
+            self._partitions.move_to_end(chat_id)
+        # Lo que creció desde la última medición (índices del cubo, movimientos)
+        self._measure(partition)
+        return partition
+
+    def _loaded(self, partition, load_ms):
+        """Counts a load (load_ms None after an append) and measures the partition."""
+        if load_ms is not None:
+            current_metrics().put("ledger_load_ms", load_ms, "Milliseconds", add=True)
+            with self._lock:
+                self.loads += 1
+                self.load_ms += load_ms
+        self._measure(partition)
+
+    def _measure(self, partition):
+        """Updates the footprint of a partition and evicts to stay under budget."""
+        footprint = partition.memory_usage()
+        with self._lock:
+            chat_id = getattr(partition, 'chat_id', None)
+            if self._partitions.get(chat_id) is not partition:
+                # Ya fue desalojada: no cuenta en el presupuesto
+                return
+            self._footprints[chat_id] = footprint
+            evicted = 0
+            while sum(self._footprints.values()) > self.budget_bytes and len(self._partitions) > 1:
+                oldest = next(iter(self._partitions))
+                if oldest == chat_id:
+                    self._partitions.move_to_end(chat_id)
+                    continue
+                del self._partitions[oldest]
+                self._footprints.pop(oldest)
+                evicted += 1
+            self.evictions += evicted
+        if evicted:
+            current_metrics().put("ledger_evictions", evicted, add=True)
+            logger.info(f"Evicted {evicted} ledger partitions, resident: {self.stats()}")
+
+    def __contains__(self, chat_id):
+        return chat_id in self._partitions
+
+    def __len__(self):
+        return len(self._partitions)
+
+    def stats(self):
+        """Resident partitions and bytes, loads, evictions and mean load time."""
+        with self._lock:
+            return {
+                "resident": len(self._partitions),
+                "resident_bytes": sum(self._footprints.values()),
+                "budget_bytes": self.budget_bytes,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "load_ms_avg": round(self.load_ms / self.loads, 1) if self.loads else 0.0,
+            }
+
+
+def ensure_ledger_file(path):
+    """Creates an empty movements CSV (header only) if path does not exist."""
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(HEADER)
+    os.replace(tmp_path, path)
@@ -0,0 +1,175 @@
+"""
+Lectura en streaming del CSV de movimientos a columnas tipadas.
+
+csv_client.load_transactions arma una lista de dicts (y otro dict por fila al
+limpiar los espacios) que Ledger.from_transactions vuelve a copiar a un
+DataFrame de texto: el pico de memoria es varias veces el del Ledger final.
+read_ledger lee el archivo por bloques de CHUNK_ROWS filas con csv.reader
+(implementado en C) y convierte cada bloque a búferes tipados antes de leer
+el siguiente:
+
+- Cents: int64 con amounts.parse_amounts,
+- Date: datetime64,
+- Income/expensive: códigos int8 sobre MOVEMENT_TYPES,
+- Description y Category: códigos int32 sobre un diccionario de textos que
+  crece con cada bloque (cada texto distinto se guarda una sola vez).
+
+Solo un bloque de texto está en memoria a la vez. Acepta el formato de
+movements.csv: BOM al inicio, separador ';' y encabezados con espacios
+(' Amount '). Las filas con monto o fecha inválidos, o con un número de
+columnas distinto al del encabezado, se omiten y se reportan con su línea
+en el archivo (cuentan las líneas en blanco y los saltos de línea dentro de
+campos entre comillas).
+"""
+import csv
+import logging
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+from services.amounts import parse_amounts
+from services.ledger import Ledger, MOVEMENT_TYPES, _clean_header
+
+logger = logging.getLogger()
+
+# Filas por bloque: acota la memoria del texto leído y no cambia el resultado
+CHUNK_ROWS = 1 << 16
+
+COLUMNS = ('Description', 'Income/expensive', 'Amount', 'Category', 'Date')
+
+
+class _StringColumn:
+    """Dictionary-encoded text column filled chunk by chunk."""
+
+    def __init__(self):
+        self._labels = {}
+        self._codes = []
+
+    def add(self, values):
+        codes, uniques = pd.factorize(values)
+        labels = self._labels
+        mapping = np.fromiter((labels.setdefault(label, len(labels)) for label in uniques),
+                              dtype=np.int32, count=len(uniques))
+        self._codes.append(mapping[codes])
+
+    def categorical(self):
+        """Categorical with sorted categories, like astype('category')."""
+        labels = sorted(self._labels)
+        rank = np.empty(len(labels), dtype=np.int32)
+        rank[[self._labels[label] for label in labels]] = np.arange(len(labels), dtype=np.int32)
+        codes = rank[np.concatenate(self._codes)]
+        return pd.Categorical.from_codes(codes, categories=pd.Index(labels), validate=False)
+
+
+def _rejected(values, mask, field, lines):
+    return [
+        {"line": int(lines[i]), "field": field, "value": values[i]}
+        for i in mask.nonzero()[0]
+    ]
+
+
+def _chunks(path, chunk_rows):
+    """
+    Yields (columns, lines, bad) per block of rows.
+
+    columns maps each ledger column to a Series of its stripped text, lines
+    holds the physical line where each row starts and bad lists the rows
+    whose field count does not match the header, as rejected dicts.
+    """
+    with open(path, mode='r', encoding='utf-8-sig', newline='') as file:
+        reader = csv.reader(file, delimiter=';')
+        header = [_clean_header(name) for name in next(reader, [])]
+        missing = [c for c in COLUMNS if c not in header]
+        if missing:
+            raise ValueError(f"Missing columns in {path}: {missing}")
+        positions = [header.index(c) for c in COLUMNS]
+        width = len(header)
+
+        rows, lines, bad = [], [], []
+        line = reader.line_num + 1
+        for row in reader:
+            if row and len(row) >= width and not any(v.strip() for v in row[width:]):
+                rows.append(row)
+                lines.append(line)
+            elif row:
+                # Sobran o faltan columnas: la fila no se puede interpretar
+                bad.append({"line": line, "field": "columns", "value": ";".join(row)})
+            line = reader.line_num + 1
+            if len(rows) >= chunk_rows:
+                yield _columns(rows, positions), np.array(lines, dtype=np.int64), bad
+                rows, lines, bad = [], [], []
+        if rows or bad:
+            yield _columns(rows, positions), np.array(lines, dtype=np.int64), bad
+
+
+def _columns(rows, positions):
+    fields = list(zip(*rows)) if rows else [()] * (max(positions) + 1)
+    return {
+        column: pd.Series(np.array(fields[p], dtype=object), dtype=object).str.strip()
+        for column, p in zip(COLUMNS, positions)
+    }
+
+
+def read_ledger(path, version=None, chunk_rows=CHUNK_ROWS):
+    """
+    Reads a movements CSV into a Ledger without building per-row dicts.
+
+    Args:
+        path (str): Movements CSV.
+        version (str, optional): Identifier of the source data version.
+        chunk_rows (int): Rows converted per block.
+
+    Returns:
+        Ledger: Same rows and types as
+        Ledger.from_transactions(csv_client.load_transactions(path)); the
+        rejected rows carry their physical line number.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If it is not valid UTF-8, is not a CSV or a column is missing.
+    """
+    descriptions, categories = _StringColumn(), _StringColumn()
+    kinds, cents, dates, rejected = [], [], [], []
+    date_format = None
+
+    try:
+        for chunk, lines, bad in _chunks(path, chunk_rows):
+            rejected += bad
+            amounts = chunk['Amount'].to_numpy()
+            chunk_cents, valid_amount = parse_amounts(amounts)
+            date_text = chunk['Date']
+            if date_format is None:
+                # Formato de la primera fecha del archivo, como al parsear la
+                # columna completa: todos los bloques usan el mismo
+                first = next((d for d in date_text if d), None)
+                date_format = first and guess_datetime_format(first)
+            chunk_dates = pd.to_datetime(date_text, format=date_format or None, errors='coerce').to_numpy()
+            valid_date = ~np.isnat(chunk_dates)
+            rejected += _rejected(amounts, ~valid_amount, 'Amount', lines)
+            rejected += _rejected(date_text.to_numpy(), valid_amount & ~valid_date, 'Date', lines)
+
+            valid = valid_amount & valid_date
+            kind = chunk['Income/expensive'][valid].str.lower()
+            kinds.append(pd.Categorical(kind, categories=MOVEMENT_TYPES).codes)
+            cents.append(chunk_cents[valid])
+            dates.append(chunk_dates[valid])
+            descriptions.add(chunk['Description'][valid])
+            categories.add(chunk['Category'][valid])
+    except csv.Error as e:
+        raise ValueError(f"Invalid CSV {path}: {str(e)}") from e
+
+    if rejected:
+        rejected.sort(key=lambda r: r['line'])
+        logger.warning(f"Ledger rows rejected: {len(rejected)} (first: {rejected[:5]})")
+    if not sum(len(c) for c in cents):
+        ledger = Ledger.empty(version)
+        ledger.rejected = rejected
+        return ledger
+
+    frame = pd.DataFrame({
+        'Description': descriptions.categorical(),
+        'Income/expensive': pd.Categorical.from_codes(np.concatenate(kinds), MOVEMENT_TYPES, validate=False),
+        'Cents': np.concatenate(cents),
+        'Category': categories.categorical(),
+        'Date': np.concatenate(dates),
+    }, copy=False)
+    return Ledger.from_frame(frame, version, rejected)
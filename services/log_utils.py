@@ -0,0 +1,104 @@
+"""
+Logging de payloads (eventos, cuerpos de updates, respuestas de la API) sin
+costo cuando nadie los lee.
+
+payload(value) envuelve un objeto y solo lo redacta y serializa si logging
+llega a formatear el registro: con el nivel deshabilitado no se ejecuta
+ningún json.dumps. log_payload además muestrea: solo una fracción
+LOG_PAYLOAD_SAMPLE_RATE de las llamadas escribe el payload completo.
+
+Lo escrito siempre pasa por redact(): textos de mensajes, nombres de
+usuario, headers y tokens se reemplazan por su tamaño.
+"""
+import json
+import logging
+import os
+import random
+import re
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# Fracción de payloads completos que se escriben (1 = todos, 0 = ninguno)
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', '0.01'))
+
+# Campos con texto del usuario, datos personales o credenciales (en minúsculas)
+REDACTED_KEYS = frozenset({
+    'text', 'caption', 'first_name', 'last_name', 'username', 'phone_number',
+    'headers', 'multivalueheaders', 'authorization', 'token', 'api_key',
+})
+
+# Token de bot de Telegram (123456:ABC...) y API keys de OpenAI (sk-...)
+_SECRET_PATTERN = re.compile(r'\d{6,}:[A-Za-z0-9_-]{30,}|sk-[A-Za-z0-9_-]{20,}')
+
+
+def _redacted(value):
+    if isinstance(value, dict):
+        return f"[{len(value)} keys]"
+    return f"[{len(str(value))} chars]"
+
+
+def redact(value):
+    """
+    Returns a copy of value safe to write to the logs.
+
+    Fields named in REDACTED_KEYS are replaced by their size, secrets found
+    in strings are masked, and a "body" holding a JSON string (API Gateway
+    events) is parsed and redacted the same way.
+    """
+    if isinstance(value, dict):
+        clean = {}
+        for key, item in value.items():
+            if str(key).lower() in REDACTED_KEYS:
+                clean[key] = _redacted(item)
+            elif key == 'body' and isinstance(item, str):
+                try:
+                    clean[key] = redact(json.loads(item))
+                except ValueError:
+                    clean[key] = _redacted(item)
+            else:
+                clean[key] = redact(item)
+        return clean
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return _SECRET_PATTERN.sub('[SECRET]', value)
+    return value
+
+
+class _Payload:
+    """Defers redaction and serialization until logging formats the record."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return json.dumps(redact(self.value), ensure_ascii=False, default=str)
+
+
+def payload(value):
+    """Lazy, redacted JSON rendering of value for a %s logging argument."""
+    return _Payload(value)
+
+
+def log_payload(logger, label, value, level=logging.INFO, rate=None):
+    """
+    Logs a full payload when the level is enabled and the call is sampled.
+
+    Args:
+        logger (logging.Logger): Logger to write to.
+        label (str): Text written before the payload.
+        value: Object to log; it is redacted before being serialized.
+        level (int): Logging level of the record.
+        rate (float, optional): Sampling rate; LOG_PAYLOAD_SAMPLE_RATE by default.
+
+    Returns:
+        bool: True if the payload was logged.
+    """
+    if not logger.isEnabledFor(level):
+        return False
+    rate = LOG_PAYLOAD_SAMPLE_RATE if rate is None else rate
+    if rate < 1 and random.random() >= rate:
+        return False
+    logger.log(level, "%s: %s", label, payload(value))
+    return True
@@ -0,0 +1,194 @@
+"""
+Cola entre el webhook (ingress) y el worker que ejecuta el pipeline.
+
+Backends:
+    - sqs: Amazon SQS, usado en producción (boto3 viene en el runtime de Lambda).
+    - sqlite: archivo local, para pruebas y ejecución fuera de AWS.
+    - memory: en proceso, para tests.
+
+Todos exponen send(body), receive(max_messages) y delete(receipt). Un
+mensaje recibido y no borrado vuelve a estar disponible después del
+visibility timeout, como en SQS; receive_count cuenta sus entregas.
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+logger = logging.getLogger()
+
+# Backend de la cola; vacío procesa cada mensaje dentro del webhook
+MESSAGE_QUEUE = os.getenv('MESSAGE_QUEUE', '').lower()
+MESSAGE_QUEUE_URL = os.getenv('MESSAGE_QUEUE_URL', '')
+MESSAGE_QUEUE_PATH = os.getenv(
+    'MESSAGE_QUEUE_PATH', os.path.join(tempfile.gettempdir(), 'giobot', 'queue.sqlite3')
+)
+VISIBILITY_TIMEOUT = float(os.getenv('MESSAGE_QUEUE_VISIBILITY_TIMEOUT', '60'))
+# Entregas antes de descartar un mensaje; igual al maxReceiveCount de la cola SQS
+MAX_RECEIVES = int(os.getenv('MESSAGE_QUEUE_MAX_RECEIVES', '3'))
+
+QueuedMessage = namedtuple('QueuedMessage', ['receipt', 'body', 'receive_count'], defaults=[1])
+
+
+class MemoryQueue:
+    """In-process queue for tests."""
+
+    def __init__(self, visibility_timeout=VISIBILITY_TIMEOUT, clock=time.time):
+        self.visibility_timeout = visibility_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._messages = {}
+        self._next_id = 1
+
+    def send(self, body):
+        with self._lock:
+            receipt = self._next_id
+            self._next_id += 1
+            self._messages[receipt] = [json.dumps(body), 0.0, 0]
+        return receipt
+
+    def receive(self, max_messages=10):
+        now = self._clock()
+        received = []
+        with self._lock:
+            for receipt, message in self._messages.items():
+                if len(received) >= max_messages:
+                    break
+                if message[1] <= now:
+                    message[1] = now + self.visibility_timeout
+                    message[2] += 1
+                    received.append(QueuedMessage(receipt, json.loads(message[0]), message[2]))
+        return received
+
+    def delete(self, receipt):
+        with self._lock:
+            self._messages.pop(receipt, None)
+
+    def __len__(self):
+        return len(self._messages)
+
+
+class SQLiteQueue:
+    """
+    Queue stored in a SQLite file, safe to share between local processes.
+
+    Args:
+        path (str): Database file; created if missing.
+        visibility_timeout (float): Seconds a received message stays hidden
+            before another receive can claim it again.
+    """
+
+    def __init__(self, path=MESSAGE_QUEUE_PATH, visibility_timeout=VISIBILITY_TIMEOUT, clock=time.time):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " body TEXT NOT NULL,"
+            " visible_at REAL NOT NULL DEFAULT 0,"
+            " receive_count INTEGER NOT NULL DEFAULT 0)"
+        )
+
+    def send(self, body):
+        with self._lock:
+            cursor = self._conn.execute("INSERT INTO messages (body) VALUES (?)", (json.dumps(body),))
+        return cursor.lastrowid
+
+    def receive(self, max_messages=10):
+        now = self._clock()
+        with self._lock:
+            # BEGIN IMMEDIATE toma el lock de escritura: dos workers no reclaman la misma fila
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, body, receive_count + 1 FROM messages WHERE visible_at <= ? ORDER BY id LIMIT ?",
+                    (now, max_messages),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE messages SET visible_at = ?, receive_count = receive_count + 1 WHERE id = ?",
+                    [(now + self.visibility_timeout, row[0]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [QueuedMessage(row[0], json.loads(row[1]), row[2]) for row in rows]
+
+    def delete(self, receipt):
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE id = ?", (receipt,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+
+class SQSQueue:
+    """Amazon SQS queue; boto3 is imported on first use."""
+
+    def __init__(self, queue_url=MESSAGE_QUEUE_URL):
+        if not queue_url:
+            raise ValueError("MESSAGE_QUEUE_URL is required for the sqs backend")
+        self.queue_url = queue_url
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('sqs')
+        return self._client
+
+    def send(self, body):
+        response = self._get_client().send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(body))
+        return response["MessageId"]
+
+    def receive(self, max_messages=10):
+        response = self._get_client().receive_message(
+            QueueUrl=self.queue_url, MaxNumberOfMessages=min(max_messages, 10), WaitTimeSeconds=1,
+            AttributeNames=['ApproximateReceiveCount'],
+        )
+        return [
+            QueuedMessage(message["ReceiptHandle"], json.loads(message["Body"]),
+                          int(message.get("Attributes", {}).get("ApproximateReceiveCount", 1)))
+            for message in response.get("Messages", [])
+        ]
+
+    def delete(self, receipt):
+        self._get_client().delete_message(QueueUrl=self.queue_url, ReceiptHandle=receipt)
+
+
+_queue = None
+
+
+def get_queue():
+    """
+    Returns the queue configured by MESSAGE_QUEUE, created once per process.
+
+    Returns:
+        The queue, or None when MESSAGE_QUEUE is empty (inline processing).
+
+    Raises:
+        ValueError: If MESSAGE_QUEUE names an unknown backend.
+    """
+    global _queue
+    if _queue is None and MESSAGE_QUEUE:
+        if MESSAGE_QUEUE == 'sqs':
+            _queue = SQSQueue()
+        elif MESSAGE_QUEUE == 'sqlite':
+            _queue = SQLiteQueue()
+        elif MESSAGE_QUEUE == 'memory':
+            _queue = MemoryQueue()
+        else:
+            raise ValueError(f"Unknown MESSAGE_QUEUE backend: {MESSAGE_QUEUE}")
+    return _queue
@@ -0,0 +1,119 @@
+"""
+Métricas por invocación en CloudWatch Embedded Metric Format (EMF).
+
+Cada invocación acumula la duración de sus etapas y algunos valores
+(hits de caché, tokens, tamaños) y al final escribe una sola línea JSON en
+stdout. CloudWatch Logs extrae de esa línea las métricas declaradas en
+"_aws" sin llamadas a la API de CloudWatch.
+
+La instancia activa se guarda en un contextvar, así los módulos internos
+(por ejemplo el compactador de resultados) registran valores sin recibirla
+como argumento.
+"""
+import contextvars
+import json
+import os
+import time
+from contextlib import contextmanager
+
+METRICS_NAMESPACE = os.getenv('METRICS_NAMESPACE', 'GioBot')
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+SERVICE_NAME = 'telegram-bot-giobot'
+
+_current = contextvars.ContextVar('invocation_metrics', default=None)
+
+
+class InvocationMetrics:
+    """
+    Stage durations and values of one invocation.
+
+    Args:
+        namespace (str): CloudWatch namespace of the metrics.
+        clock (callable, optional): perf_counter-like time source.
+    """
+
+    def __init__(self, namespace=METRICS_NAMESPACE, clock=time.perf_counter):
+        self.namespace = namespace
+        self._clock = clock
+        self._started = clock()
+        self.metrics = {}
+        self.units = {}
+        self.properties = {}
+
+    @contextmanager
+    def span(self, stage):
+        """Times a block; repeated spans of the same stage are added up."""
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.put(f"{stage}_ms", (self._clock() - started) * 1000, "Milliseconds", add=True)
+
+    def put(self, name, value, unit="Count", add=False):
+        """Records a metric value (added to the previous one if add=True)."""
+        if add and name in self.metrics:
+            value += self.metrics[name]
+        self.metrics[name] = value
+        self.units[name] = unit
+
+    def set_property(self, name, value):
+        """Records a value that is logged with the metrics but is not a metric."""
+        self.properties[name] = value
+
+    def to_emf(self):
+        """Returns the EMF document of the invocation."""
+        self.put("total_ms", (self._clock() - self._started) * 1000, "Milliseconds")
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [["Service"]],
+                    "Metrics": [{"Name": name, "Unit": self.units[name]} for name in self.metrics],
+                }],
+            },
+            "Service": SERVICE_NAME,
+            **self.properties,
+            **{name: round(value, 3) if isinstance(value, float) else value for name, value in self.metrics.items()},
+        }
+
+    def emit(self):
+        # print y no logging: el formato de logging de Lambda antepone texto
+        # a la línea y CloudWatch ya no la reconoce como EMF
+        print(json.dumps(self.to_emf(), ensure_ascii=False, default=str), flush=True)
+
+
+class _NullMetrics:
+    """Stand-in used outside an invocation; records nothing."""
+
+    @contextmanager
+    def span(self, stage):
+        yield
+
+    def put(self, name, value, unit="Count", add=False):
+        pass
+
+    def set_property(self, name, value):
+        pass
+
+
+_null = _NullMetrics()
+
+
+def start_invocation():
+    """Creates the metrics of a new invocation and makes them current."""
+    metrics = InvocationMetrics()
+    _current.set(metrics)
+    return metrics
+
+
+def finish_invocation(metrics):
+    """Emits the metrics (unless METRICS_ENABLED=0) and clears the current ones."""
+    if METRICS_ENABLED:
+        metrics.emit()
+    _current.set(None)
+
+
+def current_metrics():
+    """Returns the metrics of the running invocation, or a no-op stand-in."""
+    return _current.get() or _null
@@ -1,7 +1,6 @@
 import os
-from openai import OpenAI
 from dotenv import load_dotenv
-import json
+from services.result_compactor import compact_result
 
 # Cargar variables de entorno
 load_dotenv()
@@ -9,26 +8,77 @@ load_dotenv()
 # Configuración
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+# Respuesta cuando OpenAI falla; no se debe guardar en cachés
+AI_ERROR_RESPONSE = "Lo siento, no pude procesar tu solicitud en este momento."
 
-def get_ai_response(prompt: str) -> str:
-    """Obtener respuesta de OpenAI sin mantener historial de conversación"""
+_openai_client = None
+
+def _get_openai_client():
+    """Crea el cliente de OpenAI en el primer uso: importar el SDK es costoso"""
+    global _openai_client
+    if _openai_client is None:
+        from openai import OpenAI
+        _openai_client = OpenAI(api_key=OPENAI_API_KEY)
+    return _openai_client
+
+def _completion_args(prompt: str) -> dict:
+    # Siempre crear una nueva conversación con solo el mensaje actual
+    return {
+        "model": "gpt-4o",
+        "messages": [
+            {"role": "system", "content": "Eres un asistente útil. Responde solo a la pregunta actual sin hacer referencia a mensajes anteriores."},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 1000,
+        "temperature": 0.5
+    }
+
+def _client_for(timeout=None):
+    """Cliente con el timeout de la etapa; sin reintentos del SDK, que no respetan el plazo"""
+    client = _get_openai_client()
+    if timeout is None:
+        return client
+    return client.with_options(timeout=timeout, max_retries=0)
+
+def get_ai_response(prompt: str, timeout: float = None) -> str:
+    """Obtener respuesta de OpenAI sin mantener historial de conversación.
+
+    Args:
+        prompt: Mensaje para el modelo
+        timeout: Segundos máximos de la llamada (None usa el default del SDK)
+    """
     
     try:
-        # Siempre crear una nueva conversación con solo el mensaje actual
-        response = openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "Eres un asistente útil. Responde solo a la pregunta actual sin hacer referencia a mensajes anteriores."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1000,
-            temperature=0.5
-        )
+        response = _client_for(timeout).chat.completions.create(**_completion_args(prompt))
         return response.choices[0].message.content
     except Exception as e:
         print(f"Error getting AI response: {e}")
-        return "Lo siento, no pude procesar tu solicitud en este momento."
+        return AI_ERROR_RESPONSE
+
+def stream_ai_response(prompt: str, timeout: float = None):
+    """
+    Igual que get_ai_response, pero entrega el texto por fragmentos a medida
+    que OpenAI lo genera.
+
+    Si la llamada falla se entrega AI_ERROR_RESPONSE (precedido de un salto
+    de línea si ya se había enviado texto), así que el texto completo
+    termina en AI_ERROR_RESPONSE cuando hubo un error.
+    """
+    started = False
+    try:
+        stream = _client_for(timeout).chat.completions.create(stream=True, **_completion_args(prompt))
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                started = True
+                yield delta
+        if not started:
+            yield AI_ERROR_RESPONSE
+    except Exception as e:
+        print(f"Error streaming AI response: {e}")
+        yield f"\n\n{AI_ERROR_RESPONSE}" if started else AI_ERROR_RESPONSE
 
 def analyze_finances(user_message, operation_result):
     """
@@ -76,8 +126,9 @@ def analyze_finances(user_message, operation_result):
     Eres un experto en finanzas. Basado en la siguiente pregunta del usuario:
     '{user_message}'
     
-    Y los siguientes datos calculados de sus movimientos financieros:
-    {json.dumps(operation_result, indent=2, ensure_ascii=False)}
+    Y los siguientes datos calculados de sus movimientos financieros
+    (las tablas tienen columnas separadas por "|" y "otros" agrupa el resto):
+    {compact_result(operation_result)[0]}
     
     Proporciona una respuesta clara, concisa y amigable para el usuario en español. 
     Incluye los montos formateados con separadores de miles y dos decimales.
@@ -0,0 +1,289 @@
+"""
+Registry of the operations the bot can run, compiled once per process.
+
+operations.json declares each operation: its method name and the type of
+each parameter. The registry checks the declarations against
+operation_functions and the function signatures, and keeps one compiled
+Operation per method with its callable, its parameter coercers and a
+compact description for the routing prompt.
+
+Parameters coming from the router or the LLM go through Operation.coerce
+before the call: months become numbers, categories are matched to the
+ledger's labels, amounts become integer cents, and unknown, missing or
+invalid parameters raise InvalidParams instead of a TypeError inside the
+operation.
+"""
+import inspect
+import json
+import logging
+import os
+import threading
+from datetime import date, timedelta
+from services.amounts import parse_amounts
+from services.ledger import EXPENSE, INCOME
+from services.operations_client import MONTH_MAP, operation_functions, local_today
+from services.intent_router import CATEGORY_ALIASES, normalize_text
+
+logger = logging.getLogger()
+
+OPERATIONS_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'operations.json')
+
+
+class InvalidParams(ValueError):
+    """Raised when the parameters of an operation call are not valid."""
+
+
+def coerce_month(value, categories=None):
+    """Returns the month number (1-12) of a number or a month name."""
+    if isinstance(value, bool):
+        raise InvalidParams(f"Invalid month: {value!r}")
+    if isinstance(value, (int, float)) and value == int(value):
+        number = int(value)
+    elif isinstance(value, str) and value.strip().isdigit():
+        number = int(value.strip())
+    elif isinstance(value, str):
+        number = MONTH_MAP.get(normalize_text(value))
+    else:
+        number = None
+    if number is None or not 1 <= number <= 12:
+        raise InvalidParams(f"Invalid month: {value!r}")
+    return number
+
+
+def coerce_category(value, categories=None):
+    """
+    Returns a category name without extra whitespace.
+
+    With the ledger's category labels, names are matched ignoring case and
+    accents, and Spanish aliases (comida -> food) are translated.
+    """
+    if not isinstance(value, str) or not value.strip():
+        raise InvalidParams(f"Invalid category: {value!r}")
+    category = ' '.join(value.split())
+    if categories:
+        labels = {normalize_text(label): label for label in categories}
+        key = normalize_text(category)
+        alias = CATEGORY_ALIASES.get(key)
+        if key in labels:
+            return labels[key]
+        if alias is not None and normalize_text(alias) in labels:
+            return labels[normalize_text(alias)]
+    return category
+
+
+KIND_NAMES = {
+    'expensive': EXPENSE, 'expense': EXPENSE, 'gasto': EXPENSE, 'egreso': EXPENSE,
+    'income': INCOME, 'ingreso': INCOME,
+}
+
+# Longest free text accepted in a record (descriptions)
+MAX_TEXT_CHARS = 120
+
+
+def coerce_kind(value, categories=None):
+    """Returns 'expensive' or 'income' from the English or Spanish name."""
+    kind = KIND_NAMES.get(normalize_text(value)) if isinstance(value, str) else None
+    if kind is None:
+        raise InvalidParams(f"Invalid movement type: {value!r}")
+    return kind
+
+
+def coerce_amount(value, categories=None):
+    """
+    Returns a positive amount in integer cents.
+
+    Numbers are pesos; text uses the ledger format ('50.000', '$1.234,50').
+    """
+    if isinstance(value, bool):
+        raise InvalidParams(f"Invalid amount: {value!r}")
+    if isinstance(value, (int, float)):
+        cents = round(value * 100)
+    elif isinstance(value, str):
+        parsed, valid = parse_amounts([value.strip()])
+        cents = int(parsed[0]) if valid[0] else None
+    else:
+        cents = None
+    if cents is None or cents <= 0:
+        raise InvalidParams(f"Invalid amount: {value!r}")
+    return cents
+
+
+def coerce_date(value, categories=None):
+    """Returns a date from 'hoy', 'ayer' (or English) or YYYY-MM-DD; not in the future."""
+    today = local_today()
+    relative = {'hoy': 0, 'today': 0, 'ayer': 1, 'yesterday': 1, 'anteayer': 2}
+    if isinstance(value, date):
+        result = value
+    elif isinstance(value, str) and normalize_text(value) in relative:
+        result = today - timedelta(days=relative[normalize_text(value)])
+    else:
+        try:
+            result = date.fromisoformat(str(value).strip()[:10])
+        except ValueError:
+            raise InvalidParams(f"Invalid date: {value!r}")
+    if result > today:
+        raise InvalidParams(f"Invalid date: {value!r} is in the future")
+    return result
+
+
+def coerce_text(value, categories=None):
+    """Returns a one-line text without the CSV separator."""
+    if not isinstance(value, str) or not value.strip():
+        raise InvalidParams(f"Invalid text: {value!r}")
+    text = ' '.join(value.replace(';', ',').replace('"', "'").split())
+    return text[:MAX_TEXT_CHARS]
+
+
+PARAM_TYPES = {
+    "month": coerce_month,
+    "category": coerce_category,
+    "kind": coerce_kind,
+    "amount": coerce_amount,
+    "date": coerce_date,
+    "text": coerce_text,
+}
+
+# Texto de cada tipo en el prompt de enrutamiento
+PARAM_HINTS = {
+    "month": "month",
+    "category": "category",
+    "kind": "expensive|income",
+    "amount": "pesos",
+    "date": "YYYY-MM-DD",
+    "text": "text",
+}
+
+
+class Operation:
+    """
+    A compiled operation: callable, parameter coercers and prompt line.
+
+    Args:
+        method (str): Name of the operation, as answered by the router.
+        name (str): Human-readable description from operations.json.
+        function (callable): Function that runs the operation.
+        params (dict): {parameter name: type name}, types from PARAM_TYPES.
+        writes (bool): True if the operation changes the ledger; its result
+            must not be cached.
+    """
+
+    def __init__(self, method, name, function, params, writes=False):
+        self.method = method
+        self.name = name
+        self.function = function
+        self.params = dict(params)
+        self.writes = writes
+        self._coercers = {param: PARAM_TYPES[kind] for param, kind in self.params.items()}
+        self._required = [
+            param for param, spec in inspect.signature(function).parameters.items()
+            if spec.default is inspect.Parameter.empty
+        ]
+        signature = ", ".join(f"{param}:{PARAM_HINTS[kind]}" for param, kind in self.params.items())
+        self.prompt_line = f"{method}({signature}): {name}"
+
+    def coerce(self, params, categories=None):
+        """
+        Validates and converts the parameters of a call.
+
+        Args:
+            params (dict): Parameters as answered by the router, or None.
+            categories (list, optional): Ledger category labels, used to
+                normalize category names.
+
+        Returns:
+            dict: Parameters ready for the operation function.
+
+        Raises:
+            InvalidParams: If params is not a dict, has unknown keys, lacks
+                a required parameter or a value cannot be converted.
+        """
+        if params is None:
+            params = {}
+        if not isinstance(params, dict):
+            raise InvalidParams(f"Parameters of {self.method} must be an object")
+        unknown = sorted(set(params) - set(self._coercers))
+        if unknown:
+            raise InvalidParams(f"Unknown parameters for {self.method}: {', '.join(unknown)}")
+        missing = [param for param in self._required if params.get(param) in (None, "")]
+        if missing:
+            raise InvalidParams(f"Missing parameters for {self.method}: {', '.join(missing)}")
+        return {
+            param: self._coercers[param](value, categories)
+            for param, value in params.items()
+            if value not in (None, "")
+        }
+
+    def __call__(self, **params):
+        return self.function(**params)
+
+
+class OperationRegistry:
+    """
+    Operations declared in operations.json, validated against the functions.
+
+    Args:
+        declarations (list): Entries of operations.json.
+        functions (dict): {method name: callable}.
+
+    Raises:
+        ValueError: If a declaration names an unknown method, repeats one,
+            uses an unknown parameter type or does not match the function
+            signature.
+    """
+
+    def __init__(self, declarations, functions=operation_functions):
+        self.operations = {}
+        for entry in declarations:
+            # "mehtod" es la clave histórica de operations.json
+            method = entry.get("method") or entry.get("mehtod")
+            if method not in functions:
+                raise ValueError(f"operations.json: unknown method {method!r}")
+            if method in self.operations:
+                raise ValueError(f"operations.json: duplicated method {method!r}")
+            params = entry.get("params") or {}
+            for param, kind in params.items():
+                if kind not in PARAM_TYPES:
+                    raise ValueError(f"operations.json: unknown type {kind!r} for {method}.{param}")
+            accepted = inspect.signature(functions[method]).parameters
+            extra = sorted(set(params) - set(accepted))
+            undeclared = sorted(
+                p for p, spec in accepted.items()
+                if spec.default is inspect.Parameter.empty and p not in params
+            )
+            if extra or undeclared:
+                raise ValueError(f"operations.json: params of {method} do not match the function "
+                                 f"(extra: {extra}, undeclared: {undeclared})")
+            self.operations[method] = Operation(method, entry.get("name", method), functions[method], params,
+                                                writes=bool(entry.get("writes", False)))
+        # Fragmento fijo del prompt de enrutamiento, una línea por operación
+        self.prompt = "\n".join(op.prompt_line for op in self.operations.values())
+
+    @classmethod
+    def from_file(cls, path=OPERATIONS_FILE, functions=operation_functions):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), functions)
+
+    def get(self, method):
+        """Returns the Operation named method, or None."""
+        return self.operations.get(method)
+
+    def __contains__(self, method):
+        return method in self.operations
+
+    def __len__(self):
+        return len(self.operations)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Returns the process-wide registry, compiling operations.json on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = OperationRegistry.from_file()
+                logger.info(f"Operation registry compiled: {len(_registry)} operations")
+    return _registry
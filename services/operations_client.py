@@ -1,7 +1,12 @@
 import json
+import logging
 import os
-import pandas as pd
+from datetime import datetime, timedelta, timezone
 from services import csv_client
+from services.ledger import Ledger, EXPENSE, INCOME
+from services.ledger_journal import JournalNotConfigured
+
+logger = logging.getLogger()
 
 MONTH_MAP = {
     # Spanish months
@@ -17,34 +22,33 @@ MONTH_MAP = {
     'jul': 7, 'aug': 8, 'sept': 9, 'oct': 10, 'nov': 11, 'dec': 12
 }
 
-def _get_prepared_data():
-    """Loads and prepares the financial data from the CSV file."""
-    transactions = csv_client.load_transactions()
-    if not transactions:
-        return pd.DataFrame()
+# Huso horario de las fechas relativas ("hoy", "ayer"); Colombia no tiene horario de verano
+LEDGER_UTC_OFFSET_HOURS = float(os.getenv('LEDGER_UTC_OFFSET_HOURS', '-5'))
+
+
+def local_today():
+    """Returns the current date in the ledger's time zone."""
+    return datetime.now(timezone(timedelta(hours=LEDGER_UTC_OFFSET_HOURS))).date()
+
+
+def _get_ledger():
+    """Returns the shared, typed ledger loaded from the CSV file."""
+    return csv_client.load_ledger()
+
 
-    df = pd.DataFrame(transactions)
+def _get_rollup():
+    """Returns the pre-aggregated totals cube of the ledger."""
+    return csv_client.load_rollup()
 
-    # Clean and convert 'Amount' column
-    df['Amount'] = df['Amount'].str.strip()
-    df = df[df['Amount'] != '']
-    df['Amount'] = (
-        df['Amount']
-        .str.replace('$', '', regex=False)
-        .str.replace('.', '', regex=False)
-        .str.replace(',', '.', regex=False)
-        .astype(float)
-    )
 
-    # Convert 'Date' column
-    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-    df = df.dropna(subset=['Date'])
+def _to_amounts(totals):
+    """Converts a {key: cents} dict to {key: float amount}."""
+    return {key: cents / 100 for key, cents in totals.items()}
 
-    # Add Year and Month columns
-    df['Year'] = df['Date'].dt.year
-    df['Month'] = df['Date'].dt.month
 
-    return df
+def get_categories():
+    """Returns the category vocabulary of the ledger."""
+    return _get_rollup().categories()
 
 
 def get_operations():
@@ -76,7 +80,7 @@ def analize_operation_prompt(operations, message_text):
     Y el siguiente mensaje del cliente:
     '{message_text}'
     
-    Interpreta cuál de la lista de operaciones pide el cliente. Interpreta correctamente el mes si esta en español o ingles y obten el numero del mes. Devuelve únicamente un JSON con la clave 'operation' y, si aplica, la clave 'params' con sus valores. Por ejemplo:
+    Interpreta cuál de la lista de operaciones pide el cliente. Interpreta correctamente el mes si esta en español o ingles y obten el numero del mes. Si el cliente quiere registrar un gasto o un ingreso usa record_movement, con amount en pesos y date 'hoy', 'ayer' o YYYY-MM-DD. Devuelve únicamente un JSON con la clave 'operation' y, si aplica, la clave 'params' con sus valores. Por ejemplo:
     {{"operation": "expenses_by_month", "params": {{"month": "september"}}}}
     O si no tiene parámetros:
     {{"operation": "incomes_expenses_by_year"}}
@@ -85,18 +89,22 @@ def analize_operation_prompt(operations, message_text):
 
 def incomes_expenses_by_year():
     """Calculates incomes and expenses by year."""
-    df = _get_prepared_data()
-    if df.empty:
+    cube = _get_rollup()
+    if len(cube) == 0:
         return {"error": "No data available"}
 
-    result = df.groupby(['Year', 'Income/expensive'])['Amount'].sum().unstack(fill_value=0)
-    return result.to_dict('index')
+    by_kind = {kind: cube.totals('year', kind=kind) for kind in (EXPENSE, INCOME)}
+    kinds = [kind for kind in (EXPENSE, INCOME) if by_kind[kind]]
+    years = sorted(set().union(*by_kind.values()))
+    return {
+        year: {kind: by_kind[kind].get(year, 0) / 100 for kind in kinds}
+        for year in years
+    }
 
 
-def expenses_by_month(month):
-    """Calculates expenses by month."""
-    df = _get_prepared_data()
-    if df.empty:
+def _by_month(kind, month):
+    cube = _get_rollup()
+    if len(cube) == 0:
         return {"error": "No data available"}
 
     if not month:
@@ -106,55 +114,38 @@ def expenses_by_month(month):
     if not month_number:
         return {"error": f"Invalid month provided: {month}"}
 
-    df_filtered = df[(df['Income/expensive'] == 'expensive') & (df['Month'] == month_number)]
-    result = df_filtered.groupby('Year')['Amount'].sum()
-    return result.to_dict()
+    return _to_amounts(cube.totals('year', kind=kind, month=month_number))
 
 
-def incomes_by_month(month):
-    """Calculates incomes by month."""
-    df = _get_prepared_data()
-    if df.empty:
-        return {"error": "No data available"}
-
-    if not month:
-        return {"error": "Month not provided"}
+def expenses_by_month(month):
+    """Calculates expenses by month."""
+    return _by_month(EXPENSE, month)
 
-    month_number = _get_month_number(month)
-    if not month_number:
-        return {"error": f"Invalid month provided: {month}"}
 
-    df_filtered = df[(df['Income/expensive'] == 'income') & (df['Month'] == month_number)]
-    result = df_filtered.groupby('Year')['Amount'].sum()
-    return result.to_dict()
+def incomes_by_month(month):
+    """Calculates incomes by month."""
+    return _by_month(INCOME, month)
 
 
-def expenses_by_category_by_year(category):
-    """Calculates expenses by category by year."""
-    df = _get_prepared_data()
-    if df.empty:
+def _by_category_by_year(kind, category):
+    cube = _get_rollup()
+    if len(cube) == 0:
         return {"error": "No data available"}
 
     if not category:
         return {"error": "Category not provided"}
 
-    df_filtered = df[(df['Income/expensive'] == 'expensive') & (df['Category'].str.lower() == category.lower())]
-    result = df_filtered.groupby('Year')['Amount'].sum()
-    return result.to_dict()
+    return _to_amounts(cube.totals('year', kind=kind, category=category))
 
 
-def incomes_by_category_by_year(category):
-    """Calculates incomes by category by year."""
-    df = _get_prepared_data()
-    if df.empty:
-        return {"error": "No data available"}
+def expenses_by_category_by_year(category):
+    """Calculates expenses by category by year."""
+    return _by_category_by_year(EXPENSE, category)
 
-    if not category:
-        return {"error": "Category not provided"}
 
-    df_filtered = df[(df['Income/expensive'] == 'income') & (df['Category'].str.lower() == category.lower())]
-    result = df_filtered.groupby('Year')['Amount'].sum()
-    return result.to_dict()
+def incomes_by_category_by_year(category):
+    """Calculates incomes by category by year."""
+    return _by_category_by_year(INCOME, category)
 
 
 def _convert_datetime_to_str(obj):
@@ -169,7 +160,7 @@ def _convert_datetime_to_str(obj):
         return [_convert_datetime_to_str(item) for item in obj]
     return obj
 
-def expenses_by_category_by_month(category, month):
+def expenses_by_category_by_month(month, category=None):
     """Calculates expenses by category by month.
     
     Args:
@@ -220,8 +211,8 @@ def expenses_by_category_by_month(category, month):
 
 def movements_by_category_and_month(category, month):
     """Calculates movements by category and month."""
-    df = _get_prepared_data()
-    if df.empty:
+    ledger = _get_ledger()
+    if len(ledger) == 0:
         return {"error": "No data available"}
 
     if not category or not month:
@@ -232,14 +223,38 @@ def movements_by_category_and_month(category, month):
         return {"error": f"Invalid month provided: {month}"}
 
 
-    df_filtered = df[(
-        (df['Category'].str.lower() == category.lower()) &
-        (df['Month'] == month_number)
-    )]
+    df_filtered = ledger.select(category=category, month=month_number)
     
-    print("data filtered", df_filtered)
-    result = df_filtered
-    return result.to_dict('records')
+    logger.debug("data filtered: %s", df_filtered)
+    return Ledger.to_records(df_filtered)
+
+
+def record_movement(kind, amount, category, date=None, description=None):
+    """
+    Records a new expense or income in the ledger journal.
+
+    Args:
+        kind (str): 'expensive' or 'income'.
+        amount (int): Amount in integer cents.
+        category (str): Category name.
+        date (datetime.date, optional): Date of the movement; today by default.
+        description (str, optional): Description; the category by default.
+
+    Returns:
+        dict: {"status": "recorded", "movement": {...}} or an error message.
+    """
+    try:
+        movement = csv_client.append_movement(kind, amount, category, date or local_today(), description)
+    except ValueError as e:
+        return {"error": f"Invalid movement: {str(e)}"}
+    except JournalNotConfigured:
+        logger.error("Recording is disabled: LEDGER_JOURNAL_PATH is not configured")
+        return {"error": "Recording movements is not enabled on this deployment"}
+    except OSError as e:
+        logger.error(f"Could not write the ledger journal: {str(e)}")
+        return {"error": "The movement could not be saved"}
+    logger.info("Recorded %s movement in '%s'", kind, movement["Category"])
+    return {"status": "recorded", "movement": movement}
 
 
 def _get_month_number(month):
@@ -257,4 +272,5 @@ operation_functions = {
     "incomes_by_category_by_year": incomes_by_category_by_year,
     "expenses_by_category_by_month": expenses_by_category_by_month,
     "movements_by_category_and_month": movements_by_category_and_month,
+    "record_movement": record_movement,
 }
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+Compact, token-budgeted text encoding of operation results for LLM prompts.
+
+Records are written as a table with one header line and `|`-separated
+rows. Columns that the others make redundant (Year and Month next to Date)
+and columns with the same value in every row are dropped; the constant
+values are written once above the table. When the encoding exceeds the
+token budget, the largest rows are kept and the rest are summed into an
+"otros" line, one per Income/expensive value when the rows mix both.
+"""
+import json
+import logging
+import math
+import os
+from services.metrics import current_metrics
+
+logger = logging.getLogger()
+
+RESULT_TOKEN_BUDGET = int(os.getenv('RESULT_TOKEN_BUDGET', '1500'))
+
+# Top-N sizes tried, in order, when the full result does not fit the budget
+TOP_N_STEPS = (50, 25, 15, 10, 5, 3)
+
+_encoding = None
+
+
+def count_tokens(text):
+    """
+    Counts the tokens of text for the chat model.
+
+    Uses tiktoken when it is installed; otherwise estimates one token per
+    four characters, which is close for mixed Spanish text and digits.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+
+def _clean_key(key):
+    return str(key).lstrip('\ufeff')
+
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _cell(key, value):
+    if key == "Date":
+        return str(value)[:10]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return _number(value)
+    return str(value)
+
+
+def _amount(record):
+    try:
+        return abs(float(record.get("Amount", 0) or 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _encode_records(records, top_n=None):
+    records = [{_clean_key(k): v for k, v in r.items()} for r in records]
+    columns = []
+    for record in records:
+        for key in record:
+            if key not in columns:
+                columns.append(key)
+    if "Date" in columns:
+        columns = [c for c in columns if c not in ("Year", "Month")]
+
+    constant = {}
+    if len(records) > 1:
+        for column in columns:
+            values = {str(r.get(column)) for r in records}
+            if len(values) == 1 and column != "Amount":
+                constant[column] = records[0].get(column)
+    columns = [c for c in columns if c not in constant]
+
+    lines = []
+    if constant:
+        lines.append("; ".join(f"{k}={_cell(k, v)}" for k, v in constant.items()))
+    rows = records
+    others = []
+    if top_n is not None and len(records) > top_n:
+        rows = sorted(records, key=_amount, reverse=True)
+        rows, others = rows[:top_n], rows[top_n:]
+    lines.append("|".join(columns))
+    lines += ["|".join(_cell(c, r.get(c, "")) for c in columns) for r in rows]
+    if others:
+        lines += _others_lines(others, by_kind="Income/expensive" in columns)
+    return lines
+
+
+def _others_lines(others, by_kind):
+    # Ingresos y gastos no se suman entre sí: un total por tipo de movimiento
+    groups = {}
+    for record in others:
+        kind = f" {record.get('Income/expensive', '')}" if by_kind else ""
+        groups.setdefault(kind, []).append(_amount(record))
+    return [
+        f"otros{kind} ({len(amounts)} filas)|Amount={_number(round(sum(amounts), 2))}"
+        for kind, amounts in groups.items()
+    ]
+
+
+def _encode_mapping(mapping, top_n=None):
+    items = list(mapping.items())
+    if all(isinstance(v, (int, float)) for _, v in items):
+        items.sort(key=lambda item: abs(item[1]), reverse=True)
+        others = []
+        if top_n is not None and len(items) > top_n:
+            items, others = items[:top_n], items[top_n:]
+        lines = [f"{_clean_key(k)}: {_number(v)}" for k, v in items]
+        if others:
+            lines.append(f"otros ({len(others)}): {_number(round(sum(v for _, v in others), 2))}")
+        return lines
+    return None
+
+
+def _encode(value, top_n=None, map_top_n=None, indent=""):
+    if isinstance(value, list) and value and all(isinstance(r, dict) for r in value):
+        return [indent + line for line in _encode_records(value, top_n)]
+    if isinstance(value, dict):
+        flat = _encode_mapping(value, map_top_n) if value else None
+        if flat is not None:
+            return [indent + line for line in flat]
+        lines = []
+        for key, item in value.items():
+            if isinstance(item, (dict, list)) and item:
+                lines.append(f"{indent}{_clean_key(key)}:")
+                lines += _encode(item, top_n, map_top_n, indent + "  ")
+            else:
+                lines.append(f"{indent}{_clean_key(key)}: {_cell(key, item)}")
+        return lines
+    return [indent + json.dumps(value, ensure_ascii=False, default=str)]
+
+
+def compact_result(result, budget=RESULT_TOKEN_BUDGET):
+    """
+    Encodes an operation result for the prompt within a token budget.
+
+    The budget is a target: if even the smallest top-N does not fit, that
+    smallest encoding is returned.
+
+    Args:
+        result: The value returned by an operation function.
+        budget (int): Maximum tokens for the encoded result.
+
+    Returns:
+        tuple: (text, stats) where stats has tokens_before (indented JSON as
+        previously sent), tokens_after, and the top_n for rows and map_top_n
+        for totals that were applied (None when nothing was cut).
+    """
+    tokens_before = count_tokens(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+    # Rows are cut first; totals by key (e.g. by category) only if still needed
+    attempts = [(None, None)] + [(n, None) for n in TOP_N_STEPS] + [(TOP_N_STEPS[-1], n) for n in TOP_N_STEPS]
+    for top_n, map_top_n in attempts:
+        text = "\n".join(_encode(result, top_n, map_top_n))
+        tokens_after = count_tokens(text)
+        if tokens_after <= budget:
+            break
+    stats = {"tokens_before": tokens_before, "tokens_after": tokens_after, "top_n": top_n, "map_top_n": map_top_n}
+    logger.info(f"Result compaction: {stats}")
+    current_metrics().put("prompt_result_tokens_before", tokens_before)
+    current_metrics().put("prompt_result_tokens", tokens_after)
+    return text, stats
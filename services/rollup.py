@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import sys
+import threading
+
+logger = logging.getLogger()
+
+SCHEMA_VERSION = 1
+
+DIMENSIONS = ('kind', 'year', 'month', 'category')
+
+# Tamaño aproximado de una clave o un valor del cubo (tupla con sus enteros)
+_CELL_BYTES = 120
+
+
+class RollupCube:
+    """
+    Pre-aggregated totals of the ledger by (kind, year, month, category).
+
+    Each cell holds the sum in cents and the number of movements. Queries
+    group the cells along one dimension with optional filters on the
+    others; every distinct query shape is indexed once and then answered
+    with dictionary lookups, without scanning the ledger rows.
+
+    Args:
+        cells (dict): {(kind, year, month, category): (cents, count)}.
+        version (str, optional): Version of the ledger the cube was built from.
+    """
+
+    def __init__(self, cells, version=None):
+        self.cells = cells
+        self.version = version
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_ledger(cls, ledger):
+        """Builds the cube with a single groupby over the ledger frame."""
+        frame = ledger.frame
+        grouped = frame.groupby(['Income/expensive', 'Year', 'Month', 'Category'], observed=True)['Cents'].agg(['sum', 'count'])
+        cells = {
+            (kind, int(year), int(month), category): (int(cents), int(count))
+            for (kind, year, month, category), cents, count
+            in zip(grouped.index, grouped['sum'], grouped['count'])
+        }
+        return cls(cells, ledger.version)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def memory_usage(self):
+        """Approximate bytes held by the cells and the query indexes."""
+        cells = self.cells
+        usage = sys.getsizeof(cells) + len(cells) * (_CELL_BYTES + _CELL_BYTES)
+        for index in list(self._indexes.values()):
+            usage += sys.getsizeof(index)
+            for groups in list(index.values()):
+                usage += sys.getsizeof(groups) + len(groups) * _CELL_BYTES
+        return usage
+
+    def _index(self, group_by, names):
+        """Returns {filter values: {group value: [cents, count]}} for a query shape."""
+        shape = (group_by, names)
+        index = self._indexes.get(shape)
+        if index is None:
+            with self._lock:
+                return self._build_index(shape)
+        return index
+
+    def _build_index(self, shape):
+        group_by, names = shape
+        index = self._indexes.get(shape)
+        if index is None:
+            group_position = DIMENSIONS.index(group_by)
+            positions = [DIMENSIONS.index(name) for name in names]
+            index = {}
+            for cell, (cents, count) in self.cells.items():
+                key = tuple(_normalize(name, cell[p]) for name, p in zip(names, positions))
+                totals = index.setdefault(key, {}).setdefault(cell[group_position], [0, 0])
+                totals[0] += cents
+                totals[1] += count
+            index = {key: dict(sorted(groups.items())) for key, groups in index.items()}
+            self._indexes[shape] = index
+        return index
+
+    def add(self, kind, year, month, category, cents, count=1):
+        """
+        Adds movements to a cell and to the indexes already built.
+
+        Only the groups that contain the cell change, so a new movement
+        costs one update per indexed query shape instead of a rebuild.
+        Readers may run concurrently: dicts that gain a key are replaced
+        by updated copies instead of being modified while iterated.
+        """
+        cell = (kind, int(year), int(month), category)
+        with self._lock:
+            if cell in self.cells:
+                old_cents, old_count = self.cells[cell]
+                self.cells[cell] = (old_cents + cents, old_count + count)
+            else:
+                self.cells = {**self.cells, cell: (cents, count)}
+            for (group_by, names), index in self._indexes.items():
+                key = tuple(_normalize(name, cell[DIMENSIONS.index(name)]) for name in names)
+                group = cell[DIMENSIONS.index(group_by)]
+                groups = index.get(key, {})
+                totals = groups.get(group)
+                if totals is None:
+                    index[key] = dict(sorted({**groups, group: [cents, count]}.items()))
+                else:
+                    totals[0] += cents
+                    totals[1] += count
+
+    def _lookup(self, group_by, filters):
+        names = tuple(sorted(filters))
+        key = tuple(_normalize(name, filters[name]) for name in names)
+        return self._index(group_by, names).get(key, {})
+
+    def totals(self, group_by, **filters):
+        """
+        Sums of the movements grouped along one dimension.
+
+        Args:
+            group_by (str): 'kind', 'year', 'month' or 'category'.
+            **filters: Values for the other dimensions. Categories are
+                matched case-insensitively.
+
+        Returns:
+            dict: {group value: cents}, ordered by group value.
+        """
+        return {group: totals[0] for group, totals in self._lookup(group_by, filters).items()}
+
+    def counts(self, group_by, **filters):
+        """Same as totals, with the number of movements instead of the sum."""
+        return {group: totals[1] for group, totals in self._lookup(group_by, filters).items()}
+
+    def categories(self):
+        """Returns the sorted category labels present in the cube."""
+        return sorted({cell[3] for cell in self.cells})
+
+    def to_dict(self):
+        """Returns a JSON-serializable representation of the cube."""
+        return {
+            "schema": SCHEMA_VERSION,
+            "version": self.version,
+            "cells": [list(cell) + list(values) for cell, values in self.cells.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a cube from to_dict output."""
+        if data.get("schema") != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported rollup schema: {data.get('schema')}")
+        cells = {tuple(row[:4]): (row[4], row[5]) for row in data["cells"]}
+        return cls(cells, data.get("version"))
+
+    def save(self, path):
+        """Writes the cube to a JSON file atomically."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, version=None):
+        """
+        Reads a cube saved with save.
+
+        Returns:
+            RollupCube: The cube, or None if the file is missing, unreadable
+            or was built from another ledger version.
+        """
+        try:
+            with open(path, encoding='utf-8') as f:
+                cube = cls.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable rollup {path}: {str(e)}")
+            return None
+        if version is not None and cube.version != version:
+            return None
+        return cube
+
+
+def _normalize(dimension, value):
+    if dimension == 'category':
+        return str(value).strip().lower()
+    if dimension in ('year', 'month'):
+        return int(value)
+    return value
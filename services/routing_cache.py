@@ -0,0 +1,87 @@
+import logging
+import os
+import tempfile
+import threading
+from services.intent_router import normalize_text
+from services.ledger_cache import file_identity, file_hash
+from services.ttl_cache import TTLCache
+
+logger = logging.getLogger()
+
+OPERATIONS_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'operations.json')
+
+ROUTING_CACHE_SIZE = int(os.getenv('ROUTING_CACHE_SIZE', '256'))
+ROUTING_CACHE_TTL = float(os.getenv('ROUTING_CACHE_TTL', '3600'))
+
+# Persisting to /tmp lets the cache survive while the execution environment lives
+ROUTING_CACHE_PERSIST = os.getenv('ROUTING_CACHE_PERSIST', '').lower() in ('1', 'true', 'yes')
+ROUTING_CACHE_FILE = os.getenv(
+    'ROUTING_CACHE_FILE', os.path.join(tempfile.gettempdir(), 'giobot', 'routing-cache.json')
+)
+
+
+class RoutingCache:
+    """
+    Caches the routing decisions of the LLM by normalized message text.
+
+    Messages that differ only in case, accents, whitespace or punctuation
+    share an entry. The whole cache is dropped when operations.json changes,
+    since a decision may reference an operation that no longer exists.
+
+    Args:
+        operations_file (str): Path of operations.json.
+        persist_path (str, optional): JSON file used to persist the entries.
+    """
+
+    def __init__(self, operations_file=OPERATIONS_FILE, persist_path=None,
+                 max_size=ROUTING_CACHE_SIZE, ttl_seconds=ROUTING_CACHE_TTL):
+        self.operations_file = operations_file
+        self.persist_path = persist_path
+        self.cache = TTLCache(max_size, ttl_seconds)
+        self._lock = threading.Lock()
+        self._identity = None
+        self._fingerprint = None
+
+    def _check_operations(self):
+        """Clears the cache if operations.json changed since the last check."""
+        with self._lock:
+            try:
+                identity = file_identity(self.operations_file)
+            except OSError:
+                identity = None
+            if identity == self._identity:
+                return
+            fingerprint = file_hash(self.operations_file) if identity else None
+            first_check = self._identity is None and self._fingerprint is None
+            self._identity = identity
+            if fingerprint == self._fingerprint:
+                return
+            self._fingerprint = fingerprint
+            self.cache.clear()
+            if not first_check:
+                logger.info("operations.json changed, routing cache cleared")
+            if self.persist_path:
+                self.cache.load(self.persist_path, tag=fingerprint)
+
+    def get(self, message_text):
+        """Returns the cached decision for a message, or None."""
+        self._check_operations()
+        return self.cache.get(normalize_text(message_text))
+
+    def put(self, message_text, decision):
+        """Stores a decision that names an operation; other answers are not cached."""
+        if not isinstance(decision, dict) or not decision.get("operation"):
+            return
+        self._check_operations()
+        self.cache.set(normalize_text(message_text), decision)
+        if self.persist_path:
+            try:
+                self.cache.save(self.persist_path, tag=self._fingerprint)
+            except OSError as e:
+                logger.warning(f"Could not persist routing cache: {str(e)}")
+
+    def stats(self):
+        return self.cache.stats()
+
+
+routing_cache = RoutingCache(persist_path=ROUTING_CACHE_FILE if ROUTING_CACHE_PERSIST else None)
@@ -0,0 +1,257 @@
+"""
+Snapshot binario y columnar del ledger.
+
+El snapshot se compila a partir de movements.csv y se mapea en memoria en
+tiempo de ejecución, evitando parsear texto en cada arranque en frío.
+
+Formato (little-endian):
+    MAGIC (8 bytes) | largo del header (uint32) | header JSON | columnas
+
+Cada columna empieza alineada a 64 bytes y su posición, tipo y largo están
+en el header, junto con la versión del esquema, el hash SHA-256 del CSV de
+origen, los diccionarios de categorías y el cubo de agregados.
+
+Uso:
+    python -m services.snapshot build [--csv movements.csv] [--output movements.snapshot]
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import numpy as np
+import pandas as pd
+from services.ledger import Ledger, MOVEMENT_TYPES
+from services.ledger_cache import file_hash
+from services.ledger_reader import read_ledger
+from services.rollup import RollupCube
+
+logger = logging.getLogger()
+
+MAGIC = b'GIOLEDG\x01'
+SCHEMA_VERSION = 1
+ALIGNMENT = 64
+
+
+def snapshot_path(csv_path):
+    """Returns the default snapshot location for a CSV file."""
+    return os.path.splitext(csv_path)[0] + '.snapshot'
+
+
+def _encode_strings(values):
+    """Dictionary-encodes strings into (codes, offsets, utf-8 blob)."""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), sort=True)
+    encoded = [str(u).encode('utf-8') for u in uniques]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    offsets[1:] = np.cumsum([len(e) for e in encoded], dtype=np.int64)
+    return codes.astype('<i4'), offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def _decode_strings(offsets, blob):
+    data = blob.tobytes()
+    return [data[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+
+
+def build_snapshot(csv_path, output_path=None):
+    """
+    Compiles a CSV ledger into a binary columnar snapshot.
+
+    Args:
+        csv_path (str): Path of the movements CSV.
+        output_path (str, optional): Destination; defaults to snapshot_path(csv_path).
+
+    Returns:
+        str: The path of the written snapshot.
+    """
+    output_path = output_path or snapshot_path(csv_path)
+    source_hash = file_hash(csv_path)
+    ledger = read_ledger(csv_path, source_hash)
+    frame = ledger.frame
+
+    description_codes, description_offsets, description_blob = _encode_strings(frame['Description'])
+    category_codes, category_offsets, category_blob = _encode_strings(frame['Category'].astype(object))
+    arrays = {
+        'date': frame['Date'].to_numpy().astype('<M8[s]'),
+        'cents': frame['Cents'].to_numpy().astype('<i8'),
+        'year': frame['Year'].to_numpy().astype('<i2'),
+        'month': frame['Month'].to_numpy().astype('i1'),
+        'kind': frame['Income/expensive'].cat.codes.to_numpy().astype('i1'),
+        'category': category_codes,
+        'category_offsets': category_offsets,
+        'category_blob': category_blob,
+        'description': description_codes,
+        'description_offsets': description_offsets,
+        'description_blob': description_blob,
+    }
+
+    columns = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        columns[name] = {"dtype": array.dtype.str, "offset": offset, "length": len(array)}
+        offset += array.nbytes
+    header = {
+        "schema": SCHEMA_VERSION,
+        "source_hash": source_hash,
+        "rows": len(frame),
+        "columns": columns,
+        "rejected": ledger.rejected,
+        "rollup": RollupCube.from_ledger(ledger).to_dict(),
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False, default=str).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 4 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + columns[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+HEADER_KEYS = ("schema", "source_hash", "rows", "columns", "rejected", "rollup")
+
+
+def _open(path):
+    """
+    Maps a snapshot file and returns (buffer, header, data start) or None.
+
+    A missing file gives None silently; a truncated or corrupt one logs a
+    warning and gives None too, so the caller falls back to the CSV.
+    """
+    try:
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        # ValueError: archivo vacío, mmap no admite largo 0
+        logger.warning(f"Ignoring unreadable snapshot {path}: {str(e)}")
+        return None
+    if buffer[:len(MAGIC)] != MAGIC:
+        logger.warning(f"Ignoring snapshot with unknown format: {path}")
+        buffer.close()
+        return None
+    try:
+        (header_length,) = struct.unpack_from('<I', buffer, len(MAGIC))
+        header_end = len(MAGIC) + 4 + header_length
+        if header_end > len(buffer):
+            raise ValueError(f"header ends at byte {header_end} of {len(buffer)}")
+        header = json.loads(bytes(buffer[len(MAGIC) + 4:header_end]).decode('utf-8'))
+        missing = [key for key in HEADER_KEYS if key not in header]
+        if missing:
+            raise ValueError(f"header without {missing}")
+        data_start = -(-header_end // ALIGNMENT) * ALIGNMENT
+        if header["schema"] == SCHEMA_VERSION:
+            for name, spec in header["columns"].items():
+                end = data_start + spec["offset"] + spec["length"] * np.dtype(spec["dtype"]).itemsize
+                if end > len(buffer):
+                    raise ValueError(f"column {name} ends at byte {end} of {len(buffer)}")
+    except (struct.error, ValueError, TypeError, KeyError, AttributeError) as e:
+        # Snapshot truncado o corrupto (json.JSONDecodeError y UnicodeDecodeError son ValueError)
+        logger.warning(f"Ignoring corrupt snapshot {path}: {str(e)}")
+        buffer.close()
+        return None
+    if header["schema"] != SCHEMA_VERSION:
+        logger.warning(f"Ignoring snapshot with schema {header['schema']}: {path}")
+        buffer.close()
+        return None
+    return buffer, header, data_start
+
+
+def read_header(path, source_hash=None):
+    """
+    Reads only the header of a snapshot.
+
+    Returns:
+        dict: The header, or None if the snapshot is missing, invalid or
+        was compiled from a different source than source_hash.
+    """
+    opened = _open(path)
+    if opened is None:
+        return None
+    buffer, header, _ = opened
+    buffer.close()
+    if source_hash is not None and header["source_hash"] != source_hash:
+        return None
+    return header
+
+
+def load_snapshot(path, source_hash=None):
+    """
+    Memory-maps a snapshot and wraps its columns in a Ledger without parsing.
+
+    Args:
+        path (str): Snapshot path.
+        source_hash (str, optional): Expected hash of the source CSV; a
+            snapshot compiled from other content is considered stale.
+
+    Returns:
+        Ledger: The ledger, or None if the snapshot is missing or stale.
+    """
+    opened = _open(path)
+    if opened is None:
+        return None
+    buffer, header, data_start = opened
+    if source_hash is not None and header["source_hash"] != source_hash:
+        logger.info(f"Snapshot {path} is stale, falling back to CSV")
+        return None
+
+    def column(name):
+        spec = header["columns"][name]
+        return np.frombuffer(buffer, dtype=spec["dtype"], count=spec["length"], offset=data_start + spec["offset"])
+
+    try:
+        categories = _decode_strings(column('category_offsets'), column('category_blob'))
+        descriptions = _decode_strings(column('description_offsets'), column('description_blob'))
+    except (KeyError, ValueError, IndexError) as e:
+        logger.warning(f"Ignoring corrupt snapshot {path}: {str(e)}")
+        return None
+    frame = pd.DataFrame({
+        'Description': pd.Categorical.from_codes(column('description'), descriptions, validate=False),
+        'Income/expensive': pd.Categorical.from_codes(column('kind'), MOVEMENT_TYPES, validate=False),
+        'Cents': column('cents'),
+        'Category': pd.Categorical.from_codes(column('category'), categories, validate=False),
+        'Date': column('date'),
+        'Year': column('year'),
+        'Month': column('month'),
+    }, copy=False)
+    return Ledger(frame, header["source_hash"], header["rejected"])
+
+
+def load_rollup(path, source_hash=None):
+    """Returns the rollup cube stored in a snapshot header, or None."""
+    header = read_header(path, source_hash)
+    if header is None:
+        return None
+    try:
+        return RollupCube.from_dict(header["rollup"])
+    except (KeyError, ValueError, TypeError) as e:
+        logger.warning(f"Ignoring corrupt rollup in snapshot {path}: {str(e)}")
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compila movements.csv a un snapshot binario columnar")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    build = subcommands.add_parser("build", help="compila el snapshot")
+    build.add_argument("--csv", default=None, help="CSV de origen (por defecto services/movements.csv)")
+    build.add_argument("--output", default=None, help="ruta del snapshot")
+    args = parser.parse_args(argv)
+
+    from services.csv_client import CSV_FILE
+    csv_path = args.csv or CSV_FILE
+    output = build_snapshot(csv_path, args.output)
+    header = read_header(output)
+    print(f"Snapshot escrito en {output}: {header['rows']} filas, {os.path.getsize(output)} bytes, "
+          f"fuente {header['source_hash'][:12]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Ledger almacenado en SQLite, alternativo al CSV cargado en pandas.
+
+Los movimientos viven en una tabla con índices por (tipo, año, mes) y por
+(categoría, año, mes). SQLiteLedger responde las mismas consultas que
+RollupCube (totals, counts, categories) y que Ledger (select,
+categories_matching), así las funciones de operations_client funcionan sin
+cambios: cada agregado es una consulta parametrizada con GROUP BY y select
+lee solo las filas del filtro, no el ledger completo.
+
+Importar un CSV:
+    python -m services.sqlite_ledger services/movements.csv /tmp/giobot/ledger.sqlite3
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import pandas as pd
+from services.ledger import Ledger
+from services.ledger_cache import file_hash
+from services.ledger_reader import read_ledger
+
+logger = logging.getLogger()
+
+# Dimensión del cubo -> columna de la tabla
+_COLUMNS = {'kind': 'type', 'year': 'year', 'month': 'month', 'category': 'category'}
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS movements ("
+    " id INTEGER PRIMARY KEY,"
+    " description TEXT NOT NULL,"
+    " type TEXT NOT NULL,"
+    " cents INTEGER NOT NULL,"
+    " category TEXT NOT NULL,"
+    # Categoría en minúsculas: los filtros no distinguen mayúsculas, como Ledger.select
+    " category_key TEXT NOT NULL,"
+    " date TEXT NOT NULL,"
+    " year INTEGER NOT NULL,"
+    " month INTEGER NOT NULL)",
+    # Índices de cobertura: los agregados se resuelven sin leer la tabla
+    "CREATE INDEX IF NOT EXISTS movements_type_period ON movements (type, year, month, category, cents)",
+    "CREATE INDEX IF NOT EXISTS movements_category_period ON movements (category_key, year, month, type, cents)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+)
+
+
+def _filter_value(dimension, value):
+    if dimension == 'category':
+        return str(value).strip().lower()
+    if dimension in ('year', 'month'):
+        return int(value)
+    return value
+
+
+def _where(filters):
+    clauses, params = [], []
+    for dimension, value in filters.items():
+        column = 'category_key' if dimension == 'category' else _COLUMNS[dimension]
+        clauses.append(f"{column} = ?")
+        params.append(_filter_value(dimension, value))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class SQLiteLedger:
+    """
+    Movements in a SQLite file, queried with indexed SQL aggregates.
+
+    Args:
+        path (str): Database file; created with its schema if missing.
+    """
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._count = None
+        self._category_keys = None
+        self._version = None
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @property
+    def version(self):
+        """Version of the imported source (changes with every write), or None."""
+        if self._version is None:
+            rows = self._query("SELECT value FROM meta WHERE key = 'version'")
+            self._version = rows[0][0] if rows else None
+        return self._version
+
+    def import_ledger(self, ledger, version=None):
+        """
+        Replaces the stored movements with the rows of a Ledger in one transaction.
+
+        Returns:
+            int: Number of movements imported.
+        """
+        frame = ledger.frame
+        rows = zip(
+            frame['Description'].astype(str).tolist(),
+            frame['Income/expensive'].astype(str).tolist(),
+            frame['Cents'].tolist(),
+            frame['Category'].astype(str).tolist(),
+            frame['Category'].astype(str).str.lower().tolist(),
+            frame['Date'].dt.strftime('%Y-%m-%d %H:%M:%S').tolist(),
+            frame['Year'].astype(int).tolist(),
+            frame['Month'].astype(int).tolist(),
+        )
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM movements")
+                self._conn.executemany(
+                    "INSERT INTO movements (description, type, cents, category, category_key, date, year, month)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                                   (version or ledger.version,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._count = None
+            self._category_keys = None
+            self._version = None
+            self._conn.execute("ANALYZE")
+        return len(frame)
+
+    def append(self, records, version):
+        """
+        Inserts movements and stores the new source version in one transaction.
+
+        Args:
+            records (list): Dicts with Description, Income/expensive, Cents,
+                Category and a datetime Date, as passed to Ledger.append.
+            version (str): Version of the ledger once the rows are added.
+        """
+        rows = [
+            (record['Description'], record['Income/expensive'], int(record['Cents']), record['Category'],
+             record['Category'].lower(), record['Date'].strftime('%Y-%m-%d %H:%M:%S'),
+             record['Date'].year, record['Date'].month)
+            for record in records
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO movements (description, type, cents, category, category_key, date, year, month)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            if self._count is not None:
+                self._count += len(rows)
+            self._category_keys = None
+            self._version = version
+
+    def import_csv(self, csv_path, content_hash=None):
+        """Parses a movements CSV (same rules as the pandas path) and imports it."""
+        content_hash = content_hash or file_hash(csv_path)
+        ledger = read_ledger(csv_path, content_hash)
+        count = self.import_ledger(ledger, content_hash)
+        logger.info(f"Imported {count} movements from {csv_path} into {self.path}")
+        return count
+
+    def __len__(self):
+        if self._count is None:
+            self._count = self._query("SELECT COUNT(*) FROM movements")[0][0]
+        return self._count
+
+    def memory_usage(self):
+        """Upper bound of the memory of the connection: its page cache."""
+        cache_size, page_size = (self._query(f"PRAGMA {name}")[0][0] for name in ('cache_size', 'page_size'))
+        # cache_size negativo está en KiB; positivo, en páginas
+        return -cache_size * 1024 if cache_size < 0 else cache_size * page_size
+
+    # RollupCube interface
+
+    def _aggregate(self, group_by, aggregate, filters):
+        column = _COLUMNS[group_by]
+        where, params = _where(filters)
+        sql = f"SELECT {column}, {aggregate} FROM movements{where} GROUP BY {column} ORDER BY {column}"
+        return dict(self._query(sql, params))
+
+    def totals(self, group_by, **filters):
+        """Same as RollupCube.totals: {group value: cents}, ordered by group value."""
+        return self._aggregate(group_by, "SUM(cents)", filters)
+
+    def counts(self, group_by, **filters):
+        """Same as RollupCube.counts: {group value: number of movements}."""
+        return self._aggregate(group_by, "COUNT(*)", filters)
+
+    def categories(self):
+        """Returns the sorted category labels present in the ledger."""
+        return [row[0] for row in self._query("SELECT DISTINCT category FROM movements ORDER BY category")]
+
+    # Ledger interface
+
+    def categories_matching(self, category):
+        """Returns the stored categories that match a name case-insensitively."""
+        if self._category_keys is None:
+            keys = {}
+            for label in self.categories():
+                keys.setdefault(label.lower(), []).append(label)
+            self._category_keys = keys
+        return self._category_keys.get(str(category).strip().lower(), [])
+
+    def select(self, kind=None, year=None, month=None, category=None):
+        """
+        Reads only the matching movements, in insertion order.
+
+        Returns:
+            pd.DataFrame: Rows typed like Ledger.frame.
+        """
+        filters = {name: value for name, value in
+                   (('kind', kind), ('year', year), ('month', month), ('category', category))
+                   if value is not None}
+        where, params = _where(filters)
+        rows = self._query(f"SELECT description, type, cents, category, date FROM movements{where} ORDER BY id",
+                           params)
+        frame = pd.DataFrame(rows, columns=['Description', 'Income/expensive', 'Cents', 'Category', 'Date'])
+        frame['Cents'] = frame['Cents'].astype('int64')
+        frame['Date'] = pd.to_datetime(frame['Date'], format='%Y-%m-%d %H:%M:%S')
+        return Ledger.from_frame(frame, self.version).frame
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a movements CSV into a SQLite ledger")
+    parser.add_argument("csv_path")
+    parser.add_argument("db_path")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    SQLiteLedger(args.db_path).import_csv(args.csv_path)
+
+
+if __name__ == "__main__":
+    main()
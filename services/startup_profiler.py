@@ -0,0 +1,88 @@
+"""
+Perfilado de imports durante el arranque en frío, similar a `python -X importtime`
+pero registrado dentro de la Lambda.
+
+Se activa con la variable de entorno STARTUP_PROFILE=1. Este módulo solo usa
+la biblioteca estándar para no sumar tiempo al arranque que mide.
+"""
+import importlib._bootstrap as _bootstrap
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger()
+
+_original_find_and_load = None
+_records = []
+_stack = []
+
+
+def is_enabled():
+    """Returns True when STARTUP_PROFILE is set to a truthy value."""
+    return os.getenv('STARTUP_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+
+def enable():
+    """
+    Starts timing every module loaded from now on.
+
+    The hook wraps importlib's _find_and_load, which runs once per module
+    that is not yet in sys.modules, so each record is a real load.
+    """
+    global _original_find_and_load
+    if _original_find_and_load is not None:
+        return
+    original = _original_find_and_load = _bootstrap._find_and_load
+
+    def _timed_find_and_load(name, import_):
+        start = time.perf_counter()
+        _stack.append(0.0)
+        try:
+            return original(name, import_)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = _stack.pop()
+            if _stack:
+                _stack[-1] += elapsed
+            _records.append((name, elapsed - children, elapsed, len(_stack)))
+
+    _bootstrap._find_and_load = _timed_find_and_load
+
+
+def disable():
+    """Removes the import hook; the records are kept."""
+    global _original_find_and_load
+    if _original_find_and_load is not None:
+        _bootstrap._find_and_load = _original_find_and_load
+        _original_find_and_load = None
+
+
+def report(top=20):
+    """
+    Returns the slowest top-level imports recorded so far.
+
+    Returns:
+        list: Dicts with module, self_us, cumulative_us and depth, sorted by
+        cumulative time, like the columns of -X importtime.
+    """
+    rows = [
+        {"module": name, "self_us": round(own * 1e6), "cumulative_us": round(total * 1e6), "depth": depth}
+        for name, own, total, depth in _records
+    ]
+    rows.sort(key=lambda r: r["cumulative_us"], reverse=True)
+    return rows[:top]
+
+
+def log_report(stage, top=20):
+    """Logs the recorded import times as a single JSON line and clears them."""
+    if not _records:
+        return
+    total_us = round(sum(own for _, own, _, _ in _records) * 1e6)
+    logger.info(json.dumps({
+        "startup_profile": stage,
+        "modules": len(_records),
+        "total_us": total_us,
+        "slowest": report(top),
+    }))
+    _records.clear()
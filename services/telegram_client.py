@@ -1,82 +1,260 @@
 # Importamos las librerías necesarias
 import os
+import logging
+import random
+import threading
+import time
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from services.log_utils import log_payload
+
+logger = logging.getLogger()
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+
+class TelegramError(Exception):
+    """Error devuelto por la API de Telegram o al comunicarse con ella.
+
+    Attributes:
+        error_code: Código de error de Telegram (None si no hubo respuesta)
+        description: Descripción del error
+        retry_after: Segundos que Telegram pide esperar en un 429
+    """
+
+    def __init__(self, message, error_code=None, description=None, retry_after=None):
+        super().__init__(message)
+        self.error_code = error_code
+        self.description = description
+        self.retry_after = retry_after
+
+
+class TelegramClient:
+    """Cliente de la Bot API con una sesión HTTP reutilizable.
+
+    La sesión mantiene las conexiones abiertas (keep-alive), así que en una
+    Lambda caliente los mensajes no pagan de nuevo la conexión TCP y TLS.
+    Los errores de red, los 5xx y los 429 se reintentan con backoff
+    exponencial con jitter; en un 429 se espera el retry_after de Telegram.
+
+    Args:
+        token: Token del bot; por defecto TELEGRAM_BOT_TOKEN
+        timeout: Timeout en segundos de cada request
+        max_retries: Reintentos después del primer intento
+        backoff: Base en segundos del backoff exponencial
+        session: Sesión de requests a usar (para pruebas)
+        sleep: Función de espera (para pruebas)
+    """
+
+    def __init__(self, token=None, timeout=10, max_retries=3, backoff=0.5, session=None, sleep=time.sleep):
+        self.token = token or os.getenv('TELEGRAM_BOT_TOKEN')
+        self.base_url = f"{TELEGRAM_API_URL}/bot{self.token}"
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._sleep = sleep
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=10))
+        self.session = session
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _record(self, method, elapsed_ms, retries, ok):
+        with self._lock:
+            m = self._metrics.setdefault(method, {"calls": 0, "errors": 0, "retries": 0, "total_ms": 0.0, "max_ms": 0.0})
+            m["calls"] += 1
+            m["errors"] += 0 if ok else 1
+            m["retries"] += retries
+            m["total_ms"] += elapsed_ms
+            m["max_ms"] = max(m["max_ms"], elapsed_ms)
+
+    def stats(self):
+        """Devuelve por método de la API: llamadas, errores, reintentos y latencia en ms."""
+        with self._lock:
+            return {
+                method: {**m, "total_ms": round(m["total_ms"], 1), "max_ms": round(m["max_ms"], 1),
+                         "avg_ms": round(m["total_ms"] / m["calls"], 1)}
+                for method, m in self._metrics.items()
+            }
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return float(retry_after)
+        # Full jitter: evita que varios reintentos choquen al mismo tiempo
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    def call(self, method, payload, budget=None):
+        """Llama a un método de la Bot API y devuelve la respuesta JSON.
+
+        Args:
+            method: Método de la Bot API, por ejemplo "sendMessage"
+            payload: Parámetros del método
+            budget: Segundos totales disponibles, incluidos los reintentos
+
+        Raises:
+            TelegramError: Si Telegram responde ok=false o la red falla
+                después de agotar los reintentos
+        """
+        url = f"{self.base_url}/{method}"
+        started = time.perf_counter()
+        ends_at = started + budget if budget is not None else None
+        attempt = 0
+        while True:
+            timeout = self.timeout
+            if ends_at is not None:
+                timeout = min(timeout, ends_at - time.perf_counter())
+                if timeout <= 0:
+                    self._record(method, (time.perf_counter() - started) * 1000, attempt, False)
+                    raise TelegramError(f"Sin tiempo para llamar {method} en Telegram")
+            try:
+                response = self.session.post(url, json=payload, timeout=timeout)
+                try:
+                    response_data = response.json()
+                except ValueError:
+                    response_data = {"ok": False, "error_code": response.status_code,
+                                     "description": "No se pudo decodificar la respuesta de la API de Telegram"}
+                error = None
+                if not response_data.get('ok', False):
+                    error_code = response_data.get('error_code', response.status_code)
+                    description = response_data.get('description', 'Error desconocido')
+                    retry_after = (response_data.get('parameters') or {}).get('retry_after')
+                    error = TelegramError(f"Error de la API de Telegram en {method}: {description}",
+                                          error_code, description, retry_after)
+                    retryable = error_code == 429 or (isinstance(error_code, int) and error_code >= 500)
+            except requests.exceptions.Timeout:
+                error = TelegramError(f"Timeout al llamar {method} en Telegram")
+                retryable = True
+            except requests.exceptions.RequestException as e:
+                error = TelegramError(f"Error de conexión con la API de Telegram: {str(e)}")
+                retryable = True
+
+            if error is None:
+                self._record(method, (time.perf_counter() - started) * 1000, attempt, True)
+                return response_data
+            if not retryable or attempt >= self.max_retries:
+                self._record(method, (time.perf_counter() - started) * 1000, attempt, False)
+                logger.error(f"Telegram API error - Code: {error.error_code}, Description: {error}")
+                raise error
+            delay = self._delay(attempt, error.retry_after)
+            if ends_at is not None and time.perf_counter() + delay >= ends_at:
+                self._record(method, (time.perf_counter() - started) * 1000, attempt, False)
+                raise error
+            logger.warning(f"Telegram {method} failed ({error}), retrying in {delay:.2f}s")
+            self._sleep(delay)
+            attempt += 1
+
+    def send_message(self, chat_id, text, parse_mode="Markdown", budget=None):
+        payload = {"chat_id": chat_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        return self.call("sendMessage", payload, budget)
+
+    def edit_message_text(self, chat_id, message_id, text, parse_mode="Markdown", budget=None):
+        payload = {"chat_id": chat_id, "message_id": message_id, "text": text}
+        if parse_mode:
+            payload["parse_mode"] = parse_mode
+        return self.call("editMessageText", payload, budget)
+
+    def send_chat_action(self, chat_id, action="typing", budget=None):
+        return self.call("sendChatAction", {"chat_id": chat_id, "action": action}, budget)
+
+
+# Cliente compartido entre invocaciones de un contenedor caliente
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_telegram_client():
+    """Devuelve el TelegramClient del proceso, creándolo en el primer uso."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = TelegramClient()
+    return _client
+
+
+def _validate_chat_id(chat_id):
+    if not chat_id:
+        raise ValueError("El chat_id no puede estar vacío")
+
+    # Skip sending if chat_id is 0 (invalid)
+    if chat_id == 0 or chat_id == '0':
+        logger.warning("Skipping message send for invalid chat_id: 0")
+        raise ValueError("Chat ID inválido: 0")
+
+    # Convertir chat_id a string por si es un número
+    chat_id_str = str(chat_id).strip()
+
+    # Verificar que el chat_id tenga un formato válido
+    if not chat_id_str.lstrip('-').isdigit():
+        raise ValueError(f"Formato de chat_id no válido: {chat_id_str}")
+    return chat_id_str
+
 
 # Funcion para enviar un mensaje a Telegram
-def send_message_to_telegram(chat_id, text):
+def send_message_to_telegram(chat_id, text, parse_mode="Markdown", timeout=None):
     """Envía un mensaje a un chat de Telegram.
-    
+
     Args:
         chat_id: ID del chat de Telegram (puede ser un número o un string)
         text: Texto del mensaje a enviar
-        
+        parse_mode: Formato del texto ("Markdown" o None para texto plano)
+        timeout: Segundos disponibles para el envío, incluidos los reintentos
+
     Returns:
         dict: Respuesta de la API de Telegram
-        
+
     Raises:
         ValueError: Si el chat_id no es válido o está vacío
-        Exception: Si hay un error al enviar el mensaje
+        TelegramError: Si hay un error al enviar el mensaje
     """
-    import logging
-    logger = logging.getLogger()
-    
-    if not chat_id:
-        raise ValueError("El chat_id no puede estar vacío")
-    
-    # Skip sending if chat_id is 0 (invalid)
-    if chat_id == 0 or chat_id == '0':
-        logger.warning("Skipping message send for invalid chat_id: 0")
-        raise ValueError("Chat ID inválido: 0")
-        
+    chat_id_str = _validate_chat_id(chat_id)
+
+    logger.info("Sending message to chat_id: %s (%d chars)", chat_id_str, len(text))
+
     try:
-        # Convertir chat_id a string por si es un número
-        chat_id_str = str(chat_id).strip()
-        
-        # Verificar que el chat_id tenga un formato válido
-        if not chat_id_str.lstrip('-').isdigit():
-            raise ValueError(f"Formato de chat_id no válido: {chat_id_str}")
-        
-        logger.info(f"Sending message to chat_id: {chat_id_str}")
-        logger.info(f"Message text: {text[:100]}..." if len(text) > 100 else f"Message text: {text}")
-            
-        url = f"https://api.telegram.org/bot{os.getenv('TELEGRAM_BOT_TOKEN')}/sendMessage"
-        payload = {
-            "chat_id": chat_id_str,
-            "text": text,
-            "parse_mode": "Markdown"
-        }
-        
-        response = requests.post(url, json=payload, timeout=30)
-        response_data = response.json()
-        
-        logger.info(f"Telegram API response: {json.dumps(response_data, indent=2)}")
-        
-        if not response_data.get('ok', False):
-            error_code = response_data.get('error_code', 'N/A')
-            error_description = response_data.get('description', 'Error desconocido')
-            
-            # Log specific error details
-            logger.error(f"Telegram API error - Code: {error_code}, Description: {error_description}")
-            
-            # Handle specific error cases
-            if error_code == 400 and "chat not found" in error_description.lower():
-                raise Exception(f"Chat {chat_id_str} no encontrado. El usuario puede haber bloqueado el bot o el chat no existe.")
-            else:
-                raise Exception(f"Error al enviar mensaje a Telegram: {error_description}")
-            
-        logger.info("Message sent successfully to Telegram")
-        return response_data
-        
-    except requests.exceptions.Timeout:
-        logger.error("Timeout sending message to Telegram")
-        raise Exception("Timeout al enviar mensaje a Telegram")
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error: {str(e)}")
-        raise Exception(f"Error de conexión con la API de Telegram: {str(e)}")
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error: {str(e)}")
-        raise Exception("No se pudo decodificar la respuesta de la API de Telegram")
-    except Exception as e:
-        logger.error(f"Unexpected error sending message: {str(e)}")
-        raise Exception(f"Error inesperado al enviar mensaje: {str(e)}")
\ No newline at end of file
+        response_data = get_telegram_client().send_message(chat_id_str, text, parse_mode, timeout)
+    except TelegramError as e:
+        # Handle specific error cases
+        if e.error_code == 400 and "chat not found" in (e.description or "").lower():
+            raise TelegramError(
+                f"Chat {chat_id_str} no encontrado. El usuario puede haber bloqueado el bot o el chat no existe.",
+                e.error_code, e.description,
+            )
+        raise
+
+    log_payload(logger, "Telegram API response", response_data, level=logging.DEBUG)
+    logger.info("Message sent successfully to Telegram")
+    return response_data
+
+
+# Funcion para reemplazar el texto de un mensaje ya enviado
+def edit_message_in_telegram(chat_id, message_id, text, parse_mode="Markdown", timeout=None):
+    """Edita el texto de un mensaje enviado por el bot.
+
+    Args:
+        chat_id: ID del chat de Telegram
+        message_id: ID del mensaje devuelto por sendMessage
+        text: Nuevo texto del mensaje
+        parse_mode: Formato del texto ("Markdown" o None para texto plano)
+        timeout: Segundos disponibles para la edición, incluidos los reintentos
+
+    Returns:
+        dict: Respuesta de la API de Telegram
+
+    Raises:
+        TelegramError: Si Telegram rechaza la edición o hay un error de conexión
+    """
+    return get_telegram_client().edit_message_text(str(chat_id).strip(), message_id, text, parse_mode, timeout)
+
+
+# Funcion para mostrar "escribiendo..." mientras se prepara la respuesta
+def send_chat_action_to_telegram(chat_id, action="typing", timeout=None):
+    """Envía una acción de chat (por defecto "typing") a Telegram.
+
+    Raises:
+        TelegramError: Si Telegram rechaza la acción o hay un error de conexión
+    """
+    return get_telegram_client().send_chat_action(str(chat_id).strip(), action, timeout)
@@ -0,0 +1,144 @@
+import logging
+import os
+import time
+from services.telegram_client import send_message_to_telegram, edit_message_in_telegram
+
+logger = logging.getLogger()
+
+# Telegram admite alrededor de una edición por segundo en un mismo chat
+STREAM_EDIT_INTERVAL = float(os.getenv('STREAM_EDIT_INTERVAL', '1.0'))
+# Caracteres mínimos antes de enviar el primer mensaje, para no mostrar una sola palabra
+STREAM_MIN_CHARS = int(os.getenv('STREAM_MIN_CHARS', '20'))
+
+TELEGRAM_MAX_LENGTH = 4096
+CURSOR = ' ▌'
+
+
+def _preview(text):
+    """Texto parcial mostrado mientras llega la respuesta, sin formato Markdown."""
+    return text[:TELEGRAM_MAX_LENGTH - len(CURSOR)] + CURSOR
+
+
+def _timeout(deadline, reserve_ms=0):
+    return deadline.timeout(reserve_ms) if deadline is not None else None
+
+
+def _split(text):
+    """Parte el texto en mensajes de hasta TELEGRAM_MAX_LENGTH, cortando en saltos de línea si se puede."""
+    parts = []
+    while len(text) > TELEGRAM_MAX_LENGTH:
+        cut = text.rfind('\n', 0, TELEGRAM_MAX_LENGTH)
+        if cut <= 0:
+            cut = TELEGRAM_MAX_LENGTH
+        parts.append(text[:cut])
+        text = text[cut:].lstrip('\n')
+    return parts + [text]
+
+
+def _send(chat_id, text, deadline):
+    """Sends text with Markdown, falling back to plain text; returns False if both fail."""
+    try:
+        send_message_to_telegram(chat_id, text, timeout=_timeout(deadline))
+        return True
+    except Exception as e:
+        logger.warning(f"Markdown send failed, retrying as plain text: {str(e)}")
+    try:
+        send_message_to_telegram(chat_id, text, parse_mode=None, timeout=_timeout(deadline))
+        return True
+    except Exception as e:
+        logger.error(f"Could not deliver part of the streamed answer: {str(e)}")
+        return False
+
+
+def stream_to_telegram(chat_id, chunks, min_interval=STREAM_EDIT_INTERVAL,
+                       min_chars=STREAM_MIN_CHARS, clock=time.monotonic, deadline=None, reserve_ms=0):
+    """
+    Shows a streamed answer in Telegram while it is being generated.
+
+    The first message is sent as plain text as soon as min_chars have
+    arrived. It is then edited at most once every min_interval seconds, and
+    a final edit applies the Markdown formatting. Partial text is never sent
+    as Markdown because an unclosed entity makes Telegram reject it.
+
+    Args:
+        chat_id: Telegram chat ID.
+        chunks (iterable): Text fragments, e.g. from stream_ai_response.
+        min_interval (float): Minimum seconds between two edits.
+        min_chars (int): Characters needed before the first message is sent.
+        clock (callable): Monotonic time source.
+        deadline (Deadline, optional): When less than reserve_ms remain, the
+            stream is cut and the text received so far is finalized.
+        reserve_ms (float): Time kept for the final send or edit.
+
+    An answer longer than TELEGRAM_MAX_LENGTH is split: the first part goes
+    into the streamed message and the rest are sent as new messages.
+
+    Returns:
+        dict: {"text": answer, "first_visible_ms": time until the first
+        message was sent, "edits": number of edits, "truncated": True if
+        the deadline cut the stream, "delivered": False if some part of the
+        final answer could not be shown}.
+    """
+    started = clock()
+    text = ''
+    message_id = None
+    first_visible_ms = None
+    last_edit = started
+    last_shown = None
+    edits = 0
+    truncated = False
+
+    for chunk in chunks:
+        text += chunk
+        if deadline is not None and not deadline.has_time(0, reserve_ms):
+            logger.warning("Deadline reached while streaming, finalizing partial answer")
+            text += " …"
+            truncated = True
+            break
+        now = clock()
+        if message_id is None:
+            if len(text.strip()) >= min_chars:
+                response = send_message_to_telegram(chat_id, _preview(text), parse_mode=None,
+                                                    timeout=_timeout(deadline))
+                message_id = response["result"]["message_id"]
+                first_visible_ms = (now - started) * 1000
+                last_edit, last_shown = now, text
+        elif now - last_edit >= min_interval and text != last_shown:
+            try:
+                edit_message_in_telegram(chat_id, message_id, _preview(text), parse_mode=None,
+                                         timeout=_timeout(deadline, reserve_ms))
+                edits += 1
+            except Exception as e:
+                # Una edición intermedia perdida no afecta el resultado final
+                logger.warning(f"Streaming edit failed: {str(e)}")
+            last_edit, last_shown = now, text
+
+    parts = _split(text)
+    delivered = True
+    if message_id is None:
+        # La respuesta fue muy corta: un único mensaje con formato
+        send_message_to_telegram(chat_id, parts[0], timeout=_timeout(deadline))
+        first_visible_ms = (clock() - started) * 1000
+    else:
+        try:
+            edit_message_in_telegram(chat_id, message_id, parts[0], timeout=_timeout(deadline))
+        except Exception as e:
+            logger.warning(f"Markdown edit failed, keeping plain text: {str(e)}")
+            try:
+                edit_message_in_telegram(chat_id, message_id, parts[0], parse_mode=None, timeout=_timeout(deadline))
+            except Exception as e:
+                # El usuario ya ve la respuesta parcial: se envía completa en un
+                # mensaje nuevo en lugar de propagar el error
+                logger.error(f"Final edit failed, sending the answer as a new message: {str(e)}")
+                try:
+                    send_message_to_telegram(chat_id, parts[0], parse_mode=None, timeout=_timeout(deadline))
+                except Exception as e:
+                    logger.error(f"Could not deliver the complete streamed answer: {str(e)}")
+                    delivered = False
+        edits += 1
+    for part in parts[1:]:
+        delivered = _send(chat_id, part, deadline) and delivered
+
+    logger.info(f"Streamed answer: {len(text)} chars, first visible after {first_visible_ms:.0f} ms, {edits} edits")
+    return {"text": text, "first_visible_ms": first_visible_ms, "edits": edits, "truncated": truncated,
+            "delivered": delivered}
@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after a time to live.
+
+    Entries are stored with their wall-clock expiry, so a cache saved to
+    disk keeps its TTLs when it is loaded again by another process.
+
+    Args:
+        max_size (int): Maximum number of entries; the least recently used
+            entry is evicted when it is exceeded.
+        ttl_seconds (float): Lifetime of each entry.
+        clock (callable, optional): Returns the current time in seconds.
+    """
+
+    def __init__(self, max_size=256, ttl_seconds=3600, clock=time.time):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """Returns the value for key, or default if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Stores a value, evicting the least recently used entries if needed."""
+        with self._lock:
+            self._entries[key] = (value, self._clock() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Returns the size and the hit, miss, eviction and expiration counters."""
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def save(self, path, tag=None):
+        """
+        Writes the live entries to a JSON file atomically.
+
+        Args:
+            path (str): Destination file.
+            tag (str, optional): Value stored with the entries; load ignores
+                the file when the tags differ.
+        """
+        now = self._clock()
+        with self._lock:
+            entries = [[k, v, exp] for k, (v, exp) in self._entries.items() if exp > now]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"tag": tag, "entries": entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path, tag=None):
+        """
+        Adds the unexpired entries saved with save.
+
+        Returns:
+            int: Number of entries loaded (0 if the file is missing, unreadable
+            or has another tag).
+        """
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache file {path}: {str(e)}")
+            return 0
+        if data.get("tag") != tag:
+            return 0
+        now = self._clock()
+        loaded = 0
+        with self._lock:
+            for key, value, expires_at in data.get("entries", []):
+                if expires_at > now and key not in self._entries:
+                    self._entries[key] = (value, expires_at)
+                    loaded += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return loaded
@@ -0,0 +1,29 @@
+from services.answer_cache import AnswerCache, canonical_params
+
+
+def test_canonical_params_ignore_case_order_and_month_form():
+    """Equivalent params serialize to the same key."""
+    assert canonical_params({"month": "Marzo", "category": " Food "}) == canonical_params({"category": "food", "month": 3})
+    assert canonical_params(None) == canonical_params({}) == "{}"
+
+
+def test_answer_cache_is_scoped_to_ledger_version():
+    """A hit reports the saved latency and an answer is only reused for its own ledger version."""
+    cache = AnswerCache(max_size=4, ttl_seconds=60)
+    cache.put("expenses_by_month", {"month": 3}, "v1", "Gastaste 10", latency_ms=900)
+    assert cache.get("expenses_by_month", {"month": "marzo"}, "v1") == "Gastaste 10"
+    assert cache.stats()["saved_ms"] == 900
+    assert cache.get("expenses_by_month", {"month": 3}, "v2") is None
+    assert cache.get("expenses_by_month", {"month": 3}, None) is None
+
+
+def test_versions_of_different_chats_do_not_evict_each_other():
+    """Alternating ledger versions (one per chat partition) keep hitting their own entries."""
+    cache = AnswerCache(max_size=4, ttl_seconds=60)
+    cache.put("op", {}, "v1", "A")
+    cache.put("op", {}, "v2", "B")
+    for _ in range(3):
+        assert cache.get("op", {}, "v1") == "A"
+        assert cache.get("op", {}, "v2") == "B"
+    assert cache.get("op", {}, "v3") is None
+    assert cache.get("op", {}, "v1") == "A"
@@ -0,0 +1,8 @@
+from benchmarks.cold_start import measure_cold_start, check_budget
+
+
+def test_health_check_cold_start_within_budget():
+    """A cold GET stays within the init budget and skips heavy imports"""
+    results = measure_cold_start(runs=3)
+
+    assert check_budget(results) == []
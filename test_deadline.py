@@ -0,0 +1,28 @@
+from services.answer_formatter import format_amount, format_result
+from services.deadline import Deadline
+
+
+class FakeContext:
+    def get_remaining_time_in_millis(self):
+        return 4000
+
+
+def test_deadline_budgets_stages_from_context():
+    """Stage timeouts leave the reserved time and a dict context falls back to the default."""
+    now = [0.0]
+    deadline = Deadline(FakeContext().get_remaining_time_in_millis(), clock=lambda: now[0])
+    assert deadline.timeout(reserve_ms=1000) == 3.0
+    assert deadline.timeout(reserve_ms=1000, cap=2) == 2
+    now[0] = 2.5
+    assert not deadline.has_time(1000, reserve_ms=1000)
+    assert deadline.timeout(reserve_ms=2000) == 0.0
+    assert Deadline.from_context({}, default_ms=500).remaining_ms() <= 500
+    assert 3000 < Deadline.from_context(FakeContext()).remaining_ms() <= 4000
+
+
+def test_local_answer_formats_operation_results():
+    """The fallback answer formats amounts with Spanish separators."""
+    assert format_amount(1234567.5) == "$1.234.567,50"
+    text = format_result({"2025": {"expensive": 100.0, "income": 250.0}})
+    assert "Gastos: $100,00" in text and "Balance: $150,00" in text
+    assert format_result({"error": "boom"}).startswith("⚠️")
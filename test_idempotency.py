@@ -0,0 +1,61 @@
+import base64
+import json
+import sqlite3
+from handlers.telegram_handler import extract_update_id
+from services.idempotency import (
+    IdempotencyGuard, MemoryIdempotencyStore, SQLiteIdempotencyStore, NEW, IN_FLIGHT, DONE,
+)
+
+
+def test_extract_update_id_reads_plain_and_base64_bodies():
+    """The update_id is read from the webhook body, also when it is base64 encoded."""
+    body = json.dumps({"update_id": 42, "message": {"chat": {"id": 1}, "text": "hola"}})
+    assert extract_update_id({"body": body}) == 42
+    encoded = base64.b64encode(body.encode()).decode()
+    assert extract_update_id({"body": encoded, "isBase64Encoded": True}) == 42
+    assert extract_update_id({"body": "no json"}) is None
+
+
+def test_guard_skips_duplicates_and_counts_them():
+    """In-flight and completed updates are duplicates; a released one is processed again."""
+    guard = IdempotencyGuard(MemoryIdempotencyStore(max_entries=10))
+    assert guard.begin(1)
+    assert not guard.begin(1)
+    guard.complete(1)
+    assert not guard.begin(1)
+    assert guard.begin(2)
+    guard.release(2)
+    assert guard.begin(2)
+    assert guard.begin(None)
+    stats = guard.stats()
+    assert stats["duplicate_in_flight"] == 1 and stats["duplicate_done"] == 1
+    assert stats["llm_calls_avoided"] == 4
+
+
+def test_sqlite_store_is_shared_and_recovers_stale_in_flight(tmp_path):
+    """Two stores on one file see each other's updates; stale in-flight markers expire."""
+    now = [0.0]
+    path = str(tmp_path / "idem.sqlite3")
+    first = SQLiteIdempotencyStore(path, in_flight_timeout=60, clock=lambda: now[0])
+    second = SQLiteIdempotencyStore(path, in_flight_timeout=60, clock=lambda: now[0])
+    assert first.begin(7) == NEW
+    assert second.begin(7) == IN_FLIGHT
+    now[0] = 61
+    assert second.begin(7) == NEW
+    second.complete(7)
+    assert first.begin(7) == DONE
+
+
+def test_store_errors_when_finishing_are_logged_not_raised():
+    """complete and release swallow store errors, like begin does."""
+    class LockedStore(MemoryIdempotencyStore):
+        def complete(self, update_id):
+            raise sqlite3.OperationalError("database is locked")
+
+        def release(self, update_id):
+            raise sqlite3.OperationalError("database is locked")
+
+    guard = IdempotencyGuard(LockedStore())
+    assert guard.begin(1)
+    guard.complete(1)
+    guard.release(1)
@@ -0,0 +1,61 @@
+from services.intent_router import classify, route_message, normalize_text
+
+CATEGORIES = ["Saving", "Taxes", "food", "health", "public services", "salary"]
+
+
+def test_common_questions_are_routed_locally():
+    """Typical month/category questions resolve without the LLM"""
+    assert route_message("gastos de septiembre", CATEGORIES) == {
+        "operation": "expenses_by_month", "params": {"month": 9}}
+    assert route_message("¿Cuánto gasté en comida en agosto?", CATEGORIES) == {
+        "operation": "expenses_by_category_by_month", "params": {"category": "food", "month": 8}}
+    assert route_message("Me puedes decir los gastos por categoría en el mes de agosto", CATEGORIES) == {
+        "operation": "expenses_by_category_by_month", "params": {"category": "category", "month": 8}}
+    assert route_message("movimientos de servicios públicos en marzo", CATEGORIES) == {
+        "operation": "movements_by_category_and_month", "params": {"category": "public services", "month": 3}}
+
+
+def test_ambiguous_questions_fall_back_to_llm():
+    """Low-confidence or unknown intents are delegated to the LLM"""
+    assert route_message("hola, ¿cómo estás?", CATEGORIES) is None
+    assert route_message("gastos de agosto y septiembre", CATEGORIES) is None
+    assert route_message("promedio de gastos en agosto", CATEGORIES) is None
+    assert classify("hola", CATEGORIES)["confidence"] == 0.0
+
+
+def test_normalize_text():
+    assert normalize_text("  ¿Cuánto  GASTÉ?? ") == "cuanto gaste"
+
+
+def test_record_statements_are_routed_to_record_movement():
+    """Statements with an amount record a movement; questions keep querying"""
+    assert route_message("gasté 50.000 en comida hoy", CATEGORIES) == {
+        "operation": "record_movement",
+        "params": {"kind": "expensive", "amount": "50.000", "category": "food", "date": "hoy"}}
+    assert route_message("me pagaron el salario 8.000.000", CATEGORIES) == {
+        "operation": "record_movement", "params": {"kind": "income", "amount": "8.000.000", "category": "salary"}}
+    # Fechas explícitas y categorías desconocidas las resuelve el LLM
+    assert route_message("gasté 30 mil en comida el 3 de agosto", CATEGORIES) is None
+    assert route_message("gasté 45000 en algo", CATEGORIES) is None
+    assert route_message("¿cuánto gasté en comida en agosto?", CATEGORIES)["operation"] != "record_movement"
+
+
+def test_records_with_dates_the_router_cannot_resolve_fall_back_to_llm():
+    """Relative dates other than hoy/ayer/anteayer are never recorded as today"""
+    for message in ("gasté 50.000 en comida el mes pasado", "gasté 50.000 en comida el lunes",
+                    "pagué 120.000 de impuestos la semana pasada", "gasté 50.000 en comida el 5"):
+        decision = classify(message, CATEGORIES)
+        assert decision["operation"] == "record_movement" and decision["confidence"] == 0.0, message
+    assert route_message("gasté 50.000 en comida ayer", CATEGORIES)["params"]["date"] == "ayer"
+    assert route_message("pagué el 50.000 de impuestos", CATEGORIES) == {
+        "operation": "record_movement", "params": {"kind": "expensive", "amount": "50.000", "category": "Taxes"}}
+
+
+def test_questions_about_relative_periods_fall_back_to_llm():
+    """Periods the operations cannot express are not answered with yearly totals"""
+    for message in ("cuánto gasté en comida este mes", "cuánto gasté en comida hoy",
+                    "cuánto gasté en comida la semana pasada", "cuánto gasté en comida ayer",
+                    "cuánto gasté en comida el mes pasado", "gastos del año pasado"):
+        assert route_message(message, CATEGORIES) is None, message
+    assert route_message("cuánto gasté en comida", CATEGORIES) == {
+        "operation": "expenses_by_category_by_year", "params": {"category": "food"}}
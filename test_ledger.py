@@ -0,0 +1,71 @@
+from services.ledger import Ledger, EXPENSE, INCOME
+from services.amounts import parse_amounts
+from services.rollup import RollupCube
+
+
+TRANSACTIONS = [
+    {"\ufeffDescription": "mercado", "Income/expensive": "expensive", "Amount": "$100.500", "Category": "food", "Date": "2025-01-05 00:00:00"},
+    {"\ufeffDescription": "arriendo", "Income/expensive": "income", "Amount": "$1.000.000", "Category": "pasive incomes", "Date": "2025-01-01 00:00:00"},
+    {"\ufeffDescription": "impuesto", "Income/expensive": "expensive", "Amount": "$20.000", "Category": "Taxes", "Date": "2025-02-01 00:00:00"},
+    {"\ufeffDescription": "predial", "Income/expensive": "expensive", "Amount": "$30.000", "Category": "taxes", "Date": "2025-02-10 00:00:00"},
+    {"\ufeffDescription": "sin monto", "Income/expensive": "expensive", "Amount": "", "Category": "food", "Date": "2025-02-10 00:00:00"},
+    {"\ufeffDescription": "sin fecha", "Income/expensive": "expensive", "Amount": "$1.000", "Category": "food", "Date": "no date"},
+]
+
+
+def test_ledger_columns_are_typed():
+    """Amounts are integer cents and the BOM is stripped from the headers"""
+    ledger = Ledger.from_transactions(TRANSACTIONS, version="v1")
+
+    assert len(ledger) == 4
+    assert ledger.version == "v1"
+    assert str(ledger.frame['Cents'].dtype) == 'int64'
+    assert str(ledger.frame['Category'].dtype) == 'category'
+    assert str(ledger.frame['Income/expensive'].dtype) == 'category'
+    assert ledger.frame['Cents'].tolist()[:2] == [10050000, 100000000]
+    assert ledger.frame['Description'].tolist()[0] == "mercado"
+
+
+def test_select_matches_categories_case_insensitively():
+    """Category filters match every label that differs only in case"""
+    ledger = Ledger.from_transactions(TRANSACTIONS)
+
+    taxes = ledger.select(kind=EXPENSE, category="TAXES")
+    assert Ledger.total(taxes) == 50000.0
+    assert Ledger.sum_by(ledger.select(kind=INCOME), 'Year').to_dict() == {2025: 1000000.0}
+    assert ledger.select(category="unknown").empty
+
+
+def test_parse_amounts_returns_exact_cents():
+    """Thousands dots, decimal commas and signs are parsed to int64 cents"""
+    cents, valid = parse_amounts([" $1.000.000 ", "$1.234,5", "-$20.000", "999", "$1.00", "1 000", ""])
+
+    assert valid.tolist() == [True, True, True, True, False, False, False]
+    assert cents.tolist() == [100000000, 123450, -2000000, 99900, 0, 0, 0]
+
+
+def test_malformed_rows_are_reported():
+    """Rows with a bad amount or date are kept out of the frame but reported"""
+    ledger = Ledger.from_transactions(TRANSACTIONS)
+
+    assert ledger.rejected == [
+        {"line": 6, "field": "Amount", "value": ""},
+        {"line": 7, "field": "Date", "value": "no date"},
+    ]
+
+
+def test_rollup_cube_answers_from_lookups_and_round_trips(tmp_path):
+    """The cube reproduces the ledger totals and reloads from disk"""
+    ledger = Ledger.from_transactions(TRANSACTIONS, version="v1")
+    cube = RollupCube.from_ledger(ledger)
+
+    assert cube.totals('year', kind=EXPENSE, category="taxes") == {2025: 5000000}
+    assert cube.totals('category', kind=EXPENSE, month=2) == {"Taxes": 2000000, "taxes": 3000000}
+    assert cube.counts('month', kind=EXPENSE) == {1: 1, 2: 2}
+
+    path = str(tmp_path / "rollup.json")
+    cube.save(path)
+    assert RollupCube.load(path, version="v2") is None
+    reloaded = RollupCube.load(path, version="v1")
+    assert reloaded.cells == cube.cells
+    assert reloaded.totals('year', kind=INCOME) == {2025: 100000000}
@@ -0,0 +1,43 @@
+import os
+from services.ledger_cache import LedgerCache
+
+
+def _counting_builder(calls):
+    def build(path, content_hash):
+        calls.append(content_hash)
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    return build
+
+
+def test_cache_hits_until_source_changes(tmp_path):
+    """The ledger is parsed once and reused while the file is unchanged"""
+    source = tmp_path / "movements.csv"
+    source.write_text("a;b\n", encoding='utf-8')
+    calls = []
+    cache = LedgerCache(str(source), _counting_builder(calls))
+
+    assert cache.get() == "a;b\n"
+    assert cache.get() == "a;b\n"
+    assert len(calls) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "reloads": 0}
+
+    source.write_text("a;b\nc;d\n", encoding='utf-8')
+    assert cache.get() == "a;b\nc;d\n"
+    assert cache.stats() == {"hits": 1, "misses": 1, "reloads": 1}
+
+
+def test_touched_file_with_same_content_is_not_reparsed(tmp_path):
+    """A new mtime with identical content only triggers a hash check"""
+    source = tmp_path / "movements.csv"
+    source.write_text("a;b\n", encoding='utf-8')
+    calls = []
+    cache = LedgerCache(str(source), _counting_builder(calls))
+    cache.get()
+
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    cache.get()
+
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,31 @@
+from benchmarks.ledger_generator import HEADER, generate_ledger
+from services.csv_client import load_transactions
+from services.ledger import Ledger
+
+
+def test_generated_ledger_matches_the_csv_schema(tmp_path):
+    """The file uses the BOM, ';', padded amounts and CRLF, and parses without rejects."""
+    path = tmp_path / "ledger.csv"
+    generate_ledger(str(path), 500, start="2024-01-01", end="2024-12-31")
+    raw = path.read_bytes()
+    assert raw.startswith(HEADER.encode("utf-8"))
+    assert raw.count(b"\r\n") == 501
+    first_row = raw.split(b"\r\n")[1].decode("utf-8").split(";")
+    assert first_row[2].startswith(" $") and first_row[2].endswith(" ")
+    assert first_row[4].endswith(" 00:00:00")
+
+    ledger = Ledger.from_transactions(load_transactions(str(path)))
+    assert len(ledger) == 500 and ledger.rejected == []
+    assert set(ledger.frame["Year"]) == {2024}
+
+
+def test_generation_is_deterministic_and_configurable(tmp_path):
+    """The same seed writes the same file; custom categories are honoured."""
+    categories = {"food": ("expensive", 3, 50_000), "salary": ("income", 1, 5_000_000)}
+    a, b = tmp_path / "a.csv", tmp_path / "b.csv"
+    generate_ledger(str(a), 300, categories, seed=7)
+    generate_ledger(str(b), 300, categories, seed=7)
+    assert a.read_bytes() == b.read_bytes()
+    frame = Ledger.from_transactions(load_transactions(str(a))).frame
+    assert set(frame["Category"]) == {"food", "salary"}
+    assert set(frame.loc[frame["Category"] == "salary", "Income/expensive"]) == {"income"}
@@ -0,0 +1,100 @@
+import datetime
+from services import csv_client, operations_client
+from services.ledger_partitions import LedgerPartition
+from services.ledger_journal import LedgerJournal, new_transaction, combined_version, HEADER
+
+
+def test_journal_survives_a_torn_write(tmp_path):
+    """Complete lines are kept across processes and a torn last line is discarded"""
+    path = str(tmp_path / "journal.csv")
+    journal = LedgerJournal(path)
+    assert journal.snapshot() == ([], None)
+
+    journal.append(new_transaction("expensive", 5000000, "food", datetime.date(2025, 8, 3), "mercado"))
+    with open(path, 'rb') as f:
+        content = f.read()
+    assert content == (HEADER + "mercado;expensive; $50.000 ;food;2025-08-03 00:00:00\r\n").encode('utf-8')
+
+    # Un proceso murió a mitad de la escritura
+    with open(path, 'ab') as f:
+        f.write(b"almuerzo;expensive; $20.0")
+    reopened = LedgerJournal(path)
+    transactions, digest = reopened.snapshot()
+    assert [t['Amount'] for t in transactions] == ["$50.000"]
+    assert digest == journal.digest
+
+    reopened.append(new_transaction("income", 123450, "salary", datetime.date(2025, 8, 4)))
+    transactions, _ = LedgerJournal(path).snapshot()
+    assert [(t['Description'], t['Amount']) for t in transactions] == [("mercado", "$50.000"), ("salary", "$1.234,50")]
+    assert reopened.position("base", combined_version("base", journal.digest)) == 1
+    assert combined_version("base", None) == "base"
+
+
+def test_append_updates_loaded_aggregates_without_rebuilding(tmp_path, monkeypatch):
+    """A recorded movement reaches the cached ledger and cube and matches a full rebuild"""
+    partition = LedgerPartition(csv_client.CSV_FILE, str(tmp_path / "journal.csv"), str(tmp_path))
+    monkeypatch.setattr(csv_client, "_default_partition", partition)
+    monkeypatch.setattr(csv_client, "LEDGER_JOURNAL_CONFIGURED", True)
+
+    before = operations_client.expenses_by_category_by_month(8, "food")
+    ledger, cube, version = csv_client.load_ledger(), csv_client.load_rollup(), csv_client.ledger_version()
+
+    result = operations_client.record_movement("expensive", 5000000, "food", datetime.date(2025, 8, 3), "mercado")
+    assert result["status"] == "recorded"
+    assert csv_client.load_ledger() is ledger and csv_client.load_rollup() is cube
+    assert csv_client.ledger_cache_stats()["reloads"] == 0
+    assert csv_client.ledger_version() != version
+
+    after = operations_client.expenses_by_category_by_month(8, "food")
+    assert after["total"] == before["total"] + 50000
+    assert after["transactions"][-1]["Description"] == "mercado"
+    rows = operations_client.movements_by_category_and_month("food", 8)
+
+    partition.ledger_cache.invalidate()
+    partition.rollup_cache.invalidate()
+    assert operations_client.expenses_by_category_by_month(8, "food") == after
+    assert operations_client.movements_by_category_and_month("food", 8) == rows
+    assert csv_client.ledger_version() == combined_version(version, partition.journal.digest)
+
+
+def test_invalid_movements_are_rejected(tmp_path, monkeypatch):
+    """Invalid movements, or no durable journal configured, come back as errors and nothing is written"""
+    partition = LedgerPartition(csv_client.CSV_FILE, str(tmp_path / "journal.csv"), str(tmp_path))
+    monkeypatch.setattr(csv_client, "_default_partition", partition)
+    monkeypatch.setattr(csv_client, "LEDGER_JOURNAL_CONFIGURED", True)
+    result = operations_client.record_movement("expensive", 100, "comida; borrar", datetime.date(2025, 8, 3))
+    assert "error" in result
+    assert not (tmp_path / "journal.csv").exists()
+
+    # Sin un diario durable configurado no se acepta ningún movimiento
+    monkeypatch.setattr(csv_client, "LEDGER_JOURNAL_CONFIGURED", False)
+    result = operations_client.record_movement("expensive", 100, "comida", datetime.date(2025, 8, 3))
+    assert result == {"error": "Recording movements is not enabled on this deployment"}
+    assert not (tmp_path / "journal.csv").exists()
+
+
+def test_redelivered_update_does_not_record_twice(tmp_path, monkeypatch):
+    """A failed confirmation after a successful write completes the update instead of releasing it"""
+    import json
+    from handlers import message_handler
+    from services.idempotency import IdempotencyGuard, MemoryIdempotencyStore
+    from services.telegram_client import TelegramError
+
+    partition = LedgerPartition(csv_client.CSV_FILE, str(tmp_path / "journal.csv"), str(tmp_path))
+    monkeypatch.setattr(csv_client, "_default_partition", partition)
+    monkeypatch.setattr(csv_client, "LEDGER_JOURNAL_CONFIGURED", True)
+    monkeypatch.setattr(message_handler, "idempotency_guard", IdempotencyGuard(MemoryIdempotencyStore()))
+    monkeypatch.setattr(message_handler, "send_chat_action_to_telegram", lambda *a, **k: None)
+
+    def send(*args, **kwargs):
+        raise TelegramError("telegram down")
+
+    monkeypatch.setattr(message_handler, "send_message_to_telegram", send)
+    event = {"httpMethod": "POST", "body": json.dumps(
+        {"update_id": 77, "message": {"chat": {"id": 5}, "text": "gasté 50.000 en comida hoy"}})}
+
+    assert message_handler.handle_message_event(event, None)["statusCode"] == 500
+    # Telegram reenvía el update: no se vuelve a registrar
+    assert message_handler.handle_message_event(event, None)["statusCode"] == 200
+    transactions, _ = partition.journal.snapshot()
+    assert [t["Amount"] for t in transactions] == ["$50.000"]
@@ -0,0 +1,95 @@
+import datetime
+from services import csv_client, operations_client
+from services.ledger_journal import HEADER
+from services.ledger_partitions import LedgerPartition, PartitionCache, chat_scope
+
+
+def _write_ledger(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(HEADER + "".join(f"{row}\r\n" for row in rows), encoding='utf-8')
+
+
+def _use_partitions(tmp_path, monkeypatch, budget_bytes=1 << 30):
+    monkeypatch.setattr(csv_client, "LEDGER_PARTITIONS_DIR", str(tmp_path / "chats"))
+    monkeypatch.setattr(csv_client, "CACHE_DIR", str(tmp_path / "cache"))
+    partitions = PartitionCache(csv_client._chat_partition, budget_bytes)
+    monkeypatch.setattr(csv_client, "_partitions", partitions)
+    return partitions
+
+
+def test_each_chat_reads_and_writes_its_own_ledger(tmp_path, monkeypatch):
+    """Partitions load on the first query of their chat and never see other chats' movements"""
+    partitions = _use_partitions(tmp_path, monkeypatch)
+    _write_ledger(tmp_path / "chats" / "1" / "movements.csv", [
+        "mercado;expensive; $80.000 ;food;2025-08-02 00:00:00",
+        "sueldo;income; $3.000.000 ;salary;2025-08-01 00:00:00",
+    ])
+    assert 1 not in partitions
+
+    with chat_scope(1):
+        assert operations_client.expenses_by_category_by_month(8, "food")["total"] == 80000
+        assert operations_client.get_categories() == ["food", "salary"]
+    assert 1 in partitions and 2 not in partitions
+
+    with chat_scope(2):
+        # Chat nuevo: su ledger se crea vacío
+        assert operations_client.get_categories() == []
+        result = operations_client.record_movement("expensive", 2000000, "food", datetime.date(2025, 8, 3))
+        assert result["status"] == "recorded"
+        assert operations_client.expenses_by_category_by_month(8, "food")["total"] == 20000
+    assert (tmp_path / "chats" / "2" / "journal.csv").exists()
+
+    with chat_scope(1):
+        assert operations_client.expenses_by_category_by_month(8, "food")["total"] == 80000
+    # Sin chat activo se usa el ledger único
+    assert csv_client.ledger_version() == csv_client._default_partition.version()
+    assert partitions.stats()["resident"] == 2
+
+
+def test_lru_evicts_by_measured_memory(tmp_path, monkeypatch):
+    """Least recently used partitions are dropped once the resident bytes exceed the budget"""
+    rows = [f"compra {i};expensive; $1.{i:03d} ;cat{i % 50};2025-0{1 + i % 9}-01 00:00:00" for i in range(2000)]
+    for chat_id in (1, 2, 3):
+        _write_ledger(tmp_path / "chats" / str(chat_id) / "movements.csv", rows)
+    probe = LedgerPartition(str(tmp_path / "chats" / "1" / "movements.csv"), str(tmp_path / "probe.csv"),
+                            str(tmp_path / "probe"))
+    probe.load_ledger()
+    probe.load_rollup()
+    footprint = probe.memory_usage()
+    assert footprint > 0
+
+    partitions = _use_partitions(tmp_path, monkeypatch, budget_bytes=int(footprint * 2.5))
+    for chat_id in (1, 2, 1, 3):
+        with chat_scope(chat_id):
+            operations_client.movements_by_category_and_month("cat1", 2)
+            operations_client.expenses_by_month(2)
+
+    # Chat 1 se usó después que el 2: el desalojado es el 2
+    assert 1 in partitions and 3 in partitions and 2 not in partitions
+    stats = partitions.stats()
+    assert stats["evictions"] == 1 and stats["resident"] == 2
+    assert stats["resident_bytes"] <= stats["budget_bytes"]
+    assert stats["loads"] >= 3 and stats["load_ms_avg"] > 0
+
+
+def test_footprint_follows_queries_and_appends(tmp_path, monkeypatch):
+    """Cube indexes built by queries and appended movements count toward the budget"""
+    partitions = _use_partitions(tmp_path, monkeypatch)
+    rows = [f"compra {i};expensive; $1.{i:03d} ;cat{i};2025-0{1 + i % 9}-01 00:00:00" for i in range(300)]
+    _write_ledger(tmp_path / "chats" / "1" / "movements.csv", rows)
+
+    with chat_scope(1):
+        csv_client.load_ledger()
+        csv_client.load_rollup()
+        loaded = partitions.stats()["resident_bytes"]
+        # Los índices del cubo se construyen en la primera consulta de cada forma
+        operations_client.expenses_by_month(2)
+        operations_client.incomes_by_category_by_year("cat1")
+        csv_client.load_rollup()
+        queried = partitions.stats()["resident_bytes"]
+        assert queried > loaded
+
+        for i in range(20):
+            operations_client.record_movement("expensive", 100_000 + i, f"nueva{i}", datetime.date(2025, 8, 3))
+        assert partitions.stats()["resident_bytes"] > queried
+    assert partitions.stats()["resident_bytes"] == partitions.get(1).memory_usage()
@@ -0,0 +1,56 @@
+import pandas as pd
+from services import csv_client
+from services.csv_client import load_transactions, load_ledger_file
+from services.ledger import Ledger
+from services.ledger_journal import HEADER
+from services.ledger_reader import read_ledger
+
+
+def test_streaming_reader_matches_the_dict_loader(tmp_path):
+    """Chunked parsing gives the same typed frame and rejected rows as the list-of-dicts path"""
+    path = tmp_path / "movements.csv"
+    path.write_text(HEADER + "".join(f"{row}\r\n" for row in [
+        " mercado ;expensive; $80.000 ; food ;2025-08-02 00:00:00",
+        "sueldo;Income; $3.000.000,50 ;salary;2025-08-01 00:00:00",
+        "sin monto;expensive;  ;food;2025-08-03 00:00:00",
+        "NA;expensive; $1.500 ;NA;2025-09-01 00:00:00",
+        "mala fecha;expensive; $2.000 ;food;ayer",
+        "arriendo;income; $1.000.000 ;rent;2025-09-05 00:00:00",
+    ]), encoding='utf-8')
+
+    expected = Ledger.from_transactions(load_transactions(str(path)), version="v1")
+    for chunk_rows in (1, 2, 100):
+        ledger = read_ledger(str(path), "v1", chunk_rows=chunk_rows)
+        pd.testing.assert_frame_equal(ledger.frame, expected.frame)
+        assert ledger.rejected == expected.rejected
+        assert ledger.version == "v1"
+    assert [r["line"] for r in ledger.rejected] == [4, 6]
+
+
+def test_the_bundled_ledger_and_unreadable_files(tmp_path):
+    """movements.csv parses identically; a file without the ledger columns yields an empty ledger"""
+    expected = Ledger.from_transactions(load_transactions(csv_client.CSV_FILE))
+    pd.testing.assert_frame_equal(read_ledger(csv_client.CSV_FILE, chunk_rows=500).frame, expected.frame)
+
+    path = tmp_path / "other.csv"
+    path.write_text("a;b\r\n1;2\r\n", encoding='utf-8')
+    assert len(load_ledger_file(str(path))) == 0
+    assert len(load_ledger_file(str(tmp_path / "missing.csv"))) == 0
+
+
+def test_malformed_rows_are_rejected_with_their_physical_line(tmp_path):
+    """Rows with extra or missing fields are reported, and blank lines do not shift later line numbers"""
+    path = tmp_path / "movements.csv"
+    path.write_text(HEADER + "".join(f"{row}\r\n" for row in [
+        "mercado;expensive; $80.000 ;food;2025-08-02 00:00:00",
+        "taxi;expensive; $9.000 ;transport;2025-08-02 00:00:00;extra",
+        "sin monto;expensive;  ;food;2025-08-03 00:00:00",
+        "",
+        "arriendo;income",
+        "cine;expensive; $20.000 ;fun;2025-08-04 00:00:00;",
+    ]), encoding='utf-8')
+
+    for chunk_rows in (1, 100):
+        ledger = read_ledger(str(path), chunk_rows=chunk_rows)
+        assert [(r["line"], r["field"]) for r in ledger.rejected] == [(3, "columns"), (4, "Amount"), (6, "columns")]
+        assert list(ledger.frame["Description"]) == ["mercado", "cine"]
@@ -0,0 +1,36 @@
+import json
+import logging
+from services.log_utils import log_payload, payload, redact
+
+
+def test_redact_hides_user_text_headers_and_tokens():
+    """Message text, names and headers are replaced by their size; tokens are masked."""
+    event = {
+        "headers": {"Host": "example.com"},
+        "path": "/bot123456789:AAHdqTcvCH1vGWJxfSeofSAs0K5PALDsaw/sendMessage",
+        "body": json.dumps({"message": {"chat": {"id": 1, "first_name": "Ana"}, "text": "gasté 50.000"}}),
+    }
+    clean = redact(event)
+    assert clean["headers"] == "[1 keys]"
+    assert clean["path"] == "/bot[SECRET]/sendMessage"
+    assert clean["body"]["message"]["text"] == "[12 chars]"
+    assert clean["body"]["message"]["chat"] == {"id": 1, "first_name": "[3 chars]"}
+
+
+def test_payload_is_only_serialized_when_logged(caplog):
+    """Disabled levels and unsampled calls never serialize the payload."""
+    serialized = []
+
+    class Spy:
+        def __str__(self):
+            serialized.append(True)
+            return "spy"
+
+    logger = logging.getLogger("test_log_utils")
+    with caplog.at_level(logging.INFO, logger="test_log_utils"):
+        assert not log_payload(logger, "event", Spy(), level=logging.DEBUG, rate=1.0)
+        assert not log_payload(logger, "event", Spy(), rate=0.0)
+        logger.debug("payload: %s", payload(Spy()))
+        assert serialized == []
+        assert log_payload(logger, "event", {"text": "hola"}, rate=1.0)
+    assert caplog.messages == ['event: {"text": "[4 chars]"}']
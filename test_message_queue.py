@@ -0,0 +1,96 @@
+import json
+from handlers.ingress_handler import handle_ingress
+from services.message_queue import MemoryQueue, SQLiteQueue
+
+
+def _event(text="hola"):
+    return {"httpMethod": "POST", "body": json.dumps({"message": {"chat": {"id": 5}, "text": text}})}
+
+
+def test_ingress_validates_and_enqueues():
+    """Valid updates are queued with a 200; invalid ones get a 400 and are not queued."""
+    queue = MemoryQueue()
+    assert handle_ingress(_event(), None, queue)["statusCode"] == 200
+    assert handle_ingress({"httpMethod": "POST", "body": "no json"}, None, queue)["statusCode"] == 400
+    assert len(queue) == 1
+    message = queue.receive()[0]
+    assert json.loads(message.body["body"])["message"]["text"] == "hola"
+
+
+def test_sqlite_queue_redelivers_after_visibility_timeout(tmp_path):
+    """A received message is hidden until deleted or until its visibility timeout expires."""
+    now = [0.0]
+    queue = SQLiteQueue(str(tmp_path / "queue.sqlite3"), visibility_timeout=30, clock=lambda: now[0])
+    queue.send({"n": 1})
+    queue.send({"n": 2})
+    first = queue.receive(max_messages=1)
+    assert [m.body for m in first] == [{"n": 1}]
+    assert [m.body for m in queue.receive()] == [{"n": 2}]
+    assert queue.receive() == []
+    queue.delete(first[0].receipt)
+    now[0] = 31
+    assert [m.body for m in queue.receive()] == [{"n": 2}]
+    assert len(queue) == 1
+
+
+def test_worker_drains_queue_and_keeps_failed_messages(monkeypatch):
+    """Processed messages are deleted; a message whose pipeline raised stays queued."""
+    from handlers import queue_worker
+    queue = MemoryQueue()
+    handle_ingress(_event("ok"), None, queue)
+    handle_ingress(_event("boom"), None, queue)
+
+    def fake_pipeline(event, context):
+        if "boom" in event["body"]:
+            raise RuntimeError("boom")
+        return {"statusCode": 200}
+
+    monkeypatch.setattr(queue_worker, "handle_message_event", fake_pipeline)
+    assert queue_worker.drain_queue(queue) == {"processed": 1, "failed": 1}
+    assert len(queue) == 1
+
+
+def test_worker_retries_messages_the_real_handler_failed(monkeypatch):
+    """A 500 from handle_message_event keeps the message queued and is reported to SQS."""
+    from handlers import message_handler, queue_worker
+
+    def broken_registry():
+        raise RuntimeError("registry unavailable")
+
+    monkeypatch.setattr(message_handler, "get_registry", broken_registry)
+    queue = MemoryQueue()
+    handle_ingress(_event("hola"), None, queue)
+    assert queue_worker.drain_queue(queue) == {"processed": 0, "failed": 1}
+    assert len(queue) == 1
+
+    body = {"body": _event("hola")["body"]}
+    record = {"messageId": "m-1", "body": json.dumps(body)}
+    assert queue_worker.handle_queue_event({"Records": [record]}, None) == {
+        "batchItemFailures": [{"itemIdentifier": "m-1"}]}
+
+
+def test_user_is_told_about_an_error_only_on_the_last_delivery(monkeypatch):
+    """Retried deliveries fail silently; the last one sends the error reply and drops the message."""
+    from handlers import message_handler, queue_worker
+    sent = []
+
+    def broken_router(message_text, categories):
+        raise RuntimeError("router unavailable")
+
+    monkeypatch.setattr(message_handler, "route_message", broken_router)
+    monkeypatch.setattr(message_handler, "get_categories", lambda: [])
+    monkeypatch.setattr(message_handler, "send_chat_action_to_telegram", lambda chat_id, **kw: None)
+    monkeypatch.setattr(message_handler, "send_message_to_telegram", lambda chat_id, text, **kw: sent.append(text))
+    now = [0.0]
+    queue = MemoryQueue(visibility_timeout=30, clock=lambda: now[0])
+    handle_ingress(_event("hola"), None, queue)
+    for delivery in range(1, queue_worker.MAX_RECEIVES + 1):
+        assert queue_worker.drain_queue(queue) == {"processed": 0, "failed": 1}
+        assert len(sent) == (1 if delivery == queue_worker.MAX_RECEIVES else 0)
+        now[0] += 31
+    assert sent[0].startswith("❌") and len(queue) == 0
+
+    body = {"body": _event("hola")["body"]}
+    record = {"messageId": "m-1", "body": json.dumps(body), "attributes": {"ApproximateReceiveCount": "1"}}
+    assert queue_worker.handle_queue_event({"Records": [record]}, None)["batchItemFailures"]
+    assert len(sent) == 1
@@ -0,0 +1,30 @@
+import json
+from services.metrics import InvocationMetrics, current_metrics, finish_invocation, start_invocation
+
+
+def test_emf_document_declares_every_metric():
+    """Spans add up per stage and every metric is declared in the _aws block."""
+    now = [0.0]
+    metrics = InvocationMetrics(namespace="Test", clock=lambda: now[0])
+    for _ in range(2):
+        with metrics.span("operation"):
+            now[0] += 0.01
+    metrics.put("answer_cache_hit", 1)
+    metrics.set_property("operation", "expenses_by_month")
+    doc = metrics.to_emf()
+    declared = {m["Name"]: m["Unit"] for m in doc["_aws"]["CloudWatchMetrics"][0]["Metrics"]}
+    assert declared == {"operation_ms": "Milliseconds", "answer_cache_hit": "Count", "total_ms": "Milliseconds"}
+    assert doc["operation_ms"] == 20.0
+    assert doc["operation"] == "expenses_by_month"
+    assert doc["_aws"]["CloudWatchMetrics"][0]["Namespace"] == "Test"
+
+
+def test_invocation_emits_one_json_line(capsys):
+    """finish_invocation prints a single EMF line and clears the current metrics."""
+    metrics = start_invocation()
+    current_metrics().put("result_bytes", 10, "Bytes")
+    finish_invocation(metrics)
+    lines = capsys.readouterr().out.strip().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["result_bytes"] == 10
+    current_metrics().put("ignored", 1)
@@ -0,0 +1,41 @@
+import pytest
+from services.operation_registry import InvalidParams, OperationRegistry
+
+
+def test_operations_file_compiles_to_prompt_lines():
+    """Every operation in operations.json maps to a function and one prompt line."""
+    registry = OperationRegistry.from_file()
+    assert len(registry) == 8
+    assert "expenses_by_month(month:month): Expenses by month" in registry.prompt.splitlines()
+    assert registry.get("incomes_expenses_by_year").prompt_line.startswith("incomes_expenses_by_year(): ")
+
+
+def test_params_are_coerced_and_invalid_ones_rejected():
+    """Month names become numbers, categories match the ledger labels, bad params raise."""
+    operation = OperationRegistry.from_file().get("movements_by_category_and_month")
+    assert operation.coerce({"month": "Septiembre", "category": " comida "}, ["Food", "Health"]) == \
+        {"month": 9, "category": "Food"}
+    assert operation.coerce({"month": "3", "category": "salud"}, ["Food", "Health"]) == \
+        {"month": 3, "category": "Health"}
+    with pytest.raises(InvalidParams):
+        operation.coerce({"month": "smarch", "category": "food"})
+    with pytest.raises(InvalidParams):
+        operation.coerce({"month": 13, "category": "food"})
+    with pytest.raises(InvalidParams):
+        operation.coerce({"month": 9})
+    with pytest.raises(InvalidParams):
+        operation.coerce({"month": 9, "category": "food", "year": 2025})
+
+
+def test_declarations_are_checked_against_the_functions():
+    """Unknown methods and params that do not match the signature are rejected."""
+    def by_month(month):
+        return month
+
+    OperationRegistry([{"mehtod": "by_month", "params": {"month": "month"}}], {"by_month": by_month})
+    with pytest.raises(ValueError):
+        OperationRegistry([{"method": "missing"}], {"by_month": by_month})
+    with pytest.raises(ValueError):
+        OperationRegistry([{"method": "by_month"}], {"by_month": by_month})
+    with pytest.raises(ValueError):
+        OperationRegistry([{"method": "by_month", "params": {"month": "datetime"}}], {"by_month": by_month})
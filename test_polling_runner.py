@@ -0,0 +1,75 @@
+import asyncio
+import json
+import threading
+import time
+from handlers.polling_runner import FakeUpdateSource, PollingRunner
+
+
+def _update(update_id, chat_id):
+    return {"update_id": update_id, "message": {"chat": {"id": chat_id}, "text": f"m{update_id}"}}
+
+
+def test_runner_keeps_chat_order_and_bounds_concurrency():
+    """Updates of one chat run in order; different chats overlap up to the limit."""
+    lock = threading.Lock()
+    seen, active, peak = [], [0], [0]
+
+    def handler(event, context):
+        update = json.loads(event["body"])
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+            seen.append((update["message"]["chat"]["id"], update["update_id"]))
+        assert context.get_remaining_time_in_millis() > 0
+        return {"statusCode": 200}
+
+    batches = [[_update(i, i % 4) for i in range(1, 13)], [_update(13, 0)]]
+    runner = PollingRunner(FakeUpdateSource(batches), handler=handler, concurrency=3)
+    try:
+        stats = asyncio.run(runner.run(max_batches=2))
+    finally:
+        runner.close()
+
+    assert stats["processed"] == 13 and stats["failed"] == 0
+    assert runner.offset == 14
+    assert 1 < peak[0] <= 3
+    for chat in range(4):
+        ids = [u for c, u in seen if c == chat]
+        assert ids == sorted(ids)
+    # Las tareas terminadas no quedan retenidas por chat
+    assert runner._last_by_chat == {}
+
+
+def test_offset_waits_for_unfinished_updates_and_fetching_waits_for_capacity():
+    """getUpdates never confirms an update still running, and is not called while all slots are busy."""
+    fetches = []
+    handled = []
+
+    class RecordingSource(FakeUpdateSource):
+        def fetch(self, offset):
+            fetches.append((offset, len(runner._in_flight)))
+            return super().fetch(offset)
+
+    def handler(event, context):
+        update = json.loads(event["body"])
+        if update["update_id"] == 1:
+            time.sleep(0.3)
+        handled.append(update["update_id"])
+        return {"statusCode": 200}
+
+    # Telegram repite el update 1 mientras el offset no lo haya confirmado
+    batches = [[_update(i, i) for i in range(1, 5)], [_update(1, 1), _update(5, 5)]]
+    runner = PollingRunner(RecordingSource(batches), handler=handler, concurrency=2)
+    try:
+        stats = asyncio.run(runner.run(max_batches=2))
+    finally:
+        runner.close()
+
+    assert fetches[0] == (None, 0)
+    # El segundo getUpdates llega con el update 1 aún en proceso y un cupo libre
+    assert fetches[1] == (1, 1)
+    assert sorted(handled) == [1, 2, 3, 4, 5] and stats["processed"] == 5
+    assert runner.offset == 6
@@ -0,0 +1,22 @@
+from benchmarks.replay import Stubs, compare, percentile, replay, synthetic_events
+
+
+def test_replay_reports_percentiles_per_stage():
+    """Synthetic events go through lambda_handler with stubbed OpenAI and Telegram."""
+    events = synthetic_events()
+    report = replay(events, repeat=1, stubs=Stubs(), trace_allocations=False)
+    assert report["events"] == len(events)
+    assert report["status"] == {"200": len(events)}
+    assert report["stages"]["total"]["count"] == len(events)
+    assert {"route_local", "extract_message"} <= set(report["stages"])
+    assert report["calls"]["telegram"] > 0
+
+
+def test_compare_flags_only_regressions_beyond_threshold():
+    """Small or noise-level increases pass; larger ones are reported."""
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    baseline = {"stages": {"operation": {"p50": 10.0, "p95": 20.0}}, "cpu_ms_per_event": 5.0}
+    same = {"stages": {"operation": {"p50": 10.5, "p95": 20.5}}, "cpu_ms_per_event": 5.2}
+    worse = {"stages": {"operation": {"p50": 10.5, "p95": 30.0}}, "cpu_ms_per_event": 5.2}
+    assert compare(same, baseline, threshold=0.1) == []
+    assert len(compare(worse, baseline, threshold=0.1)) == 1
@@ -0,0 +1,43 @@
+from services.result_compactor import compact_result, count_tokens
+
+
+def _records(n):
+    return [
+        {"\ufeffDescription": f"item {i}", "Income/expensive": "expensive", "Amount": float(i * 1000),
+         "Category": "food", "Date": "2025-08-01T00:00:00", "Year": "2025", "Month": "08"}
+        for i in range(1, n + 1)
+    ]
+
+
+def test_records_drop_redundant_and_constant_columns():
+    """Year/Month are dropped next to Date and constant columns are written once."""
+    text, stats = compact_result({"total": 3000.0, "transactions": _records(2)})
+    assert "Income/expensive=expensive; Category=food; Date=2025-08-01" in text
+    assert "Description|Amount" in text
+    assert "Year" not in text and "\ufeff" not in text
+    assert stats["tokens_after"] < stats["tokens_before"]
+    assert stats["top_n"] is None
+
+
+def test_over_budget_keeps_top_rows_and_sums_the_rest():
+    """Over the budget, the largest rows are kept and the others summed."""
+    text, stats = compact_result(_records(200), budget=150)
+    assert count_tokens(text) <= 150
+    assert "item 200|200000" in text
+    kept = stats["top_n"]
+    others = sum(i * 1000 for i in range(1, 200 - kept + 1))
+    assert f"otros ({200 - kept} filas)|Amount={others}" in text
+
+
+def test_others_are_summed_per_movement_type():
+    """Mixed incomes and expenses get one "otros" total per Income/expensive value."""
+    records = _records(100)
+    for record in records[::2]:
+        record["Income/expensive"] = "income"
+    text, stats = compact_result(records, budget=150)
+    kept = stats["top_n"]
+    others = [r for r in records if r["Amount"] <= (100 - kept) * 1000]
+    for kind in ("income", "expensive"):
+        amounts = [r["Amount"] for r in others if r["Income/expensive"] == kind]
+        assert f"otros {kind} ({len(amounts)} filas)|Amount={int(sum(amounts))}" in text
+    assert "otros (" not in text
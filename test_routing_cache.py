@@ -0,0 +1,39 @@
+import json
+from services.routing_cache import RoutingCache
+from services.ttl_cache import TTLCache
+
+
+def test_ttl_cache_evicts_lru_and_expires():
+    """The cache keeps at most max_size entries and drops expired ones."""
+    now = [0.0]
+    cache = TTLCache(max_size=2, ttl_seconds=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    now[0] = 11
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_routing_cache_normalizes_and_invalidates(tmp_path):
+    """Equivalent messages share a decision until operations.json changes."""
+    operations = tmp_path / "operations.json"
+    operations.write_text(json.dumps({"operations": []}))
+    persist = tmp_path / "cache" / "routing.json"
+    cache = RoutingCache(str(operations), persist_path=str(persist))
+    decision = {"operation": "expenses_by_month", "params": {"month": 3}}
+
+    cache.put("¿Cuánto gasté en  Marzo?", decision)
+    assert cache.get("cuanto gaste en marzo") == decision
+    cache.put("hola", {})
+    assert cache.get("hola") is None
+
+    reloaded = RoutingCache(str(operations), persist_path=str(persist))
+    assert reloaded.get("CUANTO GASTE EN MARZO") == decision
+
+    operations.write_text(json.dumps({"operations": [{"name": "new"}]}))
+    assert cache.get("cuanto gaste en marzo") is None
+    assert reloaded.get("cuanto gaste en marzo") is None
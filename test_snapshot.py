@@ -0,0 +1,60 @@
+import shutil
+from services import snapshot
+from services.ledger_cache import file_hash
+
+
+def _copy_ledger(tmp_path):
+    csv_path = tmp_path / "movements.csv"
+    shutil.copy("services/movements.csv", csv_path)
+    return str(csv_path)
+
+
+def test_snapshot_round_trips_the_ledger(tmp_path):
+    """The mapped snapshot holds the same typed rows as the parsed CSV"""
+    csv_path = _copy_ledger(tmp_path)
+    from services.csv_client import load_transactions
+    from services.ledger import Ledger
+    parsed = Ledger.from_transactions(load_transactions(csv_path))
+
+    path = snapshot.build_snapshot(csv_path)
+    mapped = snapshot.load_snapshot(path, source_hash=file_hash(csv_path))
+
+    assert mapped is not None
+    assert Ledger.to_records(mapped.frame) == Ledger.to_records(parsed.frame)
+    assert mapped.rejected == parsed.rejected
+    assert snapshot.load_rollup(path).cells.keys()
+
+
+def test_stale_or_missing_snapshot_is_ignored(tmp_path):
+    """A snapshot compiled from other content falls back to the CSV"""
+    csv_path = _copy_ledger(tmp_path)
+    path = snapshot.build_snapshot(csv_path)
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("\nnuevo;expensive; $1.000 ;food;2025-09-30 00:00:00")
+
+    assert snapshot.load_snapshot(path, source_hash=file_hash(csv_path)) is None
+    assert snapshot.load_snapshot(str(tmp_path / "missing.snapshot")) is None
+
+
+def test_truncated_or_corrupt_snapshot_is_ignored(tmp_path):
+    """A damaged snapshot is reported as missing instead of failing the ledger load"""
+    csv_path = _copy_ledger(tmp_path)
+    path = snapshot.build_snapshot(csv_path)
+    with open(path, "rb") as f:
+        data = f.read()
+    header_length = int.from_bytes(data[8:12], "little")
+    damaged = {
+        "garbage": b"not a snapshot at all",
+        "empty": b"",
+        "cut_in_length": data[:10],
+        "cut_in_header": data[:12 + header_length // 2],
+        "cut_in_columns": data[:len(data) - 100],
+        "bad_json": data[:12] + b"{" * header_length + data[12 + header_length:],
+        "no_keys": data[:8] + len(b"{}").to_bytes(4, "little") + b"{}",
+    }
+    for name, content in damaged.items():
+        broken = tmp_path / f"{name}.snapshot"
+        broken.write_bytes(content)
+        assert snapshot.load_snapshot(str(broken)) is None, name
+        assert snapshot.read_header(str(broken)) is None, name
+        assert snapshot.load_rollup(str(broken)) is None, name
@@ -0,0 +1,61 @@
+import pytest
+from services import csv_client
+from services.operation_registry import get_registry
+from services.sqlite_ledger import SQLiteLedger
+
+MONTHS = list(range(1, 13))
+CATEGORIES = ["food", "Taxes", "TAXES", "pasive incomes", "salary", "new home", "unknown"]
+
+
+def _calls():
+    for method, operation in get_registry().operations.items():
+        params = sorted(operation.params)
+        if operation.writes:
+            continue
+        if params == []:
+            yield method, operation, {}
+        elif params == ["month"]:
+            for month in MONTHS:
+                yield method, operation, {"month": month}
+        elif params == ["category"]:
+            for category in CATEGORIES:
+                yield method, operation, {"category": category}
+        else:
+            for month in (1, 3, 8):
+                for category in CATEGORIES:
+                    yield method, operation, {"month": month, "category": category}
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    store = SQLiteLedger(str(tmp_path_factory.mktemp("ledger") / "ledger.sqlite3"))
+    store.import_csv(csv_client.CSV_FILE)
+    yield store
+    store.close()
+
+
+def test_import_keeps_every_movement_and_the_source_version(store):
+    """The importer stores the rows the pandas path keeps, tagged with the CSV hash."""
+    ledger = csv_client.load_ledger()
+    assert len(store) == len(ledger)
+    assert store.version == ledger.version
+    assert store.categories() == csv_client.load_rollup().categories()
+
+
+def test_every_operation_matches_the_pandas_path(store, monkeypatch):
+    """Each registered operation returns the same result on both backends."""
+    calls = list(_calls())
+    expected = [operation(**params) for _, operation, params in calls]
+    monkeypatch.setattr(csv_client, "load_ledger", lambda: store)
+    monkeypatch.setattr(csv_client, "load_rollup", lambda: store)
+    for (method, operation, params), want in zip(calls, expected):
+        assert operation(**params) == want, (method, params)
+
+
+def test_select_reads_only_the_filtered_rows(store):
+    """Filters run in SQL and the rows come back typed like Ledger.frame."""
+    frame = store.select(kind="expensive", month=3, category="taxes")
+    assert set(frame["Month"]) <= {3}
+    assert str(frame["Cents"].dtype) == "int64"
+    assert str(frame["Category"].dtype) == "category"
+    assert store.select(category="unknown").empty
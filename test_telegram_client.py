@@ -0,0 +1,53 @@
+import pytest
+import requests
+from services.telegram_client import TelegramClient, TelegramError
+
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self._data = data
+        self.status_code = status_code
+
+    def json(self):
+        return self._data
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.urls = []
+
+    def post(self, url, json=None, timeout=None):
+        self.urls.append(url)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_client_honours_retry_after_and_retries_network_errors():
+    """A 429 waits for retry_after and connection errors are retried until success."""
+    session = FakeSession([
+        FakeResponse({"ok": False, "error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": 3}}, 429),
+        requests.exceptions.ConnectionError("reset"),
+        FakeResponse({"ok": True, "result": {"message_id": 1}}),
+    ])
+    sleeps = []
+    client = TelegramClient(token="T", session=session, sleep=sleeps.append)
+    assert client.send_message(1, "hola")["result"]["message_id"] == 1
+    assert sleeps[0] == 3
+    assert len(sleeps) == 2
+    assert session.urls[0] == "https://api.telegram.org/botT/sendMessage"
+    stats = client.stats()["sendMessage"]
+    assert stats["calls"] == 1 and stats["retries"] == 2 and stats["errors"] == 0
+
+
+def test_client_does_not_retry_client_errors():
+    """A 400 is raised at once as a TelegramError with its code and description."""
+    session = FakeSession([FakeResponse({"ok": False, "error_code": 400, "description": "Bad Request: chat not found"}, 400)])
+    client = TelegramClient(token="T", session=session, sleep=lambda s: None)
+    with pytest.raises(TelegramError) as info:
+        client.edit_message_text(1, 2, "hola")
+    assert info.value.error_code == 400
+    assert session.responses == []
+    assert client.stats()["editMessageText"]["errors"] == 1
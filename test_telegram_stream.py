@@ -0,0 +1,90 @@
+from services import telegram_stream
+
+
+def _fake_telegram(monkeypatch):
+    calls = []
+
+    def send(chat_id, text, parse_mode="Markdown", timeout=None):
+        calls.append(("send", text, parse_mode))
+        return {"ok": True, "result": {"message_id": 7}}
+
+    def edit(chat_id, message_id, text, parse_mode="Markdown", timeout=None):
+        calls.append(("edit", text, parse_mode))
+        return {"ok": True}
+
+    monkeypatch.setattr(telegram_stream, "send_message_to_telegram", send)
+    monkeypatch.setattr(telegram_stream, "edit_message_in_telegram", edit)
+    return calls
+
+
+def test_stream_sends_early_and_rate_limits_edits(monkeypatch):
+    """The first text goes out early as plain text; edits are throttled; the last edit uses Markdown."""
+    calls = _fake_telegram(monkeypatch)
+    now = [0.0]
+
+    def chunks():
+        for i in range(10):
+            now[0] = i * 0.3
+            yield f"palabra{i} "
+
+    result = telegram_stream.stream_to_telegram(1, chunks(), min_interval=1.0, min_chars=10, clock=lambda: now[0])
+    assert calls[0][0] == "send" and calls[0][2] is None
+    assert result["first_visible_ms"] == 300
+    edits = [c for c in calls if c[0] == "edit"]
+    assert 1 < len(edits) < 9
+    assert edits[-1] == ("edit", result["text"], "Markdown")
+    assert all(c[2] is None for c in edits[:-1])
+
+
+def test_short_answer_is_sent_once(monkeypatch):
+    """An answer shorter than min_chars is sent as a single Markdown message."""
+    calls = _fake_telegram(monkeypatch)
+    result = telegram_stream.stream_to_telegram(1, iter(["Hola"]), min_chars=20)
+    assert calls == [("send", "Hola", "Markdown")]
+    assert result["edits"] == 0
+
+
+def test_failed_final_edit_sends_the_answer_instead_of_raising(monkeypatch):
+    """If both final edits fail, the complete answer goes out as a new message and nothing is raised."""
+    calls = _fake_telegram(monkeypatch)
+
+    def edit(chat_id, message_id, text, parse_mode="Markdown", timeout=None):
+        raise RuntimeError("message can't be edited")
+
+    monkeypatch.setattr(telegram_stream, "edit_message_in_telegram", edit)
+    result = telegram_stream.stream_to_telegram(1, iter(["una respuesta ", "bastante larga"]), min_chars=5)
+    assert calls[-1] == ("send", "una respuesta bastante larga", None)
+    assert result["text"] == "una respuesta bastante larga"
+
+
+def test_undeliverable_answer_is_reported(monkeypatch):
+    """When the edits and the fallback send all fail, the result says the answer was not delivered."""
+    calls = _fake_telegram(monkeypatch)
+
+    def edit(chat_id, message_id, text, parse_mode="Markdown", timeout=None):
+        raise RuntimeError("message can't be edited")
+
+    def send(chat_id, text, parse_mode="Markdown", timeout=None):
+        if calls:
+            raise RuntimeError("Too Many Requests")
+        calls.append(("send", text, parse_mode))
+        return {"ok": True, "result": {"message_id": 7}}
+
+    monkeypatch.setattr(telegram_stream, "edit_message_in_telegram", edit)
+    monkeypatch.setattr(telegram_stream, "send_message_to_telegram", send)
+    result = telegram_stream.stream_to_telegram(1, iter(["una respuesta ", "bastante larga"]), min_chars=5)
+    assert result["delivered"] is False
+
+
+def test_long_answer_is_split_at_the_telegram_limit(monkeypatch):
+    """An answer over TELEGRAM_MAX_LENGTH fills the streamed message and continues in new messages."""
+    calls = _fake_telegram(monkeypatch)
+    line = "x" * 99 + "\n"
+    chunks = [line] * 60
+    result = telegram_stream.stream_to_telegram(1, iter(chunks), min_interval=1000, min_chars=5)
+    assert result["delivered"] is True
+    final_edit = [c for c in calls if c[0] == "edit"][-1]
+    extra = calls[calls.index(final_edit) + 1:]
+    assert len(final_edit[1]) <= telegram_stream.TELEGRAM_MAX_LENGTH
+    assert [c[0] for c in extra] == ["send"] and len(extra[0][1]) <= telegram_stream.TELEGRAM_MAX_LENGTH
+    assert final_edit[1] + "\n" + extra[0][1] == result["text"]